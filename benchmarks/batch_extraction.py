@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Time the batch extraction of the test PDFs with more and more workers.
+
+The test PDFs are extracted ``copies`` times with 1, 2, 4... workers, up to
+the number of CPUs, and the throughput of each run is compared to the one
+with a single worker. The KBs are loaded before the first run, so that it
+isn't penalised.
+
+Usage: python benchmarks/batch_extraction.py [copies] [text backend]
+"""
+
+import glob
+import logging
+import os
+import sys
+import time
+
+from refextract.authors.regexs import get_author_regexps
+from refextract.references.api import extract_references_from_files
+from refextract.references.engine import get_kbs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "data")
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    text_backend = sys.argv[2] if len(sys.argv) > 2 else "pdftotext"
+    # pypdf warns about every font it can't fully decode
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    paths = sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf"))) * copies
+    get_kbs()
+    get_author_regexps()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+        worker_counts.append(worker_counts[-1] * 2)
+
+    print("%8s %10s %10s %8s %8s" % ("workers", "time", "docs/s", "speedup", "errors"))
+    single = None
+    for max_workers in worker_counts:
+        start = time.perf_counter()
+        results = list(
+            extract_references_from_files(
+                paths, max_workers=max_workers, text_backend=text_backend
+            )
+        )
+        duration = time.perf_counter() - start
+        single = single or duration
+        errors = sum(1 for result in results if result.error is not None)
+        print(
+            "%8d %9.2fs %10.2f %7.2fx %8d"
+            % (max_workers, duration, len(paths) / duration, single / duration, errors)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Time the extraction of the journal references of publication infos.
+
+The publication infos are synthetic, a tenth of them being repeated, as in
+the publication infos of a batch of records.
+
+Usage: python benchmarks/journal_references.py [publication infos]
+"""
+
+import random
+import sys
+import time
+
+from refextract.references.api import (
+    extract_journal_reference,
+    extract_journal_references,
+)
+
+JOURNALS = (
+    "Phys. Rev. D",
+    "Phys.Rev.Lett.",
+    "Nucl. Phys. B",
+    "JHEP",
+    "Eur. Phys. J. C",
+    "J. Phys. A",
+    "Phys. Lett. B",
+)
+
+
+def make_pubinfos(count, seed=0):
+    rnd = random.Random(seed)
+    pubinfos = [
+        "%s %d (%d) %d"
+        % (
+            rnd.choice(JOURNALS),
+            rnd.randint(1, 120),
+            rnd.randint(1970, 2025),
+            rnd.randint(1, 9999),
+        )
+        for dummy in range(count - count // 10)
+    ]
+    pubinfos += rnd.sample(pubinfos, count // 10)
+    rnd.shuffle(pubinfos)
+    return pubinfos
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pubinfos = make_pubinfos(count)
+    # load the KBs before timing
+    extract_journal_reference(pubinfos[0])
+
+    start = time.perf_counter()
+    one_by_one = [extract_journal_reference(pubinfo) for pubinfo in pubinfos]
+    one_by_one_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = extract_journal_references(pubinfos)
+    batch_duration = time.perf_counter() - start
+
+    print(
+        "%d publication infos, %d journal references found, %d different"
+        % (
+            len(pubinfos),
+            sum(1 for reference in batch if reference),
+            sum(
+                1 for pair in zip(one_by_one, batch, strict=True) if pair[0] != pair[1]
+            ),
+        )
+    )
+    print("extract_journal_reference:  %.3fs" % one_by_one_duration)
+    print("extract_journal_references: %.3fs" % batch_duration)
+
+
+if __name__ == "__main__":
+    main()
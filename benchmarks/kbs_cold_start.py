@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Time the loading of the KBs in fresh processes, with and without snapshots.
+
+Usage: python benchmarks/kbs_cold_start.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+LOAD_KBS = """
+import time
+from refextract.references.kbs import get_kbs
+start = time.perf_counter()
+get_kbs()
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(runs, cache_dir=None):
+    env = dict(os.environ)
+    env.pop("CFG_REFEXTRACT_KBS_CACHE_DIR", None)
+    if cache_dir:
+        env["CFG_REFEXTRACT_KBS_CACHE_DIR"] = cache_dir
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", LOAD_KBS], env=env)
+        timings.append(float(output))
+    return min(timings)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("full build:    %.3fs" % cold_start(runs))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # the first run writes the snapshots
+        cold_start(1, cache_dir)
+        print("from snapshot: %.3fs" % cold_start(runs, cache_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Time the conversion of the test PDFs with each PDF text backend.
+
+For every file, print the time taken by each backend, and the number of
+reference lines found in its conversion.
+
+Usage: python benchmarks/pdf_text_backends.py [runs]
+"""
+
+import glob
+import logging
+import os
+import sys
+import time
+from itertools import chain
+
+from refextract.documents.pdf import PDF_TEXT_BACKENDS
+from refextract.references.text import extract_references_from_fulltext
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "data")
+
+
+def convert(stream_pages, path, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        docbody = list(chain.from_iterable(stream_pages(path)))
+        timings.append(time.perf_counter() - start)
+    reflines, dummy, dummy = extract_references_from_fulltext(docbody)
+    return min(timings), len(reflines)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # pypdf warns about every font it can't fully decode
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    backends = sorted(PDF_TEXT_BACKENDS)
+    print("%-24s" % "file" + "".join("%22s" % name for name in backends))
+    totals = dict.fromkeys(backends, 0.0)
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf"))):
+        row = "%-24s" % os.path.basename(path)
+        for name in backends:
+            try:
+                duration, count = convert(PDF_TEXT_BACKENDS[name], path, runs)
+            except Exception as exc:
+                row += "%22s" % type(exc).__name__
+                continue
+            totals[name] += duration
+            row += "%13.3fs %4d refs" % (duration, count)
+        print(row)
+    print("%-24s" % "total" + "".join("%21.3fs" % totals[name] for name in backends))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Time the assignment of URLs to references on synthetic layouts.
+
+Each layout has 10000 reference destinations, 30 per page, each followed
+by one or two links, in one or two columns.
+
+Usage: python benchmarks/url_assignment.py [references]
+"""
+
+import random
+import sys
+import time
+
+from refextract.references.pdf import _assign_urls_to_references
+
+PAGE_TOP = 800
+LINE_HEIGHT = 24
+
+
+def make_layout(reference_count, two_columns, seed=0):
+    rnd = random.Random(seed)
+    per_column = 15 if two_columns else 30
+    columns = [(0, 50), (1, 320)] if two_columns else [(0, 50)]
+    refs = []
+    urls = []
+    for nb in range(reference_count):
+        page, index = divmod(nb, per_column * len(columns))
+        column, left = columns[index // per_column]
+        top = PAGE_TOP - (index % per_column) * LINE_HEIGHT
+        refs.append(("cite.ref%d" % nb, (page, column, -top, left)))
+        for link in range(rnd.randint(1, 2)):
+            url_top = top - 4 - 8 * link
+            url_left = left + rnd.randint(20, 200)
+            urls.append(
+                (
+                    "https://doi.org/10.1000/%d.%d" % (nb, link),
+                    (page, column, -url_top, url_left),
+                )
+            )
+    if two_columns:
+        urls.sort(key=lambda url: url[1])
+    else:
+        urls.sort(key=lambda url: (url[1][0], url[1][2], url[1][3]))
+    return refs, urls
+
+
+def main():
+    reference_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for two_columns in (False, True):
+        refs, urls = make_layout(reference_count, two_columns)
+        start = time.perf_counter()
+        urls_by_reference = _assign_urls_to_references(refs, urls, two_columns)
+        duration = time.perf_counter() - start
+        print(
+            "%s: %d references, %d urls, %d assigned in %.3fs"
+            % (
+                "two columns" if two_columns else "one column",
+                len(refs),
+                len(urls),
+                sum(len(ref_urls) for ref_urls in urls_by_reference),
+                duration,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
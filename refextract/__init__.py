@@ -25,14 +25,28 @@
 
 from refextract.references.api import (
     extract_journal_reference,
+    extract_journal_references,
+    extract_references_from_bytes,
     extract_references_from_file,
+    extract_references_from_fileobj,
+    extract_references_from_files,
+    extract_references_from_raw_references,
     extract_references_from_string,
     extract_references_from_url,
+    register_kbs,
 )
+from refextract.references.async_api import AsyncReferenceExtractor
 
 __all__ = (
+    "AsyncReferenceExtractor",
     "extract_journal_reference",
+    "extract_journal_references",
+    "extract_references_from_bytes",
     "extract_references_from_file",
+    "extract_references_from_fileobj",
+    "extract_references_from_files",
+    "extract_references_from_raw_references",
     "extract_references_from_string",
     "extract_references_from_url",
+    "register_kbs",
 )
@@ -34,64 +34,295 @@ for and the characters that should be used to replace them.
 replace in plain-text.
 """
 
+import contextvars
+import io
 import logging
 import os
 import re
 import subprocess
+import threading
+from itertools import chain
+
+from pypdf import PdfReader
 
 from refextract.references.config import CFG_PATH_PDFTOTEXT
 
 LOGGER = logging.getLogger(__name__)
 
 
-def convert_PDF_to_plaintext(fpath, keep_layout=False):
-    """Convert PDF to txt using pdftotext
+class PdftotextProcesses:
+    """The pdftotext processes started on behalf of one extraction.
 
-    Take the path to a PDF file and run pdftotext for this file, capturing
-    the output.
-    @param fpath: (string) path to the PDF file
-    @return: (list) of unicode strings (contents of the PDF file translated
-    into plaintext; each string is a line in the document.)
+    Set it in ``pdftotext_processes`` for the context the extraction runs
+    in; ``kill`` then stops all of its conversions, including the ones it
+    would start afterwards.
     """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = []
+        self.killed = False
+
+    def add(self, process):
+        with self._lock:
+            self._processes.append(process)
+            if self.killed:
+                process.kill()
+
+    def kill(self):
+        with self._lock:
+            self.killed = True
+            for process in self._processes:
+                if process.poll() is None:
+                    LOGGER.debug("killing pdftotext %d", process.pid)
+                    process.kill()
+
+
+# PdftotextProcesses of the extraction running in the current context, if any
+pdftotext_processes = contextvars.ContextVar("pdftotext_processes", default=None)
+
+
+def get_pdftotext_command(fpath, keep_layout=False, first_page=None, last_page=None):
+    """Return the pdftotext command converting a PDF file to stdout."""
     if not os.path.isfile(CFG_PATH_PDFTOTEXT):
         raise IOError("Missing pdftotext executable")
 
     layout_option = "-layout" if keep_layout else "-raw"
-    doclines = []
-    # Pattern to check for lines with a leading page-break character.
-    # If this pattern is matched, we want to split the page-break into
-    # its own line because we rely upon this for trying to strip headers
-    # and footers, and for some other pattern matching.
-    p_break_in_line = re.compile(r"^\s*\f(.+)$", re.UNICODE)
-    # build pdftotext command:
     cmd_pdftotext = [
         CFG_PATH_PDFTOTEXT,
         layout_option,
         "-q",
         "-enc",
         "UTF-8",
-        fpath,
-        "-",
     ]
+    if first_page:
+        cmd_pdftotext += ["-f", str(first_page)]
+    if last_page:
+        cmd_pdftotext += ["-l", str(last_page)]
+    cmd_pdftotext += [fpath, "-"]
+    return cmd_pdftotext
 
+
+def start_pdftotext(
+    fpath, keep_layout=False, first_page=None, last_page=None, data=None
+):
+    """Start a pdftotext subprocess converting a PDF to its stdout.
+
+    The PDF is either the file at ``fpath``, or ``data`` (a bytes-like
+    object) which is written to the stdin of pdftotext by a thread.
+    @return: (subprocess.Popen) the pdftotext process.
+    """
+    if data is not None:
+        fpath = "-"
+    cmd_pdftotext = get_pdftotext_command(fpath, keep_layout, first_page, last_page)
     LOGGER.debug("%s", " ".join(cmd_pdftotext))
-    # open pipe to pdftotext:
-    pipe_pdftotext = subprocess.Popen(cmd_pdftotext, stdout=subprocess.PIPE)
-    # read back results:
-    for docline in pipe_pdftotext.stdout:
+    process = subprocess.Popen(
+        cmd_pdftotext,
+        stdin=None if data is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    processes = pdftotext_processes.get()
+    if processes is not None:
+        processes.add(process)
+    if data is None:
+        return process
+
+    def write_data():
+        try:
+            process.stdin.write(data)
+            process.stdin.close()
+        except (OSError, ValueError):
+            # pdftotext exited, or was killed, before reading everything
+            LOGGER.debug("pdftotext did not read the whole PDF")
+
+    threading.Thread(target=write_data, daemon=True).start()
+    return process
+
+
+def iter_pdftotext_lines(stream):
+    """Yield the unicode lines of the output of pdftotext.
+
+    Page-breaks are split into their own lines.
+    """
+    # Pattern to check for lines with a leading page-break character.
+    # If this pattern is matched, we want to split the page-break into
+    # its own line because we rely upon this for trying to strip headers
+    # and footers, and for some other pattern matching.
+    p_break_in_line = re.compile(r"^\s*\f(.+)$", re.UNICODE)
+    for docline in stream:
         unicodeline = docline.decode("utf-8")
         # Check for a page-break in this line:
         m_break_in_line = p_break_in_line.match(unicodeline)
         if m_break_in_line is None:
             # There was no page-break in this line. Just add the line:
-            doclines.append(unicodeline)
+            yield unicodeline
         else:
             # If there was a page-break character in the same line as some
             # text, split it out into its own line so that we can later
             # try to find headers and footers:
-            doclines.append("\f")
-            doclines.append(m_break_in_line.group(1))
+            yield "\f"
+            yield m_break_in_line.group(1)
+
+
+def read_pdftotext_output(stream):
+    """Read the output of pdftotext into a list of unicode lines."""
+    return list(iter_pdftotext_lines(stream))
+
+
+def iter_pdftotext_pages(stream):
+    """Yield the pages of the output of pdftotext, as lists of unicode lines.
+
+    Each page ends with its page-break line, so that joining the pages gives
+    back the lines of read_pdftotext_output.
+    """
+    page = []
+    for line in iter_pdftotext_lines(stream):
+        page.append(line)
+        if "\f" in line:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def stream_PDF_to_plaintext(
+    fpath, keep_layout=False, first_page=None, last_page=None, reader=None, data=None
+):
+    """Convert PDF to txt using pdftotext, yielding each page as soon as it
+    has been converted.
+
+    pdftotext is killed if the generator is closed before the end of the
+    document.
+    @param reader: unused, pdftotext reads the file itself.
+    @param data: (bytes-like) the PDF, to read instead of the file at
+     ``fpath``.
+    @return: (generator) of lists of unicode strings, one list per page.
+    """
+    pipe_pdftotext = start_pdftotext(fpath, keep_layout, first_page, last_page, data)
+    with pipe_pdftotext:
+        try:
+            yield from iter_pdftotext_pages(pipe_pdftotext.stdout)
+        finally:
+            if pipe_pdftotext.poll() is None:
+                pipe_pdftotext.kill()
+
+
+def convert_PDF_to_plaintext(fpath, keep_layout=False, data=None):
+    """Convert PDF to txt using pdftotext
+
+    Take the path to a PDF file and run pdftotext for this file, capturing
+    the output.
+    @param fpath: (string) path to the PDF file
+    @param data: (bytes-like) the PDF, to read instead of the file at
+     ``fpath``.
+    @return: (list) of unicode strings (contents of the PDF file translated
+    into plaintext; each string is a line in the document.)
+    """
+    # open pipe to pdftotext:
+    pipe_pdftotext = start_pdftotext(fpath, keep_layout, data=data)
+    # read back results:
+    with pipe_pdftotext:
+        doclines = read_pdftotext_output(pipe_pdftotext.stdout)
 
     LOGGER.debug("convert_PDF_to_plaintext found: %s lines of text", len(doclines))
 
     return doclines
+
+
+class BackgroundPDFConversion:
+    """Conversion of a PDF to plaintext running while the caller does
+    something else.
+
+    Its output is read by a thread, so that pdftotext never waits on a full
+    pipe. The conversion is killed if its result is not needed anymore.
+    The pages are given as they are converted to ``collect``, whose return
+    value is the result of the conversion; by default, all their lines.
+    """
+
+    def __init__(
+        self,
+        fpath,
+        keep_layout=False,
+        first_page=None,
+        last_page=None,
+        collect=None,
+        data=None,
+    ):
+        self._process = start_pdftotext(fpath, keep_layout, first_page, last_page, data)
+        self._collect = collect or (lambda pages: list(chain.from_iterable(pages)))
+        self._result = None
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        with self._process:
+            self._result = self._collect(iter_pdftotext_pages(self._process.stdout))
+
+    def result(self):
+        """Wait for the end of the conversion and return its result."""
+        self._reader.join()
+        return self._result
+
+    def cancel(self):
+        self._process.kill()
+        self._reader.join()
+
+
+def open_pdf(fpath):
+    """Return a PdfReader of a PDF file, given by its path or as a binary
+    stream, or None if it can't be read."""
+    try:
+        reader = PdfReader(fpath, strict=False)
+        # make sure that the page tree can be read
+        len(reader.pages)
+    except Exception:
+        LOGGER.debug("could not read %s", fpath, exc_info=True)
+        return None
+    return reader
+
+
+def stream_PDF_to_plaintext_with_pypdf(
+    fpath, keep_layout=False, first_page=None, last_page=None, reader=None, data=None
+):
+    """Convert PDF to txt in-process using pypdf, yielding each page as soon
+    as it has been converted.
+
+    The pages have the structure of the ones of stream_PDF_to_plaintext:
+    lines ending with a newline, followed by a page-break line.
+    @param reader: (PdfReader) of the file, if it is already open.
+    @param data: (bytes-like) the PDF, to read instead of the file at
+     ``fpath``.
+    @return: (generator) of lists of unicode strings, one list per page.
+    """
+    if reader is None:
+        reader = PdfReader(fpath if data is None else io.BytesIO(data), strict=False)
+    extraction_mode = "layout" if keep_layout else "plain"
+    pages = reader.pages[(first_page or 1) - 1 : last_page or len(reader.pages)]
+    for page in pages:
+        try:
+            text = page.extract_text(extraction_mode=extraction_mode)
+        except Exception:
+            LOGGER.debug("could not extract the text of a page", exc_info=True)
+            text = ""
+        text = text.replace("\f", "\n")
+        yield ["%s\n" % line for line in text.splitlines()] + ["\f"]
+
+
+# Ways of converting a PDF to plaintext, by name. Each is called like
+# stream_PDF_to_plaintext, with either the path or the data of the PDF, and
+# yields the pages of the document.
+PDF_TEXT_BACKENDS = {
+    "pdftotext": stream_PDF_to_plaintext,
+    "pypdf": stream_PDF_to_plaintext_with_pypdf,
+}
+
+
+def get_pdf_text_backend(name):
+    """Return the PDF to plaintext conversion registered under ``name``."""
+    try:
+        return PDF_TEXT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            "Unknown PDF text backend %r, expected one of: %s"
+            % (name, ", ".join(sorted(PDF_TEXT_BACKENDS)))
+        ) from None
@@ -1,29 +1,39 @@
 import logging
 
 from refextract.references.api import (
-    extract_journal_reference,
+    extract_journal_references,
+    extract_references_from_raw_references,
     extract_references_from_string,
     extract_references_from_url,
 )
+from refextract.references.kbs import KbSet
 
 LOGGER = logging.getLogger(__name__)
 
 
+def _get_journal_kbs(journal_kb_data):
+    if isinstance(journal_kb_data, KbSet):
+        return journal_kb_data
+    return {"journals": journal_kb_data}
+
+
 def extract_journal_info(publication_infos, journal_kb_data):
     extracted_publication_infos = []
-    journal_dict = {"journals": journal_kb_data}
+    journal_dict = _get_journal_kbs(journal_kb_data)
+    pubinfo_freetexts = [
+        publication_info.get("pubinfo_freetext")
+        for publication_info in publication_infos
+    ]
     try:
-        for publication_info in publication_infos:
-            if not publication_info.get("pubinfo_freetext"):
-                extracted_publication_infos.append({})
-                continue
-            extracted_publication_info = extract_journal_reference(
-                publication_info["pubinfo_freetext"],
+        journal_references = iter(
+            extract_journal_references(
+                [freetext for freetext in pubinfo_freetexts if freetext],
                 override_kbs_files=journal_dict,
             )
-            if not extracted_publication_info:
-                extracted_publication_info = {}
-            extracted_publication_infos.append(extracted_publication_info)
+        )
+        for freetext in pubinfo_freetexts:
+            extracted_publication_info = next(journal_references) if freetext else None
+            extracted_publication_infos.append(extracted_publication_info or {})
     except Exception as e:
         LOGGER.error(f"Failed to extract publication info data. Reason: {str(e)}")
         return None
@@ -31,7 +41,7 @@ def extract_journal_info(publication_infos, journal_kb_data):
 
 
 def extract_references_from_text(text, journal_kb_data):
-    journal_dict = {"journals": journal_kb_data}
+    journal_dict = _get_journal_kbs(journal_kb_data)
     try:
         extracted_references = extract_references_from_string(
             text,
@@ -45,7 +55,7 @@ def extract_references_from_text(text, journal_kb_data):
 
 
 def extract_references_from_file_url(url, journal_kb_data):
-    journal_dict = {"journals": journal_kb_data}
+    journal_dict = _get_journal_kbs(journal_kb_data)
     try:
         extracted_references = extract_references_from_url(
             url,
@@ -61,20 +71,20 @@ def extract_references_from_file_url(url, journal_kb_data):
 
 
 def extract_references_from_list(raw_references, journal_kb_data):
-    journal_dict = {"journals": journal_kb_data}
+    journal_dict = _get_journal_kbs(journal_kb_data)
     extracted_references = []
-    for reference in raw_references:
-        try:
-            extracted_reference = extract_references_from_string(
-                reference,
-                override_kbs_files=journal_dict,
-                reference_format="{title},{volume},{page}",
+    for result in extract_references_from_raw_references(
+        raw_references,
+        override_kbs_files=journal_dict,
+        reference_format="{title},{volume},{page}",
+    ):
+        if result.error is not None:
+            LOGGER.error(
+                f"Failed to extract reference: {result.raw_ref}. "
+                f"Reason: {str(result.error)}"
             )
-            if extracted_reference:
-                extracted_references.append(extracted_reference[0])
-            else:
-                extracted_references.append({"raw_ref": [reference]})
-        except Exception as e:
-            LOGGER.error(f"Failed to extract reference: {reference}. Reason: {str(e)}")
-            extracted_references.append({"raw_ref": [reference]})
+        if result.references:
+            extracted_references.append(result.references[0])
+        else:
+            extracted_references.append({"raw_ref": [result.raw_ref]})
     return {"extracted_references": extracted_references}
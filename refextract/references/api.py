@@ -23,44 +23,77 @@
 
 """This is where all the public API calls are accessible to extract references.
 
-There are 4 API functions available to extract from PDF file, string or URL. In
-addition, there is an API call to return a parsed journal reference structure
-from a raw string.
+There are API functions available to extract from a PDF file, bytes, a file
+object, a string or an URL. In addition, there is an API call to return a
+parsed journal reference structure from a raw string.
 """
 
+import gc
+import logging
 import os
-from tempfile import mkstemp
+import pickle
+from collections import deque, namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from copy import deepcopy
+from functools import partial
+from itertools import islice
 
-import magic
-import requests
 from inspire_utils.dedupers import dedupe_list
 
+from refextract.authors.regexs import get_author_regexps
+from refextract.references.config import (
+    CFG_REFEXTRACT_PARSE_WORKERS,
+    CFG_REFEXTRACT_TAIL_PAGES,
+    CFG_REFEXTRACT_TEXT_BACKEND,
+)
+from refextract.references.download import get_default_downloader
 from refextract.references.engine import (
+    FullTextDocument,
     get_kbs,
-    get_plaintext_document_body,
+    get_parse_pool,
+    get_reference_lines_from_document,
+    is_parsed_in_parallel,
+    parse_journal_reference_line,
     parse_reference_line,
     parse_references,
+    parse_references_elements,
 )
 from refextract.references.errors import FullTextNotAvailableError
 from refextract.references.find import (
     find_numeration_in_body,
     get_reference_section_beginning,
 )
+from refextract.references.kbs import KbSet, register_kbs  # noqa: F401
 from refextract.references.pdf import extract_texkeys_and_urls_from_pdf
-from refextract.references.record import update_reference_with_urls
+from refextract.references.record import (
+    build_references,
+    update_reference_with_urls,
+)
 from refextract.references.text import (
     extract_references_from_fulltext,
+    join_reference_line,
     rebuild_reference_lines,
 )
 
+LOGGER = logging.getLogger(__name__)
+
 
-def extract_references_from_url(url, headers=None, chunk_size=1024, **kwargs):
+def extract_references_from_url(
+    url, headers=None, chunk_size=None, downloader=None, **kwargs
+):
     """Extract references from the pdf specified in the url.
 
     The first parameter is the URL of the file.
     It returns a list of parsed references.
 
     It raises FullTextNotAvailableError if the URL gives a 404,
+    DocumentTooLargeError if the document is larger than the maximum size,
     UnknownDocumentTypeError if it is not a PDF or plain text.
 
     The standard reference format is: {title} {volume} ({year}) {page}.
@@ -78,25 +111,34 @@ def extract_references_from_url(url, headers=None, chunk_size=1024, **kwargs):
     >>> extract_references_from_url(path,
                                     override_kbs_files={'journals': 'my/path/to.kb'})
 
-    """
-    # Get temporary filepath to download to
-    filename, filepath = mkstemp(
-        suffix="_{0}".format(os.path.basename(url)),
-    )
-    os.close(filename)
+    KBs which are used for many documents can be loaded once with
+    ``register_kbs``; the returned set, or the name it was registered under,
+    can then be given as ``override_kbs_files``:
 
-    try:
-        req = requests.get(url=url, headers=headers, stream=True)
-        req.raise_for_status()
-        with open(filepath, "wb") as f:
-            for chunk in req.iter_content(chunk_size):
-                f.write(chunk)
-        references = extract_references_from_file(filepath, **kwargs)
-    except requests.exceptions.HTTPError as exc:
-        raise FullTextNotAvailableError(f"URL not found: '{url}'") from exc
-    finally:
-        os.remove(filepath)
-    return references
+    >>> register_kbs('inspire', {'journals': 'my/path/to.kb'})
+    >>> extract_references_from_url(path, override_kbs_files='inspire')
+
+    References which are common to many documents can be parsed only once
+    by sharing a cache of the parsed lines between calls:
+
+    >>> from refextract.references.cache import ParseCache
+    >>> cache = ParseCache()
+    >>> extract_references_from_url(path, parse_cache=cache)
+
+    Documents are downloaded with a Downloader shared by all the calls,
+    which reuses the connections to each host and bounds the time and the
+    size of the downloads. Another one, e.g. keeping the documents in a
+    cache directory, can be given as ``downloader``:
+
+    >>> from refextract.references.download import Downloader
+    >>> downloader = Downloader(cache_dir='/tmp/refextract', read_timeout=30)
+    >>> extract_references_from_url(path, downloader=downloader)
+
+    """
+    if downloader is None:
+        downloader = get_default_downloader()
+    data = downloader.get(url, headers=headers, chunk_size=chunk_size)
+    return extract_references_from_bytes(data, **kwargs)
 
 
 def extract_references_from_file(
@@ -105,6 +147,10 @@ def extract_references_from_file(
     reference_format="{title} {volume} ({year}) {page}",
     linker_callback=None,
     override_kbs_files=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
+    tail_pages=CFG_REFEXTRACT_TAIL_PAGES,
+    text_backend=CFG_REFEXTRACT_TEXT_BACKEND,
 ):
     """Extract references from a local pdf file.
 
@@ -128,42 +174,326 @@ def extract_references_from_file(
     >>> extract_references_from_file(path,
                                      override_kbs_files={'journals': 'my/path/to.kb'})
 
+    KBs which are used for many documents can be loaded once with
+    ``register_kbs``; the returned set, or the name it was registered under,
+    can then be given as ``override_kbs_files``:
+
+    >>> register_kbs('inspire', {'journals': 'my/path/to.kb'})
+    >>> extract_references_from_file(path, override_kbs_files='inspire')
+
+    References which are common to many documents can be parsed only once
+    by sharing a cache of the parsed lines between calls:
+
+    >>> from refextract.references.cache import ParseCache
+    >>> cache = ParseCache()
+    >>> extract_references_from_file(path, parse_cache=cache)
+
+    The reference lines of documents with very long reference sections can
+    be parsed by several processes, with ``parse_workers``:
+
+    >>> extract_references_from_file(path, parse_workers=4)
+
+    The reference section is usually at the end of the document. With
+    ``tail_pages``, only the last pages of a PDF are converted, more being
+    added only if no reference section title is found in them:
+
+    >>> extract_references_from_file(path, tail_pages=10)
+
+    PDFs are converted to text with pdftotext. To convert them in-process
+    instead, without starting a pdftotext subprocess, use ``text_backend``:
+
+    >>> extract_references_from_file(path, text_backend='pypdf')
+
     """
     if not os.path.isfile(path):
         raise FullTextNotAvailableError("File not found: '{0}'".format(path))
 
-    docbody = get_plaintext_document_body(path)
-    reflines, dummy, dummy = extract_references_from_fulltext(docbody)
-    if not reflines:
-        docbody = get_plaintext_document_body(path, keep_layout=True)
-        reflines, dummy, dummy = extract_references_from_fulltext(docbody)
+    return _extract_references_from_document(
+        FullTextDocument(path),
+        recid=recid,
+        reference_format=reference_format,
+        linker_callback=linker_callback,
+        override_kbs_files=override_kbs_files,
+        parse_cache=parse_cache,
+        parse_workers=parse_workers,
+        tail_pages=tail_pages,
+        text_backend=text_backend,
+    )
 
-    parsed_refs, stats = parse_references(
-        reflines,
+
+def extract_references_from_bytes(
+    data,
+    recid=None,
+    reference_format="{title} {volume} ({year}) {page}",
+    linker_callback=None,
+    override_kbs_files=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
+    tail_pages=CFG_REFEXTRACT_TAIL_PAGES,
+    text_backend=CFG_REFEXTRACT_TEXT_BACKEND,
+):
+    """Extract references from a pdf or plain text document in memory.
+
+    The first parameter is the content of the document, as bytes or any
+    other bytes-like object.
+    It returns a list of parsed references.
+    It raises UnknownDocumentTypeError if it is not a PDF or plain text.
+
+    Nothing is written to disk: pdftotext reads the PDF from its standard
+    input. The other parameters are the ones of extract_references_from_file.
+
+    >>> with open(path, 'rb') as f:
+    ...     extract_references_from_bytes(f.read())
+
+    """
+    return _extract_references_from_document(
+        FullTextDocument(data=data),
         recid=recid,
         reference_format=reference_format,
         linker_callback=linker_callback,
         override_kbs_files=override_kbs_files,
+        parse_cache=parse_cache,
+        parse_workers=parse_workers,
+        tail_pages=tail_pages,
+        text_backend=text_backend,
     )
 
-    if magic.from_file(path, mime=True) == "application/pdf":
-        extracted_texkeys_urls = extract_texkeys_and_urls_from_pdf(path)
-        if len(extracted_texkeys_urls) == len(parsed_refs):
-            parsed_refs_updated = []
-            for ref, ref_texkey_urls in zip(
-                parsed_refs, extracted_texkeys_urls, strict=False
-            ):
-                update_reference_with_urls(ref, ref_texkey_urls.get("urls", []))
-                if ref.get("url"):
-                    ref["url"] = dedupe_list(ref["url"])
-                parsed_refs_updated.append(
-                    dict(ref, texkey=[ref_texkey_urls["texkey"]])
-                )
-
-            return parsed_refs_updated
+
+def extract_references_from_fileobj(fileobj, **kwargs):
+    """Extract references from a pdf or plain text document read from a
+    binary file-like object, e.g. an uploaded file.
+
+    The first parameter is the file object, which is read until its end.
+    It returns a list of parsed references.
+    It raises UnknownDocumentTypeError if it is not a PDF or plain text.
+
+    The other parameters are the ones of extract_references_from_file.
+
+    >>> extract_references_from_fileobj(request.files['pdf'])
+
+    """
+    return extract_references_from_bytes(fileobj.read(), **kwargs)
+
+
+# Outcome of the extraction of one document of a batch: either the list of
+# its parsed references, or the exception raised while extracting them.
+ExtractionResult = namedtuple("ExtractionResult", ["path", "references", "error"])
+
+
+def extract_references_from_files(
+    paths, max_workers=None, chunksize=1, override_kbs_files=None, **kwargs
+):
+    """Extract references from many local pdf files in a pool of processes.
+
+    The first parameter is an iterable of paths, which is consumed as the
+    work progresses. It yields an ExtractionResult for every file, in the
+    order in which their extraction completes. A file which can't be
+    processed gives a result with the ``error`` raised for it, and the
+    others carry on: if one kills its worker process, its error is a
+    BrokenProcessPool, and the files which were in flight with it are
+    extracted again in a new pool.
+
+    The KBs are loaded once, before the workers are started, which inherit
+    them (with the default "fork" start method). ``max_workers`` processes
+    (by default one per CPU) are given ``chunksize`` files at a time. The
+    other parameters are the ones of extract_references_from_file. They are
+    sent to the workers, so they must be picklable: a ``linker_callback``
+    must be a module-level function, for instance. Each worker gets its own
+    copy of a ``ParseCache``, while a ``SqliteParseCache`` is shared by all
+    of them. It raises ValueError if the parameters can't be pickled.
+
+    >>> for result in extract_references_from_files(paths, max_workers=8):
+    ...     if result.error is None:
+    ...         store(result.path, result.references)
+
+    """
+    try:
+        pickle.dumps(kwargs)
+    except Exception as exc:
+        # otherwise, every file would fail with this error
+        raise ValueError(
+            "The parameters of the extraction can't be sent to the worker "
+            "processes: %s" % exc
+        ) from exc
+    kbs = get_kbs(custom_kbs=override_kbs_files)
+    if not isinstance(kbs, KbSet):
+        kbs = KbSet("batch", kbs)
+    # the author regexps are compiled on first use, which takes seconds:
+    # compile them before the workers are forked, so they inherit them too
+    get_author_regexps()
+    max_workers = max_workers or os.cpu_count() or 1
+    paths = iter(paths)
+    chunks = iter(lambda: list(islice(paths, chunksize)), [])
+
+    def start_executor():
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(kbs, kwargs),
+        )
+
+    executor = start_executor()
+    pending = {}
+    # the paths which were in flight when a worker died: they are extracted
+    # again one at a time, to tell the one which kills its worker
+    suspects = deque()
+    try:
+        while True:
+            if suspects:
+                path = suspects.popleft()
+                future = executor.submit(_extract_references_from_chunk, [path])
+                try:
+                    yield from future.result()
+                except BrokenProcessPool as exc:
+                    yield ExtractionResult(path, None, exc)
+                    executor.shutdown()
+                    executor = start_executor()
+                except Exception as exc:
+                    yield ExtractionResult(path, None, exc)
+                continue
+            # enough chunks are queued to keep the workers busy, without
+            # reading all the paths beforehand
+            for chunk in islice(chunks, 2 * max_workers - len(pending)):
+                future = executor.submit(_extract_references_from_chunk, chunk)
+                pending[future] = chunk
+            if not pending:
+                break
+            done, dummy = wait(pending, return_when=FIRST_COMPLETED)
+            broken = any(
+                isinstance(future.exception(), BrokenProcessPool) for future in done
+            )
+            if broken:
+                # all the chunks in flight fail along with the dead worker
+                done, dummy = wait(pending)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    yield from future.result()
+                except BrokenProcessPool:
+                    suspects.extend(chunk)
+                except Exception as exc:
+                    # e.g. a result couldn't be pickled
+                    for path in chunk:
+                        yield ExtractionResult(path, None, exc)
+            if broken:
+                executor.shutdown()
+                executor = start_executor()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+# Set of KBs and parameters of the extractions of the batch worker processes
+_batch_kbs = None
+_batch_kwargs = None
+
+
+def _init_batch_worker(kbs, kwargs):
+    global _batch_kbs, _batch_kwargs
+    _batch_kbs = kbs
+    # given once to each worker, so that a ParseCache lasts for all its files
+    _batch_kwargs = kwargs
+    # the objects inherited from the parent process, the KBs in particular,
+    # are never collected: keep the garbage collector from touching (and
+    # thus copying) their memory
+    gc.freeze()
+
+
+def _extract_references_from_chunk(paths):
+    results = []
+    for path in paths:
+        try:
+            references = extract_references_from_file(
+                path, override_kbs_files=_batch_kbs, **_batch_kwargs
+            )
+        except Exception as exc:
+            LOGGER.debug("Extraction failed for %s: %r", path, exc)
+            results.append(ExtractionResult(path, None, exc))
+        else:
+            results.append(ExtractionResult(path, references, None))
+    return results
+
+
+def _extract_references_from_document(
+    document,
+    recid=None,
+    reference_format="{title} {volume} ({year}) {page}",
+    linker_callback=None,
+    override_kbs_files=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
+    tail_pages=CFG_REFEXTRACT_TAIL_PAGES,
+    text_backend=CFG_REFEXTRACT_TEXT_BACKEND,
+    executor=None,
+):
+    """Extract the references of a FullTextDocument, merging the texkeys
+    and urls of its PDF into them.
+
+    The references are parsed in ``executor``, or in the calling thread if
+    it is None. The other parameters are the ones of
+    extract_references_from_file.
+    """
+    texkeys_urls = None
+    with ThreadPoolExecutor(max_workers=1) as texkeys_executor:
+        if document.pdf_reader is not None and text_backend == "pdftotext":
+            # pypdf reads the texkeys while pdftotext converts the text; the
+            # reader can't be shared with the pypdf backend at the same time
+            texkeys_urls = texkeys_executor.submit(
+                extract_texkeys_and_urls_from_pdf,
+                document.path,
+                reader=document.pdf_reader,
+            )
+        reflines = get_reference_lines_from_document(
+            document, tail_pages=tail_pages, text_backend=text_backend
+        )
+
+        if texkeys_urls is not None and is_parsed_in_parallel(reflines, parse_workers):
+            kbs = get_kbs(custom_kbs=override_kbs_files)
+            if get_parse_pool(kbs, parse_workers, create=False) is None:
+                # the pool of parsing processes is about to be forked: not
+                # while the thread reading the texkeys runs
+                texkeys_executor.shutdown()
+        parse = partial(
+            parse_references,
+            reflines,
+            recid=recid,
+            reference_format=reference_format,
+            linker_callback=linker_callback,
+            override_kbs_files=override_kbs_files,
+            parse_cache=parse_cache,
+            parse_workers=parse_workers,
+        )
+        if executor is None:
+            parsed_refs, stats = parse()
+        else:
+            parsed_refs, stats = executor.submit(parse).result()
+
+    if document.pdf_reader is not None:
+        if texkeys_urls is None:
+            extracted_texkeys_urls = extract_texkeys_and_urls_from_pdf(
+                document.path, reader=document.pdf_reader
+            )
+        else:
+            extracted_texkeys_urls = texkeys_urls.result()
+        return _add_texkeys_and_urls(parsed_refs, extracted_texkeys_urls)
     return parsed_refs
 
 
+def _add_texkeys_and_urls(parsed_refs, extracted_texkeys_urls):
+    """Add the texkeys and urls found in a PDF to its parsed references, if
+    there is one set of them per reference."""
+    if len(extracted_texkeys_urls) != len(parsed_refs):
+        return parsed_refs
+    parsed_refs_updated = []
+    for ref, ref_texkey_urls in zip(parsed_refs, extracted_texkeys_urls, strict=False):
+        update_reference_with_urls(ref, ref_texkey_urls.get("urls", []))
+        if ref.get("url"):
+            ref["url"] = dedupe_list(ref["url"])
+        parsed_refs_updated.append(dict(ref, texkey=[ref_texkey_urls["texkey"]]))
+    return parsed_refs_updated
+
+
 def extract_references_from_string(
     source,
     is_only_references=True,
@@ -171,6 +501,8 @@ def extract_references_from_string(
     reference_format="{title} {volume} ({year}) {page}",
     linker_callback=None,
     override_kbs_files=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
 ):
     """Extract references from a raw string.
 
@@ -194,6 +526,20 @@ def extract_references_from_string(
 
     >>> extract_references_from_string(path,
         override_kbs_files={'journals': 'my/path/to.kb'})
+
+    KBs which are used for many documents can be loaded once with
+    ``register_kbs``; the returned set, or the name it was registered under,
+    can then be given as ``override_kbs_files``:
+
+    >>> register_kbs('inspire', {'journals': 'my/path/to.kb'})
+    >>> extract_references_from_string(path, override_kbs_files='inspire')
+
+    References which are common to many documents can be parsed only once
+    by sharing a cache of the parsed lines between calls:
+
+    >>> from refextract.references.cache import ParseCache
+    >>> cache = ParseCache()
+    >>> extract_references_from_string(path, parse_cache=cache)
     """
     docbody = source.split("\n")
     if not is_only_references:
@@ -212,15 +558,98 @@ def extract_references_from_string(
         reference_format=reference_format,
         linker_callback=linker_callback,
         override_kbs_files=override_kbs_files,
+        parse_cache=parse_cache,
+        parse_workers=parse_workers,
     )
     return parsed_refs
 
 
+# Outcome of the parsing of one reference of a list: the references parsed
+# from it, as a reference string can hold several, or the exception raised
+# while parsing it.
+ReferenceResult = namedtuple("ReferenceResult", ["raw_ref", "references", "error"])
+
+
+def extract_references_from_raw_references(
+    raw_references,
+    reference_format="{title} {volume} ({year}) {page}",
+    linker_callback=None,
+    override_kbs_files=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
+):
+    """Extract references from a list of strings which are each a reference.
+
+    Unlike extract_references_from_string, no reference section or line
+    markers are looked for: every string is parsed as a single reference
+    line, its own lines being joined, and the KBs are looked up once for the
+    whole list. It returns a list with a ReferenceResult for every string,
+    in the same order. A string which can't be parsed gives a result with
+    the ``error`` raised for it, and the others are still parsed.
+
+    The other parameters are the ones of extract_references_from_string.
+
+    >>> raw_references = ['[1] Phys.Rev. 1 (2000) 2', '[2] Phys.Lett. 3 (2001) 4']
+    >>> for result in extract_references_from_raw_references(raw_references):
+    ...     print(result.raw_ref, result.references)
+
+    """
+    raw_references = list(raw_references)
+    kbs = get_kbs(custom_kbs=override_kbs_files)
+    reflines = []
+    for raw_ref in raw_references:
+        try:
+            reflines.append((join_reference_line(raw_ref.split("\n")), None))
+        except Exception as exc:
+            # e.g. not a string
+            reflines.append((None, exc))
+    parsed = iter(
+        _parse_reference_lines(
+            [refline for refline, error in reflines if refline],
+            kbs,
+            linker_callback,
+            parse_cache,
+            parse_workers,
+        )
+    )
+    results = []
+    for raw_ref, (refline, error) in zip(raw_references, reflines, strict=True):
+        citation = None
+        if refline:
+            citation, error = next(parsed)
+        references = None
+        if error is None and citation is None:
+            references = []
+        elif error is None:
+            try:
+                references = build_references([citation], reference_format)
+            except Exception as exc:
+                error = exc
+        results.append(ReferenceResult(raw_ref, references, error))
+    return results
+
+
+def _parse_reference_lines(reflines, kbs, linker_callback, parse_cache, parse_workers):
+    """Return a (citation, error) pair for every reference line.
+
+    Each line is parsed, and linked, once: a line which fails doesn't stop
+    the others, and an error outside of the lines is given to all of them."""
+    errors = {}
+    try:
+        citations, dummy, dummy = parse_references_elements(
+            reflines, kbs, linker_callback, parse_cache, parse_workers, errors=errors
+        )
+    except Exception as exc:
+        return [(None, exc)] * len(reflines)
+    return [(citation, errors.get(index)) for index, citation in enumerate(citations)]
+
+
 def extract_journal_reference(line, override_kbs_files=None):
     """Extract the journal reference from string.
 
     Extracts the journal reference from string and parses for specific
-    journal information.
+    journal information. ``override_kbs_files`` can be a dictionary of KBs
+    or a set of KBs (or its name) registered with ``register_kbs``.
     """
     kbs = get_kbs(custom_kbs=override_kbs_files)
     references, dummy_m, dummy_c, dummy_co = parse_reference_line(line, kbs)
@@ -229,3 +658,37 @@ def extract_journal_reference(line, override_kbs_files=None):
         for el in elements:
             if el["type"] == "JOURNAL":
                 return el
+
+
+def extract_journal_references(lines, override_kbs_files=None):
+    """Extract the journal reference from each string of a list.
+
+    Returns a list with, for each string of ``lines``, its journal reference
+    as returned by ``extract_journal_reference``, or None if it has none.
+    The KBs are looked up once for the whole list, and strings which appear
+    several times in it are only parsed once.
+
+    Only the journal references are looked for, which is about twice as
+    fast as parsing the whole lines: no authors, collaborations or books
+    are identified. Therefore, text which ``extract_journal_reference``
+    recognises as authors remains in the ``misc_txt`` of the references.
+    ``override_kbs_files`` is the same as in ``extract_journal_reference``.
+    """
+    kbs = get_kbs(custom_kbs=override_kbs_files)
+    journal_references = {}
+    results = []
+    for line in lines:
+        if line in journal_references:
+            results.append(deepcopy(journal_references[line]))
+            continue
+        journal_reference = next(
+            (
+                el
+                for el in parse_journal_reference_line(line, kbs)
+                if el["type"] == "JOURNAL"
+            ),
+            None,
+        )
+        journal_references[line] = journal_reference
+        results.append(journal_reference)
+    return results
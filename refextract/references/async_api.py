@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Asyncio front-end to the API extracting references.
+
+The extraction functions of refextract.references.api block while
+documents are downloaded and converted by pdftotext, and while the
+references are parsed. AsyncReferenceExtractor runs these steps out of the
+event loop, so that a single process can keep many documents in flight:
+
+>>> async with AsyncReferenceExtractor(max_concurrency=200) as extractor:
+...     references = await asyncio.gather(
+...         *(extractor.extract_references_from_url(url) for url in urls)
+...     )
+
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from refextract.documents.pdf import PdftotextProcesses, pdftotext_processes
+from refextract.references.api import (
+    _extract_references_from_document,
+    extract_journal_reference,
+    extract_references_from_string,
+)
+from refextract.references.config import (
+    CFG_REFEXTRACT_ASYNC_CONCURRENCY,
+    CFG_REFEXTRACT_PARSE_WORKERS,
+)
+from refextract.references.download import get_default_downloader
+from refextract.references.engine import FullTextDocument, get_kbs, get_parse_pool
+from refextract.references.errors import FullTextNotAvailableError
+
+
+class AsyncReferenceExtractor:
+    """Extracts references without blocking the event loop.
+
+    Downloads, and the conversions of PDFs, which mostly wait for the
+    network and for pdftotext, run in a pool of threads.
+    The parsing of the references, which is CPU-bound, runs in ``executor``
+    (in threads if it is None). With a ProcessPoolExecutor, the parameters
+    of the extractions must be picklable. Otherwise, the pool of processes
+    used with ``parse_workers`` must be started with get_parse_pool before
+    the extractions, as forking it from their threads would be unsafe:
+    they raise ValueError if it wasn't.
+
+    At most ``max_concurrency`` extractions run at the same time, the others
+    wait for their turn. When the task awaiting an extraction is cancelled,
+    the pdftotext processes it started are killed.
+
+    @param max_concurrency: maximum number of extractions running at once.
+    @param executor: executor of the parsing of the references.
+    @param downloader: Downloader of the documents, the shared one if None.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=CFG_REFEXTRACT_ASYNC_CONCURRENCY,
+        executor=None,
+        downloader=None,
+    ):
+        self.executor = executor
+        self.downloader = downloader or get_default_downloader()
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="refextract-io"
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the threads, once the running extractions are done."""
+        self._io_executor.shutdown(wait=False)
+
+    async def extract_references_from_url(self, url, headers=None, **kwargs):
+        """Download the document at ``url`` and extract its references.
+
+        The parameters are the ones of
+        refextract.references.api.extract_references_from_url.
+        """
+        self._check_parse_pool(kwargs)
+        async with self._semaphore:
+            data = await self._run_io(self.downloader.get, url, headers=headers)
+            document = await self._run_io(FullTextDocument, data=data)
+            return await self._extract_references_from_document(document, **kwargs)
+
+    async def extract_references_from_file(self, path, **kwargs):
+        """Extract the references of a local pdf or plain text file.
+
+        The parameters are the ones of
+        refextract.references.api.extract_references_from_file.
+        """
+        self._check_parse_pool(kwargs)
+        async with self._semaphore:
+            document = await self._run_io(_open_document, path)
+            return await self._extract_references_from_document(document, **kwargs)
+
+    async def extract_references_from_bytes(self, data, **kwargs):
+        """Extract the references of a pdf or plain text document in memory.
+
+        The parameters are the ones of
+        refextract.references.api.extract_references_from_bytes.
+        """
+        self._check_parse_pool(kwargs)
+        async with self._semaphore:
+            document = await self._run_io(FullTextDocument, data=data)
+            return await self._extract_references_from_document(document, **kwargs)
+
+    async def extract_references_from_string(self, source, **kwargs):
+        """Extract the references of a string.
+
+        The parameters are the ones of
+        refextract.references.api.extract_references_from_string.
+        """
+        self._check_parse_pool(kwargs)
+        async with self._semaphore:
+            return await self._run_cpu(extract_references_from_string, source, **kwargs)
+
+    async def extract_journal_reference(self, line, override_kbs_files=None):
+        """Extract the journal reference of a line, see
+        refextract.references.api.extract_journal_reference."""
+        async with self._semaphore:
+            return await self._run_cpu(
+                extract_journal_reference, line, override_kbs_files=override_kbs_files
+            )
+
+    async def _extract_references_from_document(self, document, **kwargs):
+        """Extract the references of a FullTextDocument in the I/O threads
+        (see refextract.references.api._extract_references_from_document),
+        parsing them in ``executor``."""
+        return await self._run_io(
+            _extract_references_from_document,
+            document,
+            executor=self.executor,
+            **kwargs,
+        )
+
+    def _check_parse_pool(self, kwargs):
+        """Raise ValueError if the references would be parsed with a pool
+        of processes which isn't started yet."""
+        parse_workers = kwargs.get("parse_workers", CFG_REFEXTRACT_PARSE_WORKERS)
+        if (
+            not parse_workers
+            or parse_workers <= 1
+            or isinstance(self.executor, ProcessPoolExecutor)
+        ):
+            return
+        kbs = get_kbs(custom_kbs=kwargs.get("override_kbs_files"))
+        if get_parse_pool(kbs, parse_workers, create=False) is None:
+            raise ValueError(
+                "Start the pool of %d parsing processes with get_parse_pool "
+                "before the extractions" % parse_workers
+            )
+
+    async def _run_io(self, func, *args, **kwargs):
+        """Run ``func`` in the I/O threads, killing the pdftotext processes
+        it started if the call is cancelled."""
+        processes = PdftotextProcesses()
+        context = contextvars.copy_context()
+        context.run(pdftotext_processes.set, processes)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._io_executor, partial(context.run, func, *args, **kwargs)
+            )
+        except asyncio.CancelledError:
+            # the thread itself can't be stopped, but it returns as soon as
+            # the output of pdftotext ends
+            processes.kill()
+            raise
+
+    async def _run_cpu(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+
+def _open_document(path):
+    if not os.path.isfile(path):
+        raise FullTextNotAvailableError("File not found: '{0}'".format(path))
+    return FullTextDocument(path)
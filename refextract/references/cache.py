@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Caches of parsed reference lines.
+
+The same reference string shows up in many documents, so the result of
+parsing it can be reused, as long as the KBs are the same. A cache is any
+object with the ``get(kbs, line)`` and ``set(kbs, line, parsed)`` methods of
+ParseCache. Results are stored pickled, so that every ``get`` returns a new
+copy which callers are free to modify.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from refextract.references.config import (
+    CFG_REFEXTRACT_PARSE_CACHE_MAX_BYTES,
+    CFG_REFEXTRACT_PARSE_CACHE_SIZE,
+)
+
+ParseCacheInfo = namedtuple(
+    "ParseCacheInfo", ["hits", "misses", "maxsize", "currsize", "nbytes"]
+)
+
+
+def get_parse_cache_key(kbs, line):
+    """Return the cache key of a (washed) reference line parsed with ``kbs``.
+
+    Returns None if the KBs have no fingerprint, in which case the result
+    cannot be cached.
+    """
+    fingerprint = getattr(kbs, "fingerprint", None)
+    if fingerprint is None:
+        return None
+    return hashlib.sha256(
+        ("%s\0%s" % (fingerprint, line)).encode("utf-8", "surrogatepass")
+    ).hexdigest()
+
+
+class ParseCache:
+    """In-process LRU cache of parsed reference lines.
+
+    It is bounded both by the number of lines and by the total size of the
+    pickled results. A pickled copy of the cache, e.g. in another process,
+    starts with the same entries but is independent of it.
+    """
+
+    def __init__(
+        self,
+        maxsize=CFG_REFEXTRACT_PARSE_CACHE_SIZE,
+        max_bytes=CFG_REFEXTRACT_PARSE_CACHE_MAX_BYTES,
+    ):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kbs, line):
+        """Return the cached result for the line, or None."""
+        key = get_parse_cache_key(kbs, line)
+        data = None if key is None else self._get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(data)
+
+    def set(self, kbs, line, parsed):
+        key = get_parse_cache_key(kbs, line)
+        if key is not None:
+            self._set(key, pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL))
+
+    def info(self):
+        with self._lock:
+            return ParseCacheInfo(
+                self.hits, self.misses, self.maxsize, len(self._entries), self.nbytes
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = 0
+
+    def __getstate__(self):
+        # locks can't be pickled, e.g. to send the cache to worker processes
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _set(self, key, data):
+        with self._lock:
+            if len(data) > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= len(previous)
+            self._entries[key] = data
+            self.nbytes += len(data)
+            while len(self._entries) > self.maxsize or self.nbytes > self.max_bytes:
+                _dummy_key, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+
+class SqliteParseCache(ParseCache):
+    """LRU cache of parsed reference lines stored in a sqlite database.
+
+    The database can be shared by several processes, e.g. the workers
+    extracting references from a batch of documents: the cache can be
+    pickled to be sent to them, and its copies open their own connections.
+
+    Reads don't write to the database as long as the line was last used
+    less than ``touch_interval`` seconds before, so the order of eviction is
+    only approximately the least recently used one.
+    """
+
+    def __init__(
+        self,
+        path,
+        maxsize=CFG_REFEXTRACT_PARSE_CACHE_SIZE,
+        max_bytes=CFG_REFEXTRACT_PARSE_CACHE_MAX_BYTES,
+        timeout=30,
+        touch_interval=60,
+    ):
+        super().__init__(maxsize=maxsize, max_bytes=max_bytes)
+        self.path = path
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        with self._connection() as connection:
+            # let the readers work while another process writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_lines ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS parsed_lines_last_used "
+                "ON parsed_lines (last_used)"
+            )
+            # the number and size of the lines, kept up to date by triggers,
+            # as counting them would read the whole table
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_lines_size ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "currsize INTEGER NOT NULL, nbytes INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO parsed_lines_size (id, currsize, nbytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM parsed_lines"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS parsed_lines_insert "
+                "AFTER INSERT ON parsed_lines BEGIN "
+                "UPDATE parsed_lines_size SET currsize = currsize + 1, "
+                "nbytes = nbytes + NEW.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS parsed_lines_delete "
+                "AFTER DELETE ON parsed_lines BEGIN "
+                "UPDATE parsed_lines_size SET currsize = currsize - 1, "
+                "nbytes = nbytes - OLD.size; END"
+            )
+
+    def info(self):
+        with self._connection() as connection:
+            currsize, nbytes = self._size(connection)
+        with self._lock:
+            return ParseCacheInfo(
+                self.hits, self.misses, self.maxsize, currsize, nbytes
+            )
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM parsed_lines")
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # the connections are opened again on first use
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite connections can't be shared between threads, nor with the
+        # processes forked after their creation
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            # losing the last writes on a crash is fine for a cache
+            connection.execute("PRAGMA synchronous=OFF")
+            # the lines replaced by an insertion are only counted out by the
+            # delete trigger with this
+            connection.execute("PRAGMA recursive_triggers=ON")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _get(self, key):
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT data, last_used FROM parsed_lines WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, last_used = row
+            now = time.time()
+            if now - last_used > self.touch_interval:
+                connection.execute(
+                    "UPDATE parsed_lines SET last_used = ? WHERE key = ?",
+                    (now, key),
+                )
+        return data
+
+    def _set(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO parsed_lines (key, data, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            currsize, nbytes = self._size(connection)
+            while currsize > self.maxsize or nbytes > self.max_bytes:
+                # evict at least a tenth of the entries, least recently used
+                # first, not to do this again on every insertion
+                evicted = max(1, currsize // 10, currsize - self.maxsize)
+                connection.execute(
+                    "DELETE FROM parsed_lines WHERE key IN (SELECT key FROM "
+                    "parsed_lines ORDER BY last_used LIMIT ?)",
+                    (evicted,),
+                )
+                currsize, nbytes = self._size(connection)
+
+    @staticmethod
+    def _size(connection):
+        return connection.execute(
+            "SELECT currsize, nbytes FROM parsed_lines_size"
+        ).fetchone()
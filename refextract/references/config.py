@@ -50,6 +50,100 @@ CFG_REFEXTRACT_KBS = {
     "special_journals": "%s/special-journals.kb" % CFG_KBS_DIR,
 }
 
+# Directory holding the pickled snapshots of the built KBs, keyed by the hash
+# of their source file (their regexps are compiled again when they are
+# loaded). Snapshots are neither read nor written when it is unset.
+CFG_REFEXTRACT_KBS_CACHE_DIR = os.environ.get("CFG_REFEXTRACT_KBS_CACHE_DIR")
+
+# Maximum number of loaded KBs kept in memory. Every KB type of every distinct
+# set of KBs used takes one slot.
+CFG_REFEXTRACT_KBS_CACHE_SIZE = int(os.environ.get("CFG_REFEXTRACT_KBS_CACHE_SIZE", 32))
+
+# Name of the backend converting PDFs to plaintext, see PDF_TEXT_BACKENDS
+# in refextract.documents.pdf: "pdftotext" runs CFG_PATH_PDFTOTEXT, "pypdf"
+# extracts the text in-process.
+CFG_REFEXTRACT_TEXT_BACKEND = os.environ.get("CFG_REFEXTRACT_TEXT_BACKEND", "pdftotext")
+
+# Number of pages, from the end of a PDF, which are converted first when
+# looking for its reference section. The converted part is extended towards
+# the beginning of the document until a reference section is found in it.
+# The whole document is converted at once when it is 0.
+CFG_REFEXTRACT_TAIL_PAGES = int(os.environ.get("CFG_REFEXTRACT_TAIL_PAGES", 0))
+
+# Whether the layout conversion of a PDF whose last page doesn't look like
+# references is started alongside its raw conversion, in case no references
+# are found in the raw one. Off by default: the raw conversion usually finds
+# the references anyway, and the layout one is then wasted work.
+CFG_REFEXTRACT_SPECULATIVE_LAYOUT = os.environ.get(
+    "CFG_REFEXTRACT_SPECULATIVE_LAYOUT", ""
+).lower() in ("1", "true", "yes")
+
+# Number of pages, from the end of a PDF, converted again keeping their
+# layout when no reference section title is found in its raw conversion.
+# The whole document is converted again when it is 0.
+CFG_REFEXTRACT_LAYOUT_TAIL_PAGES = int(
+    os.environ.get("CFG_REFEXTRACT_LAYOUT_TAIL_PAGES", 10)
+)
+
+# Number of pages at the end of a PDF which are kept in memory, in addition
+# to the ones starting at the last reference section title, while its
+# conversion is read. Earlier pages are dropped as soon as they have been
+# converted. The whole document is kept when it is 0.
+CFG_REFEXTRACT_PAGE_WINDOW = int(os.environ.get("CFG_REFEXTRACT_PAGE_WINDOW", 0))
+
+# Default bounds of the caches of parsed reference lines: maximum number of
+# lines, and maximum total size in bytes of the (pickled) results.
+CFG_REFEXTRACT_PARSE_CACHE_SIZE = int(
+    os.environ.get("CFG_REFEXTRACT_PARSE_CACHE_SIZE", 10000)
+)
+CFG_REFEXTRACT_PARSE_CACHE_MAX_BYTES = int(
+    os.environ.get("CFG_REFEXTRACT_PARSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+)
+
+# Number of processes among which the reference lines of a document are
+# shared out to be parsed, when there are at least
+# CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES of them. They are parsed one after
+# the other when it is 0 or 1.
+CFG_REFEXTRACT_PARSE_WORKERS = int(os.environ.get("CFG_REFEXTRACT_PARSE_WORKERS", 0))
+CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES = int(
+    os.environ.get("CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES", 500)
+)
+
+# Number of pools of parsing processes kept at once, one per set of KBs and
+# number of workers: e.g. the KBs of the tenants of a service.
+CFG_REFEXTRACT_PARSE_POOLS = int(os.environ.get("CFG_REFEXTRACT_PARSE_POOLS", 2))
+
+# Documents downloaded by extract_references_from_url: timeouts in seconds to
+# connect to the server and between two reads, maximum size in bytes (0 for
+# no limit), size of the buffers they are read with, and number of
+# connections kept open to each host.
+CFG_REFEXTRACT_DOWNLOAD_CONNECT_TIMEOUT = float(
+    os.environ.get("CFG_REFEXTRACT_DOWNLOAD_CONNECT_TIMEOUT", 10)
+)
+CFG_REFEXTRACT_DOWNLOAD_READ_TIMEOUT = float(
+    os.environ.get("CFG_REFEXTRACT_DOWNLOAD_READ_TIMEOUT", 60)
+)
+CFG_REFEXTRACT_DOWNLOAD_MAX_SIZE = (
+    int(os.environ.get("CFG_REFEXTRACT_DOWNLOAD_MAX_SIZE", 200 * 1024 * 1024)) or None
+)
+CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE = int(
+    os.environ.get("CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE", 64 * 1024)
+)
+CFG_REFEXTRACT_DOWNLOAD_POOL_SIZE = int(
+    os.environ.get("CFG_REFEXTRACT_DOWNLOAD_POOL_SIZE", 10)
+)
+
+# Maximum number of extractions run at the same time by an
+# AsyncReferenceExtractor.
+CFG_REFEXTRACT_ASYNC_CONCURRENCY = int(
+    os.environ.get("CFG_REFEXTRACT_ASYNC_CONCURRENCY", 100)
+)
+
+# Directory where downloaded documents are kept, to download them again only
+# if the server says they have changed (ETag or Last-Modified). Nothing is
+# kept when it is not set.
+CFG_REFEXTRACT_DOWNLOAD_CACHE_DIR = os.environ.get("CFG_REFEXTRACT_DOWNLOAD_CACHE_DIR")
+
 # Reference fields:
 CFG_REFEXTRACT_FIELDS = {
     "misc": "m",
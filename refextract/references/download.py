@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Download of full-text documents.
+
+A Downloader keeps a pool of connections to each host, so that the
+documents of a repository are fetched without a new TCP/TLS handshake each
+time. Downloads are bounded in time and in size. With a cache directory,
+documents are only downloaded again when the server says they have changed.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+from tempfile import mkstemp
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from refextract.references.config import (
+    CFG_REFEXTRACT_DOWNLOAD_CACHE_DIR,
+    CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+    CFG_REFEXTRACT_DOWNLOAD_CONNECT_TIMEOUT,
+    CFG_REFEXTRACT_DOWNLOAD_MAX_SIZE,
+    CFG_REFEXTRACT_DOWNLOAD_POOL_SIZE,
+    CFG_REFEXTRACT_DOWNLOAD_READ_TIMEOUT,
+)
+from refextract.references.errors import (
+    DocumentTooLargeError,
+    FullTextNotAvailableError,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Downloader:
+    """Downloads documents over a pooled ``requests.Session``.
+
+    @param connect_timeout: seconds to wait for a connection to the server.
+    @param read_timeout: seconds to wait between two bytes from the server.
+    @param max_size: maximum size of a document in bytes, None for no limit.
+    @param chunk_size: size of the buffers the documents are read with.
+    @param cache_dir: directory where documents are kept along with their
+     ETag and Last-Modified headers, to download them again only if they
+     have changed. They are cached separately for each set of request
+     headers. Nothing is cached when it is None.
+    @param pool_size: number of connections kept open to each host.
+    @param session: the requests.Session to use, a new one by default.
+    """
+
+    def __init__(
+        self,
+        connect_timeout=CFG_REFEXTRACT_DOWNLOAD_CONNECT_TIMEOUT,
+        read_timeout=CFG_REFEXTRACT_DOWNLOAD_READ_TIMEOUT,
+        max_size=CFG_REFEXTRACT_DOWNLOAD_MAX_SIZE,
+        chunk_size=CFG_REFEXTRACT_DOWNLOAD_CHUNK_SIZE,
+        cache_dir=CFG_REFEXTRACT_DOWNLOAD_CACHE_DIR,
+        pool_size=CFG_REFEXTRACT_DOWNLOAD_POOL_SIZE,
+        session=None,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the connections of the pool."""
+        self.session.close()
+
+    def get(self, url, headers=None, chunk_size=None):
+        """Return the content of the document at ``url``.
+
+        It raises FullTextNotAvailableError if the server answers with an
+        error, DocumentTooLargeError if the document, or its cached copy, is
+        larger than ``max_size``.
+        """
+        headers = dict(headers or {})
+        cache_path = self.get_cache_path(url, headers)
+        validators = read_cache_validators(cache_path) if cache_path else None
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            with self.session.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            ) as response:
+                if response.status_code == 304 and validators:
+                    data = read_cache_data(cache_path)
+                    if data is not None:
+                        LOGGER.debug("%s not modified, using the cached copy", url)
+                        self._check_size(url, len(data))
+                        return data
+                    # the cached copy vanished in the meantime
+                    return self.get(
+                        url,
+                        headers=headers_without_validators(headers),
+                        chunk_size=chunk_size,
+                    )
+                response.raise_for_status()
+                data = self._read(url, response, chunk_size or self.chunk_size)
+        except requests.exceptions.HTTPError as exc:
+            raise FullTextNotAvailableError(f"URL not found: '{url}'") from exc
+
+        if cache_path:
+            save_cache(
+                cache_path,
+                {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                },
+                data,
+            )
+        return data
+
+    def _read(self, url, response, chunk_size):
+        """Read the body of the response, enforcing ``max_size``."""
+        length = response.headers.get("Content-Length")
+        if length:
+            self._check_size(url, int(length))
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size):
+            data += chunk
+            self._check_size(url, len(data))
+        return bytes(data)
+
+    def _check_size(self, url, size):
+        if self.max_size is not None and size > self.max_size:
+            raise DocumentTooLargeError(
+                f"Document larger than {self.max_size} bytes: '{url}'"
+            )
+
+    def get_cache_path(self, url, headers=None):
+        """Return the path of the cached copy of ``url`` requested with
+        ``headers``, None without cache.
+
+        The headers (e.g. Accept or Authorization) may change the response,
+        so each set of them has its own copy.
+        """
+        if not self.cache_dir:
+            return None
+        headers = sorted(
+            (name.lower(), value)
+            for name, value in headers_without_validators(headers or {}).items()
+        )
+        key = json.dumps([url, headers])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "%s.download" % digest)
+
+
+def headers_without_validators(headers):
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in ("if-none-match", "if-modified-since")
+    }
+
+
+# A cached copy is a line of JSON with the validators of the document,
+# followed by its content, so that the validators are read without it.
+
+
+def read_cache_validators(cache_path):
+    """Return the validators of a cached copy, None if there is none."""
+    try:
+        with open(cache_path, "rb") as fh:
+            return json.loads(fh.readline())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        LOGGER.warning("Ignoring unreadable cached download %s", cache_path)
+        return None
+
+
+def read_cache_data(cache_path):
+    """Return the content of a cached copy, None if there is none."""
+    try:
+        with open(cache_path, "rb") as fh:
+            fh.readline()
+            return fh.read()
+    except OSError:
+        return None
+
+
+def save_cache(cache_path, validators, data):
+    """Atomically write a cached copy, if the server gave any validator."""
+    if not any(validators.values()):
+        return
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = mkstemp(dir=cache_dir, suffix=".tmp")
+    except OSError:
+        LOGGER.warning("Could not write cached download %s", cache_path)
+        return
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(json.dumps(validators).encode("utf-8") + b"\n")
+            fh.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        LOGGER.warning("Could not write cached download %s", cache_path)
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+
+_default_downloader = None
+_default_downloader_lock = threading.Lock()
+
+
+def get_default_downloader():
+    """Return the Downloader shared by the calls which are not given one."""
+    global _default_downloader
+    with _default_downloader_lock:
+        if _default_downloader is None:
+            _default_downloader = Downloader()
+        return _default_downloader
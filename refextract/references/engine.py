@@ -23,15 +23,27 @@
 
 """Main engine responsible for extracting references from PDF documents."""
 
+import io
 import logging
-import mmap
 import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import cached_property
+from itertools import chain
 
 import magic
 
-from refextract.documents.pdf import convert_PDF_to_plaintext
+from refextract.authors.regexs import get_author_regexps
+from refextract.documents.pdf import (
+    BackgroundPDFConversion,
+    convert_PDF_to_plaintext,
+    get_pdf_text_backend,
+    open_pdf,
+)
 from refextract.references.config import (
+    CFG_REFEXTRACT_LAYOUT_TAIL_PAGES,
     CFG_REFEXTRACT_MARKER_CLOSING_ARXIV,
     CFG_REFEXTRACT_MARKER_CLOSING_AUTHOR_ETAL,
     CFG_REFEXTRACT_MARKER_CLOSING_AUTHOR_INCL,
@@ -43,13 +55,23 @@ from refextract.references.config import (
     CFG_REFEXTRACT_MARKER_CLOSING_TITLE_IBID,
     CFG_REFEXTRACT_MARKER_CLOSING_VOLUME,
     CFG_REFEXTRACT_MARKER_CLOSING_YEAR,
+    CFG_REFEXTRACT_PAGE_WINDOW,
+    CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES,
+    CFG_REFEXTRACT_PARSE_POOLS,
+    CFG_REFEXTRACT_PARSE_WORKERS,
+    CFG_REFEXTRACT_SPECULATIVE_LAYOUT,
+    CFG_REFEXTRACT_TAIL_PAGES,
+    CFG_REFEXTRACT_TEXT_BACKEND,
 )
 from refextract.references.errors import UnknownDocumentTypeError
+from refextract.references.find import get_reference_section_beginning
 from refextract.references.kbs import get_kbs
 from refextract.references.record import build_references
 from refextract.references.regexs import (
     get_reference_line_numeration_marker_patterns,
+    get_reference_section_title_patterns,
     re_hdl,
+    re_non_alphanumeric,
     re_numeration_no_ibid_txt,
     re_recognised_numeration_title_plus_series,
     re_roman_numbers,
@@ -64,9 +86,13 @@ from refextract.references.tag import (
     identify_and_tag_DOI,
     identify_and_tag_URLs,
     sum_2_dictionaries,
+    tag_journal_reference_line,
     tag_reference_line,
 )
-from refextract.references.text import wash_and_repair_reference_line
+from refextract.references.text import (
+    extract_references_from_fulltext,
+    wash_and_repair_reference_line,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -228,8 +254,8 @@ def look_for_books(citation_elements, kbs):
 
     if title:
         normalized_title = title["title"].upper()
-        if normalized_title in kbs["books"]:
-            line = kbs["books"][normalized_title]
+        if normalized_title in kbs["books"].titles:
+            line = kbs["books"].titles[normalized_title]
             el = {
                 "type": "BOOK",
                 "misc_txt": "",
@@ -617,9 +643,22 @@ def parse_reference_line(ref_line, kbs, bad_titles_count=None, linker_callback=N
     @input a string representing a single reference bullet
     @output parsed references (a list of elements objects)
     """
-    # Strip the 'marker' (e.g. [1]) from this reference line:
     if bad_titles_count is None:
         bad_titles_count = {}
+    splitted_citations, line_marker, counts, bad_titles_count = split_reference_line(
+        ref_line, kbs, bad_titles_count, linker_callback
+    )
+    finish_reference_line(splitted_citations, line_marker, linker_callback)
+    return splitted_citations, line_marker, counts, bad_titles_count
+
+
+def split_reference_line(ref_line, kbs, bad_titles_count, linker_callback=None):
+    """Tag a reference line and split it into citations.
+
+    This is everything parse_reference_line does but the final linking and
+    clean-up of the citations (see finish_reference_line).
+    """
+    # Strip the 'marker' (e.g. [1]) from this reference line:
     line_marker, ref_line = remove_reference_line_marker(ref_line)
     # Find DOI sections in citation
     ref_line, identified_dois = identify_and_tag_DOI(ref_line)
@@ -667,6 +706,37 @@ def parse_reference_line(ref_line, kbs, bad_titles_count=None, linker_callback=N
     # Look for books in misc field
     look_for_undetected_books(splitted_citations, kbs)
 
+    return splitted_citations, line_marker, counts, bad_titles_count
+
+
+def parse_journal_reference_line(ref_line, kbs):
+    """Parse the journal references of a reference line.
+
+    Only the steps of split_reference_line the journal references depend
+    on are run: no authors, collaborations, publishers or books are looked
+    for, and the elements aren't split into citations.
+    @return: (list) of the elements of the line, in which the JOURNAL ones
+     are the same as in the citations of parse_reference_line.
+    """
+    line_marker, ref_line = remove_reference_line_marker(ref_line)
+    ref_line, identified_dois = identify_and_tag_DOI(ref_line)
+    ref_line, identified_urls = identify_and_tag_URLs(ref_line)
+    tagged_line = tag_journal_reference_line(ref_line, kbs)
+    citation_elements, line_marker, counts = parse_tagged_reference_line(
+        line_marker, tagged_line, identified_dois, identified_urls
+    )
+
+    split_volume_from_journal(citation_elements)
+    format_volume(citation_elements)
+    handle_special_journals(citation_elements, kbs)
+    format_hep(citation_elements)
+    remove_b_for_nucl_phys(citation_elements)
+    mangle_volume(citation_elements)
+    return citation_elements
+
+
+def finish_reference_line(splitted_citations, line_marker, linker_callback=None):
+    """Link the citations of a reference line and clean them up."""
     if linker_callback:
         # Link references with the newly added ibids/books information
         for citations in splitted_citations:
@@ -686,7 +756,7 @@ def parse_reference_line(ref_line, kbs, bad_titles_count=None, linker_callback=N
     # For debugging purposes
     print_citations(splitted_citations, line_marker)
 
-    return splitted_citations, line_marker, counts, bad_titles_count
+    return splitted_citations
 
 
 def year_from_citation(citation):
@@ -713,62 +783,69 @@ def search_for_book_in_misc(citation, kbs):
     citation_year = year_from_citation(citation)
     for citation_element in citation:
         LOGGER.debug("Searching for book title in: %s", citation_element["misc_txt"])
-        for title in kbs["books"]:
-            startIndex = find_substring_ignore_special_chars(
-                citation_element["misc_txt"], title
-            )
-            if startIndex != -1:
-                line = kbs["books"][title.upper()]
-                book_year = line[2].strip(";")
-                book_authors = line[0]
-                book_found = False
-                if citation_year == book_year:
-                    # For now consider the citation as valid, we are using
-                    # an exact search, we don't need to check the authors
-                    # However, the code below will be useful if we decide
-                    # to introduce fuzzy matching.
-                    book_found = True
-
-                    for author in get_possible_author_names(citation):
-                        if (
-                            find_substring_ignore_special_chars(book_authors, author)
-                            != -1
-                        ):
-                            book_found = True
-
-                    for author in re.findall("[a-zA-Z]{4,}", book_authors):
-                        if (
-                            find_substring_ignore_special_chars(
-                                citation_element["misc_txt"], author
-                            )
-                            != -1
-                        ):
-                            book_found = True
-
-                    if book_found:
-                        LOGGER.debug("Book found: %s", title)
-                        book_element = {
-                            "type": "BOOK",
-                            "misc_txt": "",
-                            "authors": book_authors,
-                            "title": line[1],
-                            "year": book_year,
-                        }
-                        citation.append(book_element)
-                        citation_element["misc_txt"] = cut_substring_with_special_chars(
-                            citation_element["misc_txt"], title, startIndex
-                        )
-                        # Remove year from misc txt
-                        citation_element["misc_txt"] = remove_year(
-                            citation_element["misc_txt"], book_year
+        for title in find_book_titles(citation_element["misc_txt"], kbs["books"]):
+            line = kbs["books"].titles[title]
+            book_year = line[2].strip(";")
+            book_authors = line[0]
+            book_found = False
+            if citation_year == book_year:
+                startIndex = find_substring_ignore_special_chars(
+                    citation_element["misc_txt"], title
+                )
+                # For now consider the citation as valid, we are using
+                # an exact search, we don't need to check the authors
+                # However, the code below will be useful if we decide
+                # to introduce fuzzy matching.
+                book_found = True
+
+                for author in get_possible_author_names(citation):
+                    if find_substring_ignore_special_chars(book_authors, author) != -1:
+                        book_found = True
+
+                for author in re.findall("[a-zA-Z]{4,}", book_authors):
+                    if (
+                        find_substring_ignore_special_chars(
+                            citation_element["misc_txt"], author
                         )
-                        return True
+                        != -1
+                    ):
+                        book_found = True
+
+                if book_found:
+                    LOGGER.debug("Book found: %s", title)
+                    book_element = {
+                        "type": "BOOK",
+                        "misc_txt": "",
+                        "authors": book_authors,
+                        "title": line[1],
+                        "year": book_year,
+                    }
+                    citation.append(book_element)
+                    citation_element["misc_txt"] = cut_substring_with_special_chars(
+                        citation_element["misc_txt"], title, startIndex
+                    )
+                    # Remove year from misc txt
+                    citation_element["misc_txt"] = remove_year(
+                        citation_element["misc_txt"], book_year
+                    )
+                    return True
 
         LOGGER.debug("Book not found!")
 
     return False
 
 
+def find_book_titles(text, kb_books):
+    """Return the titles of the books KB found in the text, ignoring
+    everything but letters and digits, in the order of the KB.
+    """
+    clean_text = re_non_alphanumeric.sub("", text.upper())
+    found_titles = list(kb_books.unindexed_titles)
+    for _dummy_start, _dummy_end, titles in kb_books.title_trie.finditer(clean_text):
+        found_titles.extend(titles)
+    return [title for _dummy_position, title in sorted(set(found_titles))]
+
+
 def get_possible_author_names(citation):
     for citation_element in citation:
         if citation_element["type"] == "AUTH":
@@ -827,11 +904,27 @@ def is_unknown_citation(citation):
     )
 
 
-def parse_references_elements(ref_sect, kbs, linker_callback=None):
+def parse_references_elements(
+    ref_sect,
+    kbs,
+    linker_callback=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
+    errors=None,
+):
     """Passed a complete reference section, process each line and attempt to
     ## identify and standardise individual citations within the line.
     @param ref_sect: (list) of strings - each string in the list is a
      reference line.
+    @param parse_cache: (ParseCache) - optional cache of the parsed lines,
+     shared between calls. The linker callback is still run on every line.
+    @param parse_workers: (int) - number of processes among which the lines
+     are shared out, when there are at least
+     CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES of them (see get_parse_pool).
+     The output is the same as when they are parsed one after the other.
+    @param errors: (dictionary) - if given, the exception raised by a line
+     is stored in it, keyed by the index of the line, and its citation is
+     None, instead of stopping the parsing of the other lines.
     @param preprint_repnum_search_kb: (dictionary) - keyed by a tuple
      containing the line-number of the pattern in the KB and the non-standard
      category string.  E.g.: (3, 'ASTRO PH'). Value is regexp pattern used to
@@ -879,13 +972,69 @@ def parse_references_elements(ref_sect, kbs, linker_callback=None):
 
     # Cleanup the reference lines
 
-    # process references line-by-line:
-    for ref_line in ref_sect:
-        clean_line = wash_and_repair_reference_line(ref_line)
+    if is_parsed_in_parallel(ref_sect, parse_workers):
+        try:
+            clean_lines = [wash_and_repair_reference_line(line) for line in ref_sect]
+            split_lines = split_reference_lines_in_parallel(
+                clean_lines, kbs, parse_workers, parse_cache
+            )
+        except Exception:
+            if errors is None:
+                raise
+            # no line has been linked yet: parse them one after the other to
+            # find the failing ones
+            LOGGER.debug("Parsing the references one at a time", exc_info=True)
+        else:
+            for index, (ref_line, split_line) in enumerate(
+                zip(ref_sect, split_lines, strict=True)
+            ):
+                citation_elements, line_marker, this_counts, line_bad_titles_count = (
+                    split_line
+                )
+                try:
+                    finish_reference_line(
+                        citation_elements, line_marker, linker_callback
+                    )
+                except Exception as exc:
+                    if errors is None:
+                        raise
+                    errors[index] = exc
+                    citations.append(None)
+                    continue
+                bad_titles_count = sum_2_dictionaries(
+                    bad_titles_count, line_bad_titles_count
+                )
+                counts = sum_2_dictionaries(counts, this_counts)
+                citations.append(
+                    {
+                        "elements": citation_elements,
+                        "line_marker": line_marker,
+                        "raw_ref": ref_line,
+                    }
+                )
+            return citations, counts, bad_titles_count
 
-        citation_elements, line_marker, this_counts, bad_titles_count = (
-            parse_reference_line(clean_line, kbs, bad_titles_count, linker_callback)
-        )
+    # process references line-by-line:
+    for index, ref_line in enumerate(ref_sect):
+        try:
+            clean_line = wash_and_repair_reference_line(ref_line)
+            if parse_cache is None:
+                citation_elements, line_marker, this_counts, line_bad_titles_count = (
+                    parse_reference_line(clean_line, kbs, {}, linker_callback)
+                )
+            else:
+                citation_elements, line_marker, this_counts, line_bad_titles_count = (
+                    parse_reference_line_with_cache(
+                        clean_line, kbs, parse_cache, linker_callback
+                    )
+                )
+        except Exception as exc:
+            if errors is None:
+                raise
+            errors[index] = exc
+            citations.append(None)
+            continue
+        bad_titles_count = sum_2_dictionaries(bad_titles_count, line_bad_titles_count)
 
         # Accumulate stats
         counts = sum_2_dictionaries(counts, this_counts)
@@ -902,6 +1051,137 @@ def parse_references_elements(ref_sect, kbs, linker_callback=None):
     return citations, counts, bad_titles_count
 
 
+def parse_reference_line_with_cache(ref_line, kbs, parse_cache, linker_callback=None):
+    """Parse one reference line, reusing the result cached for it, if any.
+
+    The citations are linked after they are taken from the cache, so the
+    cached result doesn't depend on the linker callback.
+    @return: (tuple) like parse_reference_line, but with the count of the
+     'bad titles' found in this line only.
+    """
+    cached = parse_cache.get(kbs, ref_line)
+    if cached is None:
+        cached = split_reference_line(ref_line, kbs, {})
+        # the cache keeps its own copy, this one can be modified
+        parse_cache.set(kbs, ref_line, cached)
+    splitted_citations, line_marker, counts, bad_titles_count = cached
+    finish_reference_line(splitted_citations, line_marker, linker_callback)
+    return splitted_citations, line_marker, counts, bad_titles_count
+
+
+def is_parsed_in_parallel(ref_sect, parse_workers):
+    """Whether parse_references_elements shares out the reference lines
+    among ``parse_workers`` processes."""
+    return bool(
+        parse_workers
+        and parse_workers > 1
+        and len(ref_sect) >= CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES
+    )
+
+
+def split_reference_lines_in_parallel(clean_lines, kbs, workers, parse_cache=None):
+    """Tag and split (see split_reference_line) the washed reference lines
+    in a pool of processes.
+
+    The lines are independent of each other: each one is split with its own
+    count of 'bad titles'. The lines are sent to the pool of get_parse_pool.
+    The lines found in the parse cache are not sent to it, and the others
+    are added to it.
+    @return: (list) of the results of split_reference_line, in the order of
+     the lines.
+    """
+    results = [None] * len(clean_lines)
+    if parse_cache is not None:
+        for index, line in enumerate(clean_lines):
+            results[index] = parse_cache.get(kbs, line)
+    missing = [index for index, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    chunk_size = -(-len(missing) // (workers * 4))
+    chunks = [
+        [clean_lines[index] for index in missing[start : start + chunk_size]]
+        for start in range(0, len(missing), chunk_size)
+    ]
+    with _parse_pool_lock:
+        # submitted at once, before another call can stop the pool
+        split_chunks = get_parse_pool(kbs, workers).map(_split_reference_lines, chunks)
+    split_lines = chain.from_iterable(split_chunks)
+    for index, split_line in zip(missing, split_lines, strict=True):
+        if parse_cache is not None:
+            parse_cache.set(kbs, clean_lines[index], split_line)
+        results[index] = split_line
+    return results
+
+
+# Pools of processes of split_reference_lines_in_parallel, with their KBs,
+# keyed by the fingerprint of the KBs and the number of workers, the least
+# recently used first
+_parse_pools = OrderedDict()
+_parse_pool_lock = threading.RLock()
+
+
+def get_parse_pool(kbs, workers, create=True):
+    """Return the pool of ``workers`` processes splitting reference lines
+    with ``kbs``.
+
+    The pools are kept for the next calls with KBs of the same content and
+    the same number of workers, so that each is only started once for many
+    documents. At most CFG_REFEXTRACT_PARSE_POOLS of them are kept, the
+    least recently used one is stopped to start another. The processes of
+    a pool are forked as soon as it is created, and inherit the KBs: as
+    forking a process which runs several threads is unsafe, call it before
+    starting any thread to create the pool then. If ``create`` is False, it
+    returns None instead of creating the pool.
+    """
+    # KBs without fingerprint are told apart by identity: their pool keeps
+    # them alive, so that their id isn't reused
+    key = (getattr(kbs, "fingerprint", None) or id(kbs), workers)
+    with _parse_pool_lock:
+        if key in _parse_pools:
+            _parse_pools.move_to_end(key)
+            return _parse_pools[key][1]
+        if not create:
+            return None
+        while _parse_pools and len(_parse_pools) >= CFG_REFEXTRACT_PARSE_POOLS:
+            dummy, (dummy, pool) = _parse_pools.popitem(last=False)
+            # the lines already submitted are still split
+            pool.shutdown(wait=False)
+        # compiled on first use, which takes seconds in every process
+        get_author_regexps()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_parse_worker,
+            initargs=(kbs,),
+        )
+        # the processes are all forked by the first submission
+        pool.submit(int).result()
+        _parse_pools[key] = (kbs, pool)
+        return pool
+
+
+def shutdown_parse_pool():
+    """Stop the pools of processes of get_parse_pool."""
+    with _parse_pool_lock:
+        while _parse_pools:
+            dummy, (dummy, pool) = _parse_pools.popitem()
+            # the lines already submitted are still split
+            pool.shutdown(wait=False)
+
+
+# KBs of the processes of split_reference_lines_in_parallel
+_parse_worker_kbs = None
+
+
+def _init_parse_worker(kbs):
+    global _parse_worker_kbs
+    _parse_worker_kbs = kbs
+
+
+def _split_reference_lines(lines):
+    return [split_reference_line(line, _parse_worker_kbs, {}) for line in lines]
+
+
 def parse_tagged_reference_line(line_marker, line, identified_dois, identified_urls):
     """Given a single tagged reference line, convert it to its MARC-XML representation.
     Try to find all tags and extract their contents and their types into corresponding
@@ -1445,30 +1725,111 @@ def remove_leading_garbage_lines_from_reference_section(ref_sectn):
 # Tasks related to conversion of full-text to plain-text:
 
 
-def clean_pdf_file(filename):
+def get_pdf_bounds(data):
+    """Return the (start, end) slice of the PDF inside ``data``, without the
+    junk which may be before its header and after its last %%EOF marker, or
+    None if there is no PDF header.
     """
-    strip leading and/or trailing junk from a PDF file
+    start = data.find(b"%PDF-")
+    if start == -1:
+        return None
+    end = data.rfind(b"%%EOF")
+    if end == -1:
+        return start, len(data)
+    end += len(b"%%EOF")
+    if not data[end:].strip():
+        # the end of line of the marker is not junk
+        end = len(data)
+    return start, end
+
+
+def has_junk_around_pdf(head, tail):
+    """Tell whether there is junk before the header or after the last %%EOF
+    marker of the PDF starting with ``head`` and ending with ``tail``
+    (see get_pdf_bounds)."""
+    start = head.find(b"%PDF-")
+    if start == -1:
+        return False
+    end = tail.rfind(b"%%EOF")
+    return start > 0 or (end != -1 and bool(tail[end + len(b"%%EOF") :].strip()))
+
+
+class FullTextDocument:
+    """A full-text file, shared by all the stages of an extraction.
+
+    The document is read from the file at ``fpath``, or given as ``data``
+    (a bytes-like object), and is never modified: if there is junk around a
+    PDF, only ``data`` is cleaned, as a view of the part to keep. When the
+    document is not read from an unmodified file, ``path`` is None, and
+    ``data`` is given to the PDF text conversion instead.
+
+    Only the beginning and the end of a file are read to find its type and
+    the junk around a PDF: the whole file is only read in memory when
+    ``data`` is first used, e.g. by the stages working on the structure of
+    a PDF. These all get the same ``pdf_reader``, which is parsed by pypdf
+    the first time it is used, and is None if pypdf can't read the PDF.
+    pypdf reads ``data`` without copying it when it is a whole bytes
+    object, and a copy of the cleaned PDF otherwise.
     """
-    with (
-        open(filename, "r+b") as file,
-        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE) as mmfile,
-    ):
-        start = mmfile.find(b"%PDF-")
-        if start == -1:
-            # no PDF marker found
-            LOGGER.debug("not a PDF file")
-            return
-        end = mmfile.rfind(b"%%EOF")
-        offset = len(b"%%EOF")
-        if start > 0:
-            LOGGER.debug("moving and truncating")
-            mmfile.move(0, start, end + offset - start)
-            mmfile.resize(end + offset - start)
-            mmfile.flush()
-        elif end > 0 and end + offset != mmfile.size():
-            LOGGER.debug("truncating only")
-            mmfile.resize(end + offset - start)
-            mmfile.flush()
+
+    # the mime type is found from the beginning of the documents only, and
+    # the junk around a PDF in a file is looked for in its ends only
+    MAGIC_BYTES = 64 * 1024
+
+    def __init__(self, fpath=None, data=None):
+        self.path = fpath
+        if data is None:
+            with open(fpath, "rb") as f:
+                head = f.read(self.MAGIC_BYTES)
+                f.seek(max(f.seek(0, io.SEEK_END) - self.MAGIC_BYTES, 0))
+                tail = f.read()
+            if not has_junk_around_pdf(head, tail):
+                self.mime_type = magic.from_buffer(head, mime=True)
+                return
+            with open(fpath, "rb") as f:
+                data = f.read()
+        if not hasattr(data, "find"):
+            # e.g. a memoryview, which can't be searched
+            data = bytes(data)
+        view = memoryview(data)
+        bounds = get_pdf_bounds(data)
+        if bounds is not None and bounds != (0, len(view)):
+            view = view[bounds[0] : bounds[1]]
+            self.path = None
+        self.data = view
+        self.mime_type = magic.from_buffer(
+            view[: self.MAGIC_BYTES].tobytes(), mime=True
+        )
+
+    @cached_property
+    def data(self):
+        """The content of the document, as a memoryview."""
+        with open(self.path, "rb") as f:
+            return memoryview(f.read())
+
+    @cached_property
+    def pdf_reader(self):
+        """The PdfReader of the document, or None."""
+        if not self.is_pdf:
+            return None
+        data = self.data.obj
+        if isinstance(data, bytes) and self.data.nbytes == len(data):
+            # BytesIO shares the buffer of bytes objects
+            return open_pdf(io.BytesIO(data))
+        return open_pdf(io.BytesIO(self.data.tobytes()))
+
+    @property
+    def is_pdf(self):
+        return self.mime_type == "application/pdf"
+
+    @property
+    def page_count(self):
+        return None if self.pdf_reader is None else len(self.pdf_reader.pages)
+
+    def get_lines(self):
+        """Return the lines of a plain text document."""
+        with io.TextIOWrapper(io.BytesIO(self.data)) as f:
+            return f.readlines()
 
 
 def get_plaintext_document_body(fpath, keep_layout=False):
@@ -1482,19 +1843,215 @@ def get_plaintext_document_body(fpath, keep_layout=False):
     @param fpath: (string) - the path to the fulltext file
     @return: (list) of strings - each string being a line in the document.
     """
-    textbody = []
-    clean_pdf_file(fpath)
-    mime_type = magic.from_file(fpath, mime=True)
-
-    if mime_type == "text/plain":
-        with open(fpath, "r") as f:
-            textbody = f.readlines()
-    elif mime_type == "application/pdf":
-        textbody = convert_PDF_to_plaintext(fpath, keep_layout)
-    else:
-        raise UnknownDocumentTypeError(mime_type)
+    document = FullTextDocument(fpath)
+    if document.mime_type == "text/plain":
+        return document.get_lines()
+    if document.is_pdf:
+        return convert_PDF_to_plaintext(
+            document.path,
+            keep_layout,
+            data=None if document.path else document.data,
+        )
+    raise UnknownDocumentTypeError(document.mime_type)
+
+
+def find_reference_title_page(docbody, first_page=1):
+    """Return the page holding the last reference section title of a
+    converted PDF, or None if there is none.
+    @param docbody: (list) of strings - the lines of the converted pages.
+    @param first_page: (integer) - the page docbody starts at.
+    """
+    title_patterns = get_reference_section_title_patterns()
+    for index in range(len(docbody) - 1, -1, -1):
+        if any(pattern.match(docbody[index]) for pattern in title_patterns):
+            return first_page + sum("\f" in line for line in docbody[:index])
+    return None
+
+
+def select_reference_pages(pages, page_window=CFG_REFEXTRACT_PAGE_WINDOW, first_page=1):
+    """Keep the pages of a PDF, read while it is being converted, which may
+    hold its reference section.
+
+    These are the pages starting at the last reference section title, and
+    the last ``page_window`` pages, where the section finders which don't
+    need a title look. The other pages are dropped as soon as possible, so
+    that documents of thousands of pages are never held in memory.
+    @param pages: (iterable) of lists of strings - the converted pages.
+    @param page_window: (integer) - number of trailing pages to keep, 0 to
+     keep all of them.
+    @param first_page: (integer) - the page ``pages`` starts at.
+    @return: (tuple) - the number of the first page kept, and the lines of
+     the pages kept.
+    """
+    if not page_window:
+        return first_page, list(chain.from_iterable(pages))
+
+    title_patterns = get_reference_section_title_patterns()
+    titled_pages = []
+    titled_start = None
+    last_pages = deque(maxlen=page_window)
+    for number, page in enumerate(pages, first_page):
+        if any(pattern.match(line) for line in page for pattern in title_patterns):
+            titled_pages = []
+            titled_start = number
+        if titled_start is not None:
+            titled_pages.append(page)
+        last_pages.append(page)
+
+    last_start = number + 1 - len(last_pages) if last_pages else first_page
+    if titled_start is not None and titled_start < last_start:
+        return titled_start, list(chain.from_iterable(titled_pages))
+    return last_start, list(chain.from_iterable(last_pages))
+
+
+def is_raw_conversion_likely_to_fail(convert, page_count):
+    """Tell whether the references of a PDF are unlikely to be found in its
+    raw conversion, by looking for a reference section in its last page.
+    @param convert: (function) - converts the PDF, see PDF_TEXT_BACKENDS.
+    """
+    last_page = list(chain.from_iterable(convert(first_page=page_count)))
+    return get_reference_section_beginning(last_page) is None
+
 
-    return textbody
+def _find_pdf_reference_lines(
+    convert, keep_layout, page_count, tail_pages, page_window, first_page=1
+):
+    """Return the reference lines of a PDF converted from ``first_page``,
+    with the page of its reference section title.
+
+    See get_reference_lines_from_document for ``tail_pages`` and
+    ``page_window``.
+    """
+    if tail_pages and page_count:
+        window = tail_pages
+        while window < page_count - first_page + 1:
+            window_start = page_count - window + 1
+            docbody = list(
+                chain.from_iterable(convert(keep_layout, first_page=window_start))
+            )
+            reflines, dummy, how_found_start = extract_references_from_fulltext(docbody)
+            # only trust a section introduced by its title: the other ways
+            # of finding it would match a list of anything in any slice
+            if reflines and how_found_start == 1:
+                return reflines, find_reference_title_page(docbody, window_start)
+            LOGGER.debug("no reference section title in the last %d pages", window)
+            window *= 2
+
+    pages = convert(keep_layout, first_page=first_page if first_page > 1 else None)
+    first_page, docbody = select_reference_pages(pages, page_window, first_page)
+    reflines, dummy, dummy = extract_references_from_fulltext(docbody)
+    return reflines, find_reference_title_page(docbody, first_page)
+
+
+def get_reference_lines_from_document(
+    fpath,
+    tail_pages=CFG_REFEXTRACT_TAIL_PAGES,
+    page_window=CFG_REFEXTRACT_PAGE_WINDOW,
+    text_backend=CFG_REFEXTRACT_TEXT_BACKEND,
+    speculative_layout=CFG_REFEXTRACT_SPECULATIVE_LAYOUT,
+    layout_tail_pages=CFG_REFEXTRACT_LAYOUT_TAIL_PAGES,
+):
+    """Return the reference lines of a full-text document.
+
+    PDFs are converted keeping their layout if no references are found in
+    their raw conversion. That second conversion only starts at the page of
+    the reference section title found in the raw one. If there is none, only
+    the last ``layout_tail_pages`` pages are converted again, or the whole
+    document if it is 0 (or if its page count is unknown). With
+    ``speculative_layout``,
+    when its last page doesn't look like references, pdftotext is started
+    alongside the raw conversion instead of after it.
+
+    When ``tail_pages`` is set, only the last ``tail_pages`` pages of a PDF
+    are converted at first. As long as no reference section title is found
+    in them, the number of converted pages is doubled, up to the whole
+    document.
+
+    The conversions are read page by page. With ``page_window``, only the
+    pages which may hold the reference section are kept (see
+    select_reference_pages).
+    It raises UnknownDocumentTypeError if the document is not a PDF or
+    plain text.
+    @param fpath: (string) - the path to the fulltext file, or its
+     FullTextDocument
+    @param tail_pages: (integer) - number of pages to convert first, 0 to
+     convert the whole document at once.
+    @param page_window: (integer) - number of trailing pages to keep in
+     memory, 0 to keep the whole document.
+    @param text_backend: (string) - name of the PDF to plaintext conversion,
+     "pdftotext" or "pypdf".
+    @param speculative_layout: (boolean) - whether to start the layout
+     conversion of a PDF during its raw conversion, when its last page
+     doesn't look like references.
+    @param layout_tail_pages: (integer) - number of pages to convert again
+     keeping their layout if no reference section title is found, 0 to
+     convert the whole document again.
+    @return: (list) of strings - the reference lines.
+    """
+    stream_pages = get_pdf_text_backend(text_backend)
+    document = fpath
+    if not isinstance(document, FullTextDocument):
+        document = FullTextDocument(fpath)
+    if not document.is_pdf:
+        if document.mime_type != "text/plain":
+            raise UnknownDocumentTypeError(document.mime_type)
+        reflines, dummy, dummy = extract_references_from_fulltext(document.get_lines())
+        return reflines
+
+    # pypdf only parses the PDF if its page count or its pages are needed
+    page_count = document.page_count if tail_pages or speculative_layout else None
+    fpath = document.path
+    data = None if fpath else document.data
+
+    def convert(keep_layout=False, first_page=None):
+        return stream_pages(
+            fpath,
+            keep_layout,
+            first_page=first_page,
+            reader=None if text_backend == "pdftotext" else document.pdf_reader,
+            data=data,
+        )
+
+    layout_conversion = None
+    if (
+        speculative_layout
+        and text_backend == "pdftotext"
+        and page_count
+        and is_raw_conversion_likely_to_fail(convert, page_count)
+    ):
+        layout_conversion = BackgroundPDFConversion(
+            fpath,
+            keep_layout=True,
+            collect=lambda pages: select_reference_pages(pages, page_window)[1],
+            data=data,
+        )
+    try:
+        reflines, title_page = _find_pdf_reference_lines(
+            convert, False, page_count, tail_pages, page_window
+        )
+        if reflines:
+            return reflines
+        if layout_conversion is not None:
+            docbody = layout_conversion.result()
+            layout_conversion = None
+            reflines, dummy, dummy = extract_references_from_fulltext(docbody)
+            return reflines
+        if title_page is None and layout_tail_pages:
+            page_count = document.page_count
+            if page_count:
+                title_page = max(page_count - layout_tail_pages + 1, 1)
+        reflines, dummy = _find_pdf_reference_lines(
+            convert,
+            True,
+            page_count,
+            tail_pages,
+            page_window,
+            first_page=title_page or 1,
+        )
+        return reflines
+    finally:
+        if layout_conversion is not None:
+            layout_conversion.cancel()
 
 
 def parse_references(
@@ -1503,17 +2060,21 @@ def parse_references(
     override_kbs_files=None,
     reference_format="{title} {volume} ({year}) {page}",
     linker_callback=None,
+    parse_cache=None,
+    parse_workers=CFG_REFEXTRACT_PARSE_WORKERS,
 ):
     """Parse a list of references
 
     Given a list of raw reference lines (list of strings),
-    output a list of dictionaries containing the parsed references
+    output a list of dictionaries containing the parsed references.
+    Long lists can be parsed by ``parse_workers`` processes, see
+    parse_references_elements.
     """
     # RefExtract knowledge bases
     kbs = get_kbs(custom_kbs=override_kbs_files)
     # Identify journal titles, report numbers, URLs, DOIs, and authors...
     processed_references, counts, dummy_bad_titles_count = parse_references_elements(
-        reference_lines, kbs, linker_callback
+        reference_lines, kbs, linker_callback, parse_cache, parse_workers
     )
 
     return (
@@ -28,5 +28,13 @@ class FullTextNotAvailableError(Exception):
     """Raised when we cannot access the document text."""
 
 
+class DocumentTooLargeError(FullTextNotAvailableError):
+    """Raised when a document is larger than the maximum download size."""
+
+
 class UnknownDocumentTypeError(Exception):
     """Raised when we don't know how to handle the document's MIME type."""
+
+
+class UnknownKnowledgeBaseError(Exception):
+    """Raised when no set of KBs was registered under the requested name."""
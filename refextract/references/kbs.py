@@ -23,17 +23,40 @@
 
 import contextlib
 import csv
+import gc
+import hashlib
+import logging
+import os
+import pickle
 import re
+import threading
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
+from tempfile import mkstemp
 
 from refextract.documents.text import re_group_captured_multiple_space
-from refextract.references.config import CFG_REFEXTRACT_KBS
+from refextract.references.config import (
+    CFG_REFEXTRACT_KBS,
+    CFG_REFEXTRACT_KBS_CACHE_DIR,
+    CFG_REFEXTRACT_KBS_CACHE_SIZE,
+)
+from refextract.references.errors import UnknownKnowledgeBaseError
 from refextract.references.regexs import (
     re_extract_char_class,
     re_extract_quoted_text,
     re_kb_line,
+    re_non_alphanumeric,
     re_punctuation,
     re_regexp_character_class,
+    re_regexp_special_chars,
 )
+from refextract.references.trie import KeywordTrie
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the structure returned by the KB builders changes, so
+# that outdated snapshots are not loaded.
+KBS_SNAPSHOT_VERSION = 5
 
 
 @contextlib.contextmanager
@@ -52,26 +75,293 @@ def file_resolving(fpath, reader=None, **kwargs):
         yield fpath
 
 
-def get_kbs(custom_kbs=None, cache={}, cache_inputs={}):  # noqa
-    """Load kbs (with caching).
+JournalsKb = namedtuple("JournalsKb", ["trie", "standardised_titles", "seek_phrases"])
 
-    This function stores the loaded kbs into the cache variable.
-    For the caching to work, it needs to receive empty dictionaries
-    as "cache" and "cache_inputs" parameters.
+ReportNumbersKb = namedtuple(
+    "ReportNumbersKb",
+    [
+        "search_patterns",
+        "standardised_categs",
+        "ordered_categs",
+        "categ_trie",
+        "unindexed_categs",
+    ],
+)
+
+PublishersKb = namedtuple("PublishersKb", ["publishers", "keyword_trie", "unindexed"])
+
+CollaborationsKb = namedtuple(
+    "CollaborationsKb", ["patterns", "keyword_trie", "unindexed"]
+)
+
+BooksKb = namedtuple("BooksKb", ["titles", "title_trie", "unindexed_titles"])
+
+KbCacheInfo = namedtuple("KbCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class KbCache:
+    """LRU cache of loaded KBs, keyed by KB type and content fingerprint.
+
+    Several versions of the same KB type can be kept at the same time, so
+    that alternating between sets of KBs does not rebuild them every time.
     """
+
+    def __init__(self, maxsize=CFG_REFEXTRACT_KBS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Fingerprints of the last KB objects seen, keyed by their id. The
+        # objects themselves are kept so that their ids cannot be reused.
+        self._fingerprints = OrderedDict()
+        self._knowledge_bases = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, kb_type, kb, fingerprint=None):
+        """Return the loaded KB, loading it if it is not in the cache.
+
+        If no fingerprint is given, it is computed from the KB. KBs which
+        cannot be fingerprinted (e.g. open files) are loaded every time.
+        """
+        with self._lock:
+            return self._get(kb_type, kb, fingerprint)[1]
+
+    def get_knowledge_base(self, kbs, fingerprints=None):
+        """Return the KnowledgeBase made of the given KBs, keyed by type.
+
+        The KnowledgeBase is cached as well, so that its merged lookup
+        tables are only built once for a given set of KBs.
+        """
+        fingerprints = fingerprints or {}
+        with self._lock:
+            keys = []
+            loaded_kbs = {}
+            for kb_type, kb in kbs.items():
+                key, loaded_kbs[kb_type] = self._get(
+                    kb_type, kb, fingerprints.get(kb_type)
+                )
+                keys.append(key)
+            if None in keys:
+                return KnowledgeBase(loaded_kbs)
+
+            keys = tuple(keys)
+            knowledge_base = self._knowledge_bases.get(keys)
+            if knowledge_base is None:
+                fingerprint = hashlib.sha256(
+                    repr(sorted(keys)).encode("utf-8")
+                ).hexdigest()
+                knowledge_base = KnowledgeBase(loaded_kbs, fingerprint)
+                self._knowledge_bases[keys] = knowledge_base
+                while len(self._knowledge_bases) > self.maxsize:
+                    self._knowledge_bases.popitem(last=False)
+            else:
+                self._knowledge_bases.move_to_end(keys)
+            return knowledge_base
+
+    def _get(self, kb_type, kb, fingerprint=None):
+        """Return the cache key of the KB, if any, and the loaded KB."""
+        if fingerprint is None:
+            fingerprint = self.fingerprint(kb)
+        if fingerprint is None:
+            self.misses += 1
+            return None, load_kb_by_type(kb_type, kb)
+
+        key = (kb_type, fingerprint)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return key, self._entries[key]
+
+        self.misses += 1
+        loaded_kb = load_kb_by_type(kb_type, kb)
+        self._entries[key] = loaded_kb
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return key, loaded_kb
+
+    def fingerprint(self, kb):
+        """Return the fingerprint of the KB, computed once per KB object."""
+        memo = self._fingerprints.get(id(kb))
+        if memo is not None and memo[0] is kb:
+            self._fingerprints.move_to_end(id(kb))
+            return memo[1]
+
+        fingerprint = get_kb_fingerprint(kb)
+        if fingerprint is not None and not isinstance(kb, str):
+            self._fingerprints[id(kb)] = (kb, fingerprint)
+            while len(self._fingerprints) > self.maxsize:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def info(self):
+        with self._lock:
+            return KbCacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+            self._knowledge_bases.clear()
+            self.hits = self.misses = 0
+
+
+def get_kb_fingerprint(kb):
+    """Compute a fingerprint of the content of a KB.
+
+    KB files are identified by their path, modification time and size, KBs
+    given as data by a hash of their content. Returns None for other KBs.
+    """
+    if isinstance(kb, str):
+        stat = os.stat(kb)
+        return ("file", kb, stat.st_mtime_ns, stat.st_size)
+    if isinstance(kb, dict):
+        content = list(kb.items())
+    elif isinstance(kb, (list, tuple)):
+        content = kb
+    else:
+        return None
+    digest = hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+    return ("data", digest)
+
+
+KBS_CACHE = KbCache()
+
+
+class KnowledgeBase(Mapping):
+    """Read-only set of loaded KBs, keyed by KB type.
+
+    The lookup tables which combine several KBs are built once, when the
+    object is created, and nothing is modified afterwards: the same object
+    can be shared between threads, pickled, or loaded in a parent process
+    before forking workers (ideally followed by ``gc.freeze()``) without
+    its memory being copied.
+    """
+
+    def __init__(self, kbs, fingerprint=None):
+        """``fingerprint`` identifies the content of the KBs, if known. It is
+        used to tell apart the results obtained with different KBs, e.g. in
+        the parse cache.
+        """
+        kbs = dict(kbs)
+        # Standardised journal titles, for both the journals and the
+        # journals regexps KBs.
+        standardised_titles = {}
+        if kbs.get("journals"):
+            standardised_titles.update(kbs["journals"].standardised_titles)
+        standardised_titles.update(kbs.get("journals_re") or ())
+        object.__setattr__(self, "_kbs", kbs)
+        object.__setattr__(self, "standardised_titles", standardised_titles)
+        object.__setattr__(self, "fingerprint", fingerprint)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is read-only" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is read-only" % type(self).__name__)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __getitem__(self, kb_type):
+        return self._kbs[kb_type]
+
+    def __iter__(self):
+        return iter(self._kbs)
+
+    def __len__(self):
+        return len(self._kbs)
+
+    def __repr__(self):
+        return "<%s %s>" % (type(self).__name__, ", ".join(sorted(self._kbs)))
+
+
+class KbSet(KnowledgeBase):
+    """KnowledgeBase registered under a name by register_kbs.
+
+    It can be given instead of the custom KBs to every extraction function,
+    which then use it as is.
+    """
+
+    def __init__(self, name, kbs):
+        super().__init__(kbs, getattr(kbs, "fingerprint", None))
+        object.__setattr__(self, "name", name)
+
+    def __repr__(self):
+        return "<KbSet %r>" % self.name
+
+
+_REGISTERED_KBS = {}
+_REGISTERED_KBS_LOCK = threading.Lock()
+
+
+def register_kbs(name, custom_kbs=None, fingerprints=None):
+    """Load a set of KBs once and register it under ``name``.
+
+    ``custom_kbs`` and ``fingerprints`` are the same as for get_kbs.
+    Registering a name again replaces the previous set. Returns the
+    registered KbSet; the extraction functions accept either it or its name
+    in place of ``override_kbs_files``.
+    """
+    kb_set = KbSet(name, get_kbs(custom_kbs=custom_kbs, fingerprints=fingerprints))
+    with _REGISTERED_KBS_LOCK:
+        _REGISTERED_KBS[name] = kb_set
+    return kb_set
+
+
+def unregister_kbs(name):
+    """Forget the set of KBs registered under ``name``."""
+    with _REGISTERED_KBS_LOCK:
+        _REGISTERED_KBS.pop(name, None)
+
+
+def get_registered_kbs(name):
+    """Return the set of KBs registered under ``name``.
+
+    Raises UnknownKnowledgeBaseError if there is none.
+    """
+    try:
+        return _REGISTERED_KBS[name]
+    except KeyError:
+        raise UnknownKnowledgeBaseError(name)
+
+
+def get_kbs(custom_kbs=None, fingerprints=None, cache=KBS_CACHE):
+    """Load kbs (with caching) into a KnowledgeBase.
+
+    ``custom_kbs`` overrides the default KBs by type, either with the path
+    to a KB file or with the KB data itself. The loaded KBs are kept in
+    ``cache``, keyed by the fingerprint of their content. Callers which
+    already know the fingerprint of a custom KB (e.g. a version number) can
+    give it in ``fingerprints``, keyed by KB type, to avoid computing it.
+
+    ``custom_kbs`` can also be a KbSet returned by register_kbs, or the
+    name it was registered under, in which case it is returned directly.
+    """
+    if isinstance(custom_kbs, KbSet):
+        return custom_kbs
+    if isinstance(custom_kbs, str):
+        return get_registered_kbs(custom_kbs)
+
     kbs = CFG_REFEXTRACT_KBS.copy()
     if custom_kbs:
         kbs.update({kb_type: kb for (kb_type, kb) in custom_kbs.items() if kb})
-
-    for kb_type, kb in kbs.items():
-        if kb != cache_inputs.get(kb_type):
-            cache_inputs[kb_type] = kb
-            cache[kb_type] = load_kb_by_type(kb_type, kb)
-    return cache
+    return cache.get_knowledge_base(kbs, fingerprints)
 
 
 def load_kb_by_type(kb_type, kb):
-    """Load kb (without caching) for a given kb type."""
+    """Load kb (without caching) for a given kb type.
+
+    KBs given as a path are loaded from their snapshot in
+    CFG_REFEXTRACT_KBS_CACHE_DIR when there is one for the current content of
+    the file, and a snapshot is written there otherwise.
+    """
+    if CFG_REFEXTRACT_KBS_CACHE_DIR and isinstance(kb, str):
+        return load_kb_with_snapshot(kb_type, kb, CFG_REFEXTRACT_KBS_CACHE_DIR)
+    return build_kb_by_type(kb_type, kb)
+
+
+def build_kb_by_type(kb_type, kb):
+    """Build kb from its source for a given kb type."""
 
     loaders = {
         "journals_re": build_journals_re_kb,
@@ -87,6 +377,71 @@ def load_kb_by_type(kb_type, kb):
     return loaders[kb_type](kb)
 
 
+def get_kb_snapshot_path(kb_type, fpath, cache_dir):
+    """Return the path of the snapshot of the KB file for its current content."""
+    with open(fpath, "rb") as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()
+    return os.path.join(
+        cache_dir, "%s-%s.v%d.pickle" % (kb_type, digest, KBS_SNAPSHOT_VERSION)
+    )
+
+
+def load_kb_with_snapshot(kb_type, fpath, cache_dir):
+    """Load the KB from its snapshot, building and saving it if needed."""
+    snapshot_path = get_kb_snapshot_path(kb_type, fpath, cache_dir)
+    kb = load_kb_snapshot(snapshot_path)
+    if kb is None:
+        kb = build_kb_by_type(kb_type, fpath)
+        save_kb_snapshot(snapshot_path, kb)
+    return kb
+
+
+def load_kb_snapshot(snapshot_path):
+    """Load a KB snapshot, returning None if it is missing or unreadable."""
+    # The KBs are made of many small containers which would trigger a lot of
+    # useless garbage collections while unpickling them.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(snapshot_path, "rb") as fh:
+            return pickle.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        LOGGER.warning("Ignoring unreadable KB snapshot %s", snapshot_path)
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def save_kb_snapshot(snapshot_path, kb):
+    """Atomically write a KB snapshot, so that concurrent workers never read
+    a partial one.
+    """
+    cache_dir = os.path.dirname(snapshot_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = mkstemp(dir=cache_dir, suffix=".tmp")
+    except OSError:
+        LOGGER.warning("Could not write KB snapshot %s", snapshot_path)
+        return
+    try:
+        try:
+            # compiled regexps are pickled as their pattern and flags, and
+            # compiled again when the snapshot is loaded
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(kb, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        # e.g. a KB holding objects which can't be pickled
+        LOGGER.warning("Could not write KB snapshot %s", snapshot_path)
+
+
 def load_kb(path, builder):
     if isinstance(path, dict):
         return load_kb_from_iterable(path.items(), builder)
@@ -209,13 +564,19 @@ def build_reportnum_kb(fpath):
     and execution is halted with an error-code 0.
 
     @param fpath: (string) the path to the knowledge base file.
-    @return: (tuple) containing 2 dictionaries. The first contains regexp
-     search patterns used to identify preprint references in a line. This
-     dictionary is keyed by a tuple containing the line number of the
-     pattern in the KB and the non-standard category string.
-     E.g.: (3, 'ASTRO PH').
+    @return: (ReportNumbersKb) containing 2 dictionaries, a list, a trie
+     and a set. The first dictionary contains regexp search patterns used
+     to identify preprint references in a line. This dictionary is keyed
+     by a tuple containing the line number of the pattern in the KB and
+     the non-standard category string. E.g.: (3, 'ASTRO PH').
      The second dictionary contains the standardised category string,
      and is keyed by the non-standard category string. E.g.: 'astro-ph'.
+     The list contains the keys of the patterns in the order in which
+     they must be tried (longest category first).
+     The trie maps each category string to the keys of its patterns, so
+     that only the patterns whose category appears in a line are tried.
+     The set contains the keys of the patterns whose category is not a
+     plain string, and which must therefore always be tried.
     """
 
     def _add_institute_preprint_patterns(
@@ -369,11 +730,30 @@ def build_reportnum_kb(fpath):
             kb_line_num,
         )
 
+    ordered_categs = sorted(
+        standardised_preprint_reference_categories,
+        key=lambda x: (len(x[1]), x),
+        reverse=True,
+    )
+
+    # index the categories, to find the ones present in a line in one pass:
+    categ_trie = KeywordTrie()
+    unindexed_categs = set()
+    for categ in ordered_categs:
+        categ_str = categ[1].strip()
+        if re_regexp_special_chars.search(categ_str):
+            unindexed_categs.add(categ)
+        else:
+            categ_trie.add(categ_str, categ_trie.get(categ_str, ()) + (categ,))
+
     # return the preprint reference patterns and the replacement strings
     # for non-standard categ-strings:
-    return (
+    return ReportNumbersKb(
         preprint_reference_search_regexp_patterns,
         standardised_preprint_reference_categories,
+        ordered_categs,
+        categ_trie,
+        unindexed_categs,
     )
 
 
@@ -399,22 +779,84 @@ def build_special_journals_kb(fpath):
 
 
 def build_books_kb(fpath):
+    """Load the books knowledge base.
+
+    @param fpath: (string) the path to the knowledge base file.
+    @return: (BooksKb) containing a dictionary, a trie and a list. The
+     dictionary contains the KB lines (authors, title, year), keyed by
+     the upper-cased titles, in the order of the KB.
+     The trie maps the titles, stripped of everything but letters and
+     digits, to tuples (position in the KB, upper-cased title), so that
+     all the titles found in a text can be looked up in one pass.
+     The list contains the titles which have no letters or digits, and
+     are therefore found in any text.
+    """
     with file_resolving(fpath, reader=csv.reader) as fh:
         books = {}
         for line in fh:
             books[line[1].upper()] = line
 
-    return books
+    title_trie = KeywordTrie()
+    unindexed_titles = []
+    for position, title in enumerate(books):
+        clean_title = re_non_alphanumeric.sub("", title)
+        if clean_title:
+            title_trie.add(
+                clean_title,
+                title_trie.get(clean_title, ()) + ((position, title),),
+            )
+        else:
+            unindexed_titles.append((position, title))
+
+    return BooksKb(books, title_trie, unindexed_titles)
+
+
+def build_keyword_index(keywords):
+    """Index KB entries by a keyword which appears in any text they match.
+
+    Matching of the entries is case insensitive, so the keywords are
+    lower-cased. Keywords which are not plain ASCII strings cannot be
+    relied upon, so their entries are left out of the index.
+    @param keywords: (list) of tuples (key of the KB entry, keyword).
+    @return: (tuple) containing a trie, mapping each keyword to the tuples
+     (position in the list, key) of its entries, and a set of the tuples
+     (position in the list, key) of the entries which must always be tried.
+    """
+    keyword_trie = KeywordTrie()
+    unindexed = set()
+    for position, (key, keyword) in enumerate(keywords):
+        if (
+            keyword
+            and keyword.isascii()
+            and not re_regexp_special_chars.search(keyword)
+        ):
+            keyword = keyword.lower()
+            keyword_trie.add(
+                keyword, keyword_trie.get(keyword, ()) + ((position, key),)
+            )
+        else:
+            unindexed.add((position, key))
+    return keyword_trie, unindexed
 
 
 def build_publishers_kb(fpath):
+    """Load the publishers knowledge base.
+
+    @return: (PublishersKb) containing a dictionary of the publishers,
+     keyed by their non-standard name, with the regexp recognising them and
+     their standard name, and the index of the publishers by name (see
+     build_keyword_index).
+    """
     with file_resolving(fpath, reader=csv.reader, lineterminator="\n") as fh:
         publishers = {}
         for line in fh:
             pattern = re.compile(r"(\b|^)%s(\b|$)" % line[0], re.I | re.U)
             publishers[line[0]] = {"pattern": pattern, "repl": line[1]}
 
-    return publishers
+    keyword_trie, unindexed = build_keyword_index(
+        [(abbrev, abbrev) for abbrev in publishers]
+    )
+    return PublishersKb(publishers, keyword_trie, unindexed)
 
 
 def build_authors_kb(fpath):
@@ -501,24 +943,25 @@ def build_journals_kb(knowledgebase):
     an error-code 0.
 
     @param fpath: (string) the path to the knowledge base file.
-    @return: (tuple) containing a list and a dictionary. The list
-     contains compiled regex patterns used as search terms and will
-     be used to force searching order to match that of the knowledge
-     base.
-     The dictionary contains the search->replace terms.  The keys of
-     the dictionary are the compiled regex word phrases used for
-     searching in the reference lines; The values in the dictionary are
-     the replace terms for matches.
+    @return: (JournalsKb) containing a trie, a dictionary and a list. The trie
+     holds every seek phrase, so that all candidate titles of a reference
+     line can be found in a single pass. Each phrase maps to a tuple
+     (priority, phrase, is_replacement_term), the priority being the
+     index of the phrase in the list.
+     The dictionary contains the search->replace terms, keyed by the
+     seek phrases.
+     The list contains the seek phrases, ordered longest first, which is
+     the order in which they must be matched.
     """
     # Initialise vars:
-    # dictionary of search and replace phrases from KB:
-    kb = {}
     standardised_titles = {}
     seek_phrases = []
     # A dictionary of "replacement terms" (RHS) to be inserted into KB as
     # "seek terms" later, if they were not already explicitly added
     # by the KB:
     repl_terms = {}
+    # seek phrases which were added from the replacement terms
+    repl_phrases = set()
     for seek_phrase, repl in knowledgebase:
         # We match on a simplified line, thus dots are replaced
         # with spaces
@@ -529,13 +972,9 @@ def build_journals_kb(knowledgebase):
         # replacement terms:
         repl_terms[repl] = None
 
-        # add the phrase from the KB if the 'seek' phrase is longer
-        # compile the seek phrase into a pattern:
-        seek_ptn = re.compile(r"(?<!\w)(%s)\W" % re.escape(seek_phrase), re.UNICODE)
-
-        kb[seek_phrase] = seek_ptn
+        if seek_phrase not in standardised_titles:
+            seek_phrases.append(seek_phrase)
         standardised_titles[seek_phrase] = repl
-        seek_phrases.append(seek_phrase)
 
     # Now, for every 'replacement term' found in the KB, if it is
     # not already in the KB as a "search term", add it:
@@ -544,25 +983,38 @@ def build_journals_kb(knowledgebase):
         raw_repl_phrase = re_punctuation.sub(" ", raw_repl_phrase)
         raw_repl_phrase = re_group_captured_multiple_space.sub(" ", raw_repl_phrase)
         raw_repl_phrase = raw_repl_phrase.strip()
-        if raw_repl_phrase not in kb:
+        if raw_repl_phrase not in standardised_titles:
             # The replace-phrase was not in the KB as a seek phrase
             # It should be added.
-            pattern = r"(?<!\/)\b(%s)[^A-Z0-9]" % re.escape(raw_repl_phrase)
-            seek_ptn = re.compile(pattern, re.U)
-            kb[raw_repl_phrase] = seek_ptn
             standardised_titles[raw_repl_phrase] = repl_term
             seek_phrases.append(raw_repl_phrase)
+            repl_phrases.add(raw_repl_phrase)
 
     # Sort the titles by string length (long - short)
     seek_phrases.sort(key=len, reverse=True)
 
+    # Index all the seek phrases in a trie, remembering their priority:
+    kb = KeywordTrie()
+    for priority, seek_phrase in enumerate(seek_phrases):
+        kb.add(seek_phrase, (priority, seek_phrase, seek_phrase in repl_phrases))
+
     # return the raw knowledge base:
-    return kb, standardised_titles, seek_phrases
+    return JournalsKb(kb, standardised_titles, seek_phrases)
 
 
 def build_collaborations_kb(knowledgebase):
+    """Load the collaborations knowledge base.
+
+    @return: (CollaborationsKb) containing a dictionary of the regexps
+     recognising each collaboration, and the index of the collaborations
+     by the first word of their name (see build_keyword_index).
+    """
     kb = {}
+    keywords = {}
     for pattern, collab in knowledgebase:
+        # "Collaboration" is optional in the regexp, so it can't be relied on
+        keyword = pattern.split(" ", 1)[0]
+        keywords[collab] = None if "Collaboration" in keyword else keyword
         prefix = r"(?:^|[\(\"\[\s]|(?<=\W))\s*(?:(?:the|and)\s+)?"
         collaboration_pattern = r"(?:\s*coll(?:aborations?|\.)?)?"
         suffix = r"(?=$|[><\]\)\"\s.,:])"
@@ -571,4 +1023,5 @@ def build_collaborations_kb(knowledgebase):
         re_pattern = "%s(%s)%s" % (prefix, pattern, suffix)
         kb[collab] = re.compile(re_pattern, re.I | re.U)
 
-    return kb
+    keyword_trie, unindexed = build_keyword_index(list(keywords.items()))
+    return CollaborationsKb(kb, keyword_trie, unindexed)
@@ -22,6 +22,8 @@
 # or submit itself to any jurisdiction.
 
 import logging
+from bisect import bisect_left
+from collections import namedtuple
 
 from pypdf import PdfReader
 from pypdf.generic import ByteStringObject
@@ -31,6 +33,11 @@ from refextract.references.regexs import re_reference_in_dest
 LOGGER = logging.getLogger(__name__)
 
 
+# A link to a URI on a page of a PDF, with the position of its top left
+# corner
+PdfLink = namedtuple("PdfLink", ["uri", "page_nb", "left", "top"])
+
+
 class IncompleteCoordinatesError(Exception):
     """Exception raised when a named destination does not have all required
     coordinates.
@@ -39,177 +46,264 @@ class IncompleteCoordinatesError(Exception):
     pass
 
 
-def extract_texkeys_and_urls_from_pdf(pdf_file):
+def extract_texkeys_and_urls_from_pdf(pdf_file, reader=None):
     """
     Extract the texkeys and corresponding urls from the given PDF file
 
     This is done by looking up the named destinations in the PDF
 
     @param pdf_file: path to a PDF
+    @param reader: PdfReader of the PDF, if it is already open
 
     @return: list of dictionaries with all texkeys
      and corresponding urls found in the PDF
     """
+    if reader is not None:
+        return extract_texkeys_and_urls(reader)
     with open(pdf_file, "rb") as pdf_stream:
         try:
             pdf = PdfReader(pdf_stream, strict=False)
-            destinations = pdf.named_destinations
-            urls = extract_urls(pdf)
         except Exception:
             LOGGER.debug("PDF: Internal pypdf error, no TeXkeys returned.")
             return []
-        # not all named destinations point to references
-        refs = []
-        for destination in destinations.items():
-            destination_key = (
-                destination[0].decode("utf-8")
-                if isinstance(destination[0], ByteStringObject)
-                else destination[0]
-            )
-            match = re_reference_in_dest.match(destination_key)
-            if match:
-                refs.append(destination)
-        two_column_layout = False
-        try:
-            if _destinations_in_two_columns(pdf, refs):
-                two_column_layout = True
-                LOGGER.debug("PDF: Using two-column layout")
+        return extract_texkeys_and_urls(pdf)
 
-                def sortfunc(dest_couple):
-                    return dest_couple[1]
 
-            else:
-                LOGGER.debug("PDF: Using single-column layout")
-
-                def sortfunc(dest_couple):
-                    page, _, ypos, xpos = dest_couple[1]
-                    return (page, ypos, xpos)
-
-            refs = [(dest[0], _destination_position(pdf, dest[1])) for dest in refs]
-            refs.sort(key=sortfunc)
-            urls = [(uri["/A"]["/URI"], _uri_position(pdf, uri)) for uri in urls]
-            urls.sort(key=sortfunc)
-            texkey_url_list = []
-            for nb, ref in enumerate(refs):
-                current_texkey_urls_dict = {}
-                current_texkey_urls_dict["texkey"] = re_reference_in_dest.match(
-                    ref[0]
-                ).group(1)
-                if nb < len(refs) - 1:
-                    next_reference_data = refs[nb + 1]
-                    matched_urls_for_reference, urls = _match_urls_with_reference(
-                        urls,
-                        ref,
-                        next_reference_data,
-                        two_column_layout=two_column_layout,
-                    )
-                else:
-                    matched_urls_for_reference, urls = _match_urls_with_reference(
-                        urls, ref, two_column_layout=two_column_layout
-                    )
-                if matched_urls_for_reference:
-                    current_texkey_urls_dict["urls"] = matched_urls_for_reference
-                texkey_url_list.append(current_texkey_urls_dict)
-            return texkey_url_list
-        except Exception:
-            LOGGER.debug("PDF: Impossible to determine layout, no TeXkeys returned")
-            return []
+def extract_texkeys_and_urls(pdf):
+    """
+    Extract the texkeys and corresponding urls from an open PDF
 
+    @param pdf: PdfReader of the PDF
 
-def _match_urls_with_reference(
-    urls_to_match, reference, next_reference=None, two_column_layout=False
-):
-    ref_page_number, ref_column, ref_y, _ = reference[1]
-    if next_reference:
-        next_ref_page_number, next_ref_col, next_ref_y, _ = next_reference[1]
-    urls_for_reference = set()
-    for url_index, url in enumerate(urls_to_match):
-        url_page_number, url_col, url_y, _ = url[1]
-        is_url_under_texkey = ref_y <= url_y
-        is_url_in_same_col = ref_column == url_col
-        is_url_in_next_col = url_col > ref_column
-        is_reference_on_same_page_as_url = ref_page_number == url_page_number
-        is_reference_on_previous_page_than_url = ref_page_number + 1 == url_page_number
-        if not next_reference:
-            if (
-                (
-                    is_reference_on_same_page_as_url
-                    and (is_url_in_same_col or is_url_in_next_col)
-                )
-                or is_reference_on_previous_page_than_url
-            ) and is_url_under_texkey:
-                urls_for_reference.add(url[0])
-            continue
-        is_url_between_texkeys = (
-            is_reference_on_same_page_as_url or is_reference_on_previous_page_than_url
-        ) and (ref_y <= url_y <= next_ref_y)
-        is_next_reference_on_the_same_page = next_ref_page_number == url_page_number
-        is_last_reference_in_page = (
-            is_reference_on_same_page_as_url
-            and (next_ref_page_number > url_page_number)
-            and is_url_under_texkey
-        )
-        is_last_reference_in_page_two_col_layout = (
-            is_reference_on_same_page_as_url
-            and is_next_reference_on_the_same_page
-            and is_url_under_texkey
-            and (next_ref_col > url_col)
-            and next_ref_y < url_y
-            and ref_y <= url_y
-            and (is_url_in_same_col or is_url_in_next_col)
-        )
-        is_in_new_column = (
-            is_reference_on_same_page_as_url
-            and is_next_reference_on_the_same_page
-            and ref_y > url_y
-            and (next_ref_col > ref_column)
-            and (next_ref_y > url_y)
+    @return: list of dictionaries with all texkeys
+     and corresponding urls found in the PDF
+    """
+    try:
+        destinations = pdf.named_destinations
+    except Exception:
+        LOGGER.debug("PDF: Internal pypdf error, no TeXkeys returned.")
+        return []
+    # not all named destinations point to references
+    refs = []
+    for destination in destinations.items():
+        destination_key = (
+            destination[0].decode("utf-8")
+            if isinstance(destination[0], ByteStringObject)
+            else destination[0]
         )
-        is_url_for_other_reference_in_new_column = (
-            is_reference_on_same_page_as_url
-            and (next_ref_page_number == url_page_number)
-            and (next_ref_col == ref_column < url_col)
-            and (next_ref_y > url_y)
+        match = re_reference_in_dest.match(destination_key)
+        if match:
+            refs.append(destination)
+    two_column_layout = False
+    try:
+        # position each destination once, and read the width of each page
+        # once
+        page_widths = {}
+        refs = [
+            (dest[0], _destination_position(pdf, dest[1], page_widths)) for dest in refs
+        ]
+        if _destinations_in_two_columns(refs):
+            two_column_layout = True
+            LOGGER.debug("PDF: Using two-column layout")
+
+            def sortfunc(dest_couple):
+                return dest_couple[1]
+
+        else:
+            LOGGER.debug("PDF: Using single-column layout")
+
+            def sortfunc(dest_couple):
+                page, _, ypos, xpos = dest_couple[1]
+                return (page, ypos, xpos)
+
+        refs.sort(key=sortfunc)
+        # only the urls on the pages of the references, or right after
+        # them, can be matched with them
+        urls = []
+        if refs:
+            urls = extract_urls(pdf, refs[0][1][0], refs[-1][1][0] + 1)
+        urls = [(url.uri, _uri_position(pdf, url, page_widths)) for url in urls]
+        urls.sort(key=sortfunc)
+        urls_by_reference = _assign_urls_to_references(
+            refs, urls, two_column_layout=two_column_layout
         )
-        is_url_unrelated_to_references = ref_page_number > url_page_number
-        is_url_for_next_reference = url_y >= next_ref_y
-        if is_url_between_texkeys:
-            if not two_column_layout or (two_column_layout and url_col == ref_column):
+        texkey_url_list = []
+        for ref, matched_urls_for_reference in zip(
+            refs, urls_by_reference, strict=True
+        ):
+            current_texkey_urls_dict = {}
+            current_texkey_urls_dict["texkey"] = re_reference_in_dest.match(
+                ref[0]
+            ).group(1)
+            if matched_urls_for_reference:
+                current_texkey_urls_dict["urls"] = matched_urls_for_reference
+            texkey_url_list.append(current_texkey_urls_dict)
+        return texkey_url_list
+    except Exception:
+        LOGGER.debug("PDF: Impossible to determine layout, no TeXkeys returned")
+        return []
+
+
+def _assign_urls_to_references(refs, urls, two_column_layout=False):
+    """
+    Give the set of urls placed under each reference
+
+    Both lists hold (name, (page, column, -y, x)) couples, sorted by
+    position. They are swept together: the urls already given to a
+    reference, or found above it, are never looked at again.
+
+    @return: list of sets of urls, one for each reference
+    """
+    sweep = _UrlSweep(urls, two_column_layout)
+    urls_by_reference = []
+    start = 0
+    for nb, ref in enumerate(refs):
+        next_ref = refs[nb + 1] if nb < len(refs) - 1 else None
+        urls_for_reference, start = sweep.match(start, ref, next_ref)
+        urls_by_reference.append(urls_for_reference)
+    return urls_by_reference
+
+
+class _UrlSweep:
+    """Urls sorted by position, matched with one reference after the other."""
+
+    def __init__(self, urls, two_column_layout=False):
+        self.urls = urls
+        self.two_column_layout = two_column_layout
+        self.pages = [url[1][0] for url in urls]
+        self.ys = [url[1][2] for url in urls]
+        # highest -y of each block of urls, to skip the blocks which are
+        # entirely above a position
+        self.block_size = max(1, int(len(urls) ** 0.5))
+        self.block_max_ys = [
+            max(self.ys[index : index + self.block_size])
+            for index in range(0, len(urls), self.block_size)
+        ]
+
+    def match(self, start, reference, next_reference=None):
+        """
+        Match a reference with the urls from ``start`` on
+
+        Only the urls on the page of the reference or on the next one can be
+        matched with it. The ones on the previous pages are unrelated to it,
+        and the ones after are only checked for the position of the next
+        reference, which tells where to start from for the next reference.
+
+        @return: the set of urls matched, and the index of the first url to
+         match with the next reference
+        """
+        urls_to_match = self.urls
+        two_column_layout = self.two_column_layout
+        ref_page_number, ref_column, ref_y, _ = reference[1]
+        if next_reference:
+            next_ref_page_number, next_ref_col, next_ref_y, _ = next_reference[1]
+        urls_for_reference = set()
+        url_index = bisect_left(self.pages, ref_page_number, lo=start)
+        while url_index < len(urls_to_match):
+            url = urls_to_match[url_index]
+            url_page_number, url_col, url_y, _ = url[1]
+            if url_page_number > ref_page_number + 1:
+                break
+            url_index += 1
+            is_url_under_texkey = ref_y <= url_y
+            is_url_in_same_col = ref_column == url_col
+            is_url_in_next_col = url_col > ref_column
+            is_reference_on_same_page_as_url = ref_page_number == url_page_number
+            is_reference_on_previous_page_than_url = (
+                ref_page_number + 1 == url_page_number
+            )
+            if not next_reference:
+                if (
+                    (
+                        is_reference_on_same_page_as_url
+                        and (is_url_in_same_col or is_url_in_next_col)
+                    )
+                    or is_reference_on_previous_page_than_url
+                ) and is_url_under_texkey:
+                    urls_for_reference.add(url[0])
+                continue
+            is_url_between_texkeys = (
+                is_reference_on_same_page_as_url
+                or is_reference_on_previous_page_than_url
+            ) and (ref_y <= url_y <= next_ref_y)
+            is_next_reference_on_the_same_page = next_ref_page_number == url_page_number
+            is_last_reference_in_page = (
+                is_reference_on_same_page_as_url
+                and (next_ref_page_number > url_page_number)
+                and is_url_under_texkey
+            )
+            is_last_reference_in_page_two_col_layout = (
+                is_reference_on_same_page_as_url
+                and is_next_reference_on_the_same_page
+                and is_url_under_texkey
+                and (next_ref_col > url_col)
+                and next_ref_y < url_y
+                and ref_y <= url_y
+                and (is_url_in_same_col or is_url_in_next_col)
+            )
+            is_in_new_column = (
+                is_reference_on_same_page_as_url
+                and is_next_reference_on_the_same_page
+                and ref_y > url_y
+                and (next_ref_col > ref_column)
+                and (next_ref_y > url_y)
+            )
+            is_url_for_other_reference_in_new_column = (
+                is_reference_on_same_page_as_url
+                and (next_ref_page_number == url_page_number)
+                and (next_ref_col == ref_column < url_col)
+                and (next_ref_y > url_y)
+            )
+            is_url_for_next_reference = url_y >= next_ref_y
+            if is_url_between_texkeys:
+                if not two_column_layout or url_col == ref_column:
+                    urls_for_reference.add(url[0])
+                    continue
+            elif (
+                is_last_reference_in_page
+                or is_last_reference_in_page_two_col_layout
+                or is_in_new_column
+            ):
                 urls_for_reference.add(url[0])
                 continue
-        elif (
-            is_last_reference_in_page
-            or is_last_reference_in_page_two_col_layout
-            or is_in_new_column
-        ):
-            urls_for_reference.add(url[0])
-            continue
-        elif is_url_unrelated_to_references:
-            continue
-        elif is_url_for_next_reference or is_url_for_other_reference_in_new_column:
-            urls_to_match = urls_to_match[url_index:]
-            break
-    if not next_reference:
-        urls_to_match = []
-    return urls_for_reference, urls_to_match
-
-
-def _destinations_in_two_columns(pdf, destinations, cutoff=3):
+            elif is_url_for_next_reference or is_url_for_other_reference_in_new_column:
+                return urls_for_reference, url_index - 1
+        if not next_reference:
+            return urls_for_reference, len(urls_to_match)
+        # the urls on the following pages are for the next reference from
+        # the first one under its position
+        next_start = self._find_url_under(url_index, next_ref_y)
+        return urls_for_reference, start if next_start is None else next_start
+
+    def _find_url_under(self, start, y):
+        """Return the index of the first url from ``start`` whose -y is at
+        least ``y``, or None."""
+        index = start
+        while index < len(self.ys):
+            if (
+                index % self.block_size == 0
+                and self.block_max_ys[index // self.block_size] < y
+            ):
+                index += self.block_size
+            elif self.ys[index] >= y:
+                return index
+            else:
+                index += 1
+        return None
+
+
+def _destinations_in_two_columns(destinations, cutoff=3):
     """
     Check if the named destinations are organized along two columns (heuristic)
 
-    @param pdf: a PdfReader object
-    @param destinations:
+    @param destinations: list of (name, position) of the named destinations,
+     as given by _destination_position
 
     'cutoff' is used to tune the heuristic: if 'cutoff' destinations in the
     would-be second column start at the same position, return True
     """
     # iterator for the x coordinates of refs in the would-be second column
-    xpositions = (
-        _destination_position(pdf, dest)[3]
-        for (_, dest) in destinations
-        if _destination_position(pdf, dest)[1] == 1
-    )
+    xpositions = (position[3] for (_, position) in destinations if position[1] == 1)
     xpos_count = {}
     for xpos in xpositions:
         xpos_count[xpos] = xpos_count.get(xpos, 0) + 1
@@ -218,7 +312,15 @@ def _destinations_in_two_columns(pdf, destinations, cutoff=3):
     return False
 
 
-def _destination_position(pdf, destination):
+def _page_width(pdf, page_nb, page_widths):
+    """Return the width of a page, cached in the ``page_widths`` dict."""
+    pagewidth = page_widths.get(page_nb)
+    if pagewidth is None:
+        pagewidth = page_widths[page_nb] = pdf.pages[page_nb].cropbox.lower_right[0]
+    return pagewidth
+
+
+def _destination_position(pdf, destination, page_widths=None):
     """
     Gives a tuple (page, column, -y, x) representing the position of the
     NamedDestination
@@ -226,42 +328,45 @@ def _destination_position(pdf, destination):
     This representation is useful for sorting named destinations and
     assumes the text has at most 2 columns
     """
-    pagewidth = pdf.pages[
-        pdf.get_destination_page_number(destination)
-    ].cropbox.lower_right[0]
+    page_nb = pdf.get_destination_page_number(destination)
+    pagewidth = _page_width(pdf, page_nb, {} if page_widths is None else page_widths)
     if not destination.left or not destination.top:
         raise IncompleteCoordinatesError(destination)
     # assuming max 2 columns
     column = (2 * destination.left) // pagewidth
     return (
-        pdf.get_destination_page_number(destination),
+        page_nb,
         column,
         -destination.top,
         destination.left,
     )
 
 
-def _uri_position(pdf, uri_destination):
+def _uri_position(pdf, link, page_widths=None):
     """
     Gives a tuple (page, column, -y, x) representing the position of the URI
     """
-    page_nb = uri_destination.get("page_nb")
-    destintation_left = uri_destination["/Rect"][0]
-    destintation_top = uri_destination["/Rect"][3]
-    pagewidth = pdf.get_page(page_nb).cropbox.lower_right[0]
-    column = (2 * destintation_left) // pagewidth
+    pagewidth = _page_width(
+        pdf, link.page_nb, {} if page_widths is None else page_widths
+    )
+    column = (2 * link.left) // pagewidth
     # neccessary to exclude column from sorting
-    return (page_nb, column, -destintation_top, destintation_left)
+    return (link.page_nb, column, -link.top, link.left)
 
 
-def extract_urls(pdf):
+def extract_urls(pdf, first_page=0, last_page=None):
+    """
+    Return the links to URIs of the pages of a PDF, as PdfLink records
+
+    Only the annotations of the pages from ``first_page`` to ``last_page``
+    (included, numbered from 0) are read.
+    """
+    if last_page is None or last_page >= len(pdf.pages):
+        last_page = len(pdf.pages) - 1
     urls = []
-    pages = len(pdf.pages)
-    for page_nb in range(pages):
-        page = pdf.pages[page_nb]
-        page_object = page.get_object()
-        urls_for_page = _get_urls_data_from_page_object(page_object, page_nb)
-        urls.extend(urls_for_page)
+    for page_nb in range(first_page, last_page + 1):
+        page_object = pdf.pages[page_nb].get_object()
+        urls.extend(_get_urls_data_from_page_object(page_object, page_nb))
     return urls
 
 
@@ -270,7 +375,8 @@ def _get_urls_data_from_page_object(page_object, page_nb):
     annotations = page_object.get("/Annots", [])
     for annotation in annotations:
         annotation_object = annotation.get_object()
-        if "/URI" in annotation_object["/A"]:
-            annotation_object.update({"page_nb": page_nb})
-            urls_at_page.append(annotation_object)
+        action = annotation_object["/A"]
+        if "/URI" in action:
+            rect = annotation_object["/Rect"]
+            urls_at_page.append(PdfLink(action["/URI"], page_nb, rect[0], rect[3]))
     return urls_at_page
@@ -24,6 +24,8 @@
 import re
 from datetime import datetime
 
+from refextract.references.trie import KeywordTrie
+
 # Sep
 re_sep = r"\s*[,\s:-]\s*"
 # Sep or no sep
@@ -125,9 +127,9 @@ RE_ATLAS_CONF_POST_2010 = re.compile(
 
 
 # Pattern for old arxiv numbers
+old_arxiv_num = r"(?:9[1-9]|0[0-7])(?:0[1-9]|1[0-2])\d{3}"
 old_arxiv_numbers = (
-    r"[\|/:\s-]?(?P<num>(?:9[1-9]|0[0-7])(?:0[1-9]|1[0-2])\d{3})("
-    r"?:v\d{1,3})?(?=[^\w\d]|$)"
+    r"[\|/:\s-]?(?P<num>" + old_arxiv_num + r")(?:v\d{1,3})?(?=[^\w\d]|$)"
 )
 
 old_arxiv = {
@@ -260,6 +262,28 @@ def compute_arxiv_re(report_pattern, report_number):
 
 
 RE_OLD_ARXIV = [compute_arxiv_re(*i) for i in old_arxiv.items()]
+RE_OLD_ARXIV_NUM = re.compile(old_arxiv_num, re.U)
+
+
+def compute_arxiv_categories(report_patterns):
+    """Index the old arxiv patterns by the literal start of their category.
+
+    Returns a trie mapping each (lower-cased) literal to the indexes of the
+    patterns starting with it, and the set of indexes of the patterns that
+    have no literal start.
+    """
+    categories = KeywordTrie()
+    unindexed = set()
+    for index, report_pattern in enumerate(report_patterns):
+        literal = re.split(r"[\\\[\](){}.*+?|^$]", report_pattern)[0].lower()
+        if literal:
+            categories.add(literal, categories.get(literal, ()) + (index,))
+        else:
+            unindexed.add(index)
+    return categories, unindexed
+
+
+RE_OLD_ARXIV_CATEGORIES, RE_OLD_ARXIV_UNINDEXED = compute_arxiv_categories(old_arxiv)
 
 
 def compute_years(start_year=1991):
@@ -429,6 +453,13 @@ re_title_followed_by_implied_series = re.compile(
 
 re_punctuation = re.compile(r"[\.\,\;\'\(\)\-]", re.UNICODE)
 
+# Everything but (upper-case) letters and digits, to compare book titles
+re_non_alphanumeric = re.compile(r"[^A-Z0-9]")
+
+# Characters with a special meaning in regexps, to tell apart the KB
+# entries which are plain strings
+re_regexp_special_chars = re.compile(r"[\\.^$*+?{}\[\]|()]")
+
 # The following pattern is used to recognise "citation items" that have been
 # identified in the line, when building a MARC XML representation of the line:
 re_tagged_citation = re.compile(
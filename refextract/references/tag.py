@@ -50,6 +50,9 @@ from refextract.references.regexs import (
     RE_ATLAS_CONF_POST_2010,
     RE_ATLAS_CONF_PRE_2010,
     RE_OLD_ARXIV,
+    RE_OLD_ARXIV_CATEGORIES,
+    RE_OLD_ARXIV_NUM,
+    RE_OLD_ARXIV_UNINDEXED,
     re_arxiv,
     re_arxiv_5digits,
     re_correct_numeration_2nd_try_ptn1,
@@ -83,6 +86,7 @@ from refextract.references.regexs import (
     re_series_from_numeration_after_volume,
     re_wash_volume_tag,
 )
+from refextract.references.trie import is_word_char
 
 
 def tag_reference_line(line, kbs, record_titles_count):
@@ -120,8 +124,6 @@ def tag_reference_line(line, kbs, record_titles_count):
     # Some journals need to match exact regexps because they can
     # conflict with other elements
     # e.g. DAN is also a common first name
-    standardised_titles = kbs["journals"][1]
-    standardised_titles.update(kbs["journals_re"])
     journals_matches = identifiy_journals_re(working_line1, kbs["journals_re"])
 
     # Remove identified tags
@@ -172,13 +174,63 @@ def tag_reference_line(line, kbs, record_titles_count):
         pprint_repnum_matchtext=found_pprint_repnum_replstr,
         publishers_matches=publishers_matches,
         removed_spaces=removed_spaces,
-        standardised_titles=standardised_titles,
+        standardised_titles=kbs.standardised_titles,
         kbs=kbs,
     )
 
     return tagged_line, record_titles_count
 
 
+def tag_journal_reference_line(line, kbs):
+    """Tag a reference line only as much as needed to find its journal
+    references.
+
+    This is tag_reference_line without the identification of the
+    publishers, authors and collaborations, which the journal references
+    don't depend on, and without counting the 'bad titles'.
+    The quoted text, ISBNs and report numbers are still tagged so that
+    journal titles aren't looked for inside them.
+    """
+    working_line1 = wash_line(line)
+    working_line1 = tag_pos_volume(working_line1)
+    working_line1 = wash_line(working_line1)
+    working_line1 = tag_quoted_text(working_line1)
+    working_line1 = tag_isbn(working_line1)
+    working_line1 = tag_arxiv(working_line1)
+    working_line1 = tag_arxiv_more(working_line1)
+    working_line1 = tag_pos_volume(working_line1)
+    working_line1 = tag_atlas_conf(working_line1)
+    journals_matches = identifiy_journals_re(working_line1, kbs["journals_re"])
+
+    working_line2 = strip_tags(working_line1).upper()
+    working_line2 = re_punctuation.sub(" ", working_line2)
+    removed_spaces, working_line2 = remove_and_record_multiple_spaces_in_line(
+        working_line2
+    )
+    found_pprint_repnum_matchlens, found_pprint_repnum_replstr, working_line2 = (
+        identify_report_numbers(working_line2, kbs["report-numbers"])
+    )
+    journals_matches_more, working_line2, dummy_titles_count = identify_journals(
+        working_line2, kbs["journals"]
+    )
+    journals_matches.update(journals_matches_more)
+    if working_line2.upper().find("IBID") != -1:
+        found_ibids_matchtext, working_line2 = identify_ibids(working_line2)
+        journals_matches.update(found_ibids_matchtext)
+
+    return process_reference_line(
+        working_line=working_line1,
+        journals_matches=journals_matches,
+        pprint_repnum_len=found_pprint_repnum_matchlens,
+        pprint_repnum_matchtext=found_pprint_repnum_replstr,
+        publishers_matches={},
+        removed_spaces=removed_spaces,
+        standardised_titles=kbs.standardised_titles,
+        kbs=kbs,
+        tag_authors=False,
+    )
+
+
 def process_reference_line(
     working_line,
     journals_matches,
@@ -188,6 +240,7 @@ def process_reference_line(
     removed_spaces,
     standardised_titles,
     kbs,
+    tag_authors=True,
 ):
     """After the phase of identifying and tagging citation instances
     in a reference line, this function is called to go through the
@@ -227,6 +280,8 @@ def process_reference_line(
      within the line at which the spaces were removed.
     @param standardised_titles: (dictionary) - The standardised journal
      titles, keyed by the non-standard version of those titles.
+    @param tag_authors: (boolean) - whether to tag the authors and the
+     collaborations found in the line.
     @return: (tuple) of 5 components:
                ( string  -> a MARC XML-ized reference line.
                  integer -> number of fields of miscellaneous text marked-up
@@ -311,7 +366,7 @@ def process_reference_line(
                     startpos=startpos,
                     true_replacement_index=true_replacement_index,
                     extras=extras,
-                    kb_publishers=kbs["publishers"],
+                    kb_publishers=kbs["publishers"].publishers,
                 )
                 tagged_line += rebuilt_chunk
 
@@ -324,10 +379,13 @@ def process_reference_line(
         # e.g. B 20 -> B20
         tagged_line = wash_volume_tag(tagged_line)
 
-    # Try to find any authors in the line
-    tagged_line = identify_and_tag_authors(tagged_line, kbs["authors"])
-    # Try to find any collaboration in the line
-    tagged_line = identify_and_tag_collaborations(tagged_line, kbs["collaborations"])
+    if tag_authors:
+        # Try to find any authors in the line
+        tagged_line = identify_and_tag_authors(tagged_line, kbs["authors"])
+        # Try to find any collaboration in the line
+        tagged_line = identify_and_tag_collaborations(
+            tagged_line, kbs["collaborations"]
+        )
 
     return tagged_line.replace("\n", "")
 
@@ -388,12 +446,40 @@ def tag_arxiv_more(line):
     """
     line = RE_ARXIV_CATCHUP.sub(r"\g<suffix>/\g<year>\g<month>\g<num>", line)
 
-    for report_re, report_repl in RE_OLD_ARXIV:
+    if not RE_OLD_ARXIV_NUM.search(line):
+        return line
+
+    candidates = find_old_arxiv_candidates(line)
+    for index, (report_re, report_repl) in enumerate(RE_OLD_ARXIV):
+        if candidates is not None and index not in candidates:
+            continue
         report_number = report_repl + r"/\g<num>"
-        line = report_re.sub("<cds.ARXIV>" + report_number + "</cds.ARXIV>", line)
+        line, count = report_re.subn(
+            "<cds.ARXIV>" + report_number + "</cds.ARXIV>", line
+        )
+        if count:
+            # the replacement can bring in the category of another pattern
+            candidates = find_old_arxiv_candidates(line)
     return line
 
 
+def find_old_arxiv_candidates(line):
+    """Return the indexes in RE_OLD_ARXIV of the patterns which can match
+    the line, i.e. whose category appears in it.
+
+    The patterns are case insensitive, so None (any pattern can match) is
+    returned for non-ASCII lines, where lower-casing is not enough.
+    """
+    if not line.isascii():
+        return None
+    candidates = set(RE_OLD_ARXIV_UNINDEXED)
+    for _dummy_start, _dummy_end, indexes in RE_OLD_ARXIV_CATEGORIES.finditer(
+        line.lower()
+    ):
+        candidates.update(indexes)
+    return candidates
+
+
 def tag_pos_volume(line):
     """Tag POS volume number
 
@@ -870,7 +956,10 @@ def identify_and_tag_collaborations(line, collaborations_kb):
     which won't influence the reference splitting heuristics
     (used when looking at mulitple <AUTH> tags in a line).
     """
-    for _dummy_collab, re_collab in collaborations_kb.items():
+    # tagging a collaboration only replaces text with tags, so it can't
+    # make another collaboration appear: the candidates are found once
+    for collab in find_kb_candidates(strip_tags(line), collaborations_kb):
+        re_collab = collaborations_kb.patterns[collab]
         matches = re_collab.finditer(strip_tags(line))
 
         for match in reversed(list(matches)):
@@ -1160,17 +1249,11 @@ def identify_journals(line, kb_journals):
     length in line, and non-standardised version) will be recorded,
     and they will be replaced in the working line by underscores.
     @param line: (string) - the working reference line.
-    @param periodical_title_search_kb: (dictionary) - contains the
-     regexp patterns used to search for a non-standard TITLE in the
-     working reference line. Keyed by the TITLE string itself.
-    @param periodical_title_search_keys: (list) - contains the non-
-     standard periodical TITLEs to be searched for in the line. This
-     list of titles has already been ordered and is used to force
-     the order of searching.
-    @return: (tuple) containing 4 elements:
-                     + (dictionary) - the lengths of all titles
-                                      matched at each given index
-                                      within the line.
+    @param kb_journals: (JournalsKb) - the journals knowledge base, as built by
+     build_journals_kb. Its trie is used to find all the candidate titles
+     of the line in one pass; the candidates are then accepted in the
+     order of the (ordered) list of non-standard titles.
+    @return: (tuple) containing 3 elements:
                      + (dictionary) - the text actually matched for
                                       each title at each given
                                       index within the line.
@@ -1180,48 +1263,90 @@ def identify_journals(line, kb_journals):
                      + (dictionary) - the totals for each bad-title
                                       found in the line.
     """
-    periodical_title_search_kb = kb_journals[0]
-    periodical_title_search_keys = kb_journals[2]
+    periodical_title_search_trie = kb_journals.trie
 
     title_matches = {}  # the text matched at the given line
     # location (i.e. the title itself)
     titles_count = {}  # sum totals of each 'bad title found in
     # line.
 
+    # Find all the candidate titles, in the order in which the titles
+    # have to be searched for (longest first), then by position:
+    candidates = sorted(
+        (priority, start, title, is_repl_term)
+        for start, _dummy_end, (
+            priority,
+            title,
+            is_repl_term,
+        ) in periodical_title_search_trie.finditer(line)
+    )
+
     # Begin searching:
-    for title in periodical_title_search_keys:
-        # search for all instances of the current periodical title
-        # in the line:
-        # for each matched periodical title:
-        for title_match in periodical_title_search_kb[title].finditer(line):
-            if title not in titles_count:
-                # Add this title into the titles_count dictionary:
-                titles_count[title] = 1
-            else:
-                # Add 1 to the count for the given title:
-                titles_count[title] += 1
-
-            # record the details of this title match:
-            # record the match length:
-            title_matches[title_match.start()] = title
-
-            len_to_replace = len(title)
-
-            # replace the matched title text in the line it n * '_',
-            # where n is the length of the matched title:
-            line = "".join(
-                (
-                    line[: title_match.start()],
-                    "_" * len_to_replace,
-                    line[title_match.start() + len_to_replace :],
-                )
+    previous_title = None
+    search_from = 0
+    for _dummy_priority, start, title, is_repl_term in candidates:
+        if title != previous_title:
+            previous_title = title
+            search_from = 0
+        if start < search_from:
+            # overlaps with the previous match of this title
+            continue
+        if not is_title_match(line, start, title, is_repl_term):
+            continue
+
+        if title not in titles_count:
+            # Add this title into the titles_count dictionary:
+            titles_count[title] = 1
+        else:
+            # Add 1 to the count for the given title:
+            titles_count[title] += 1
+
+        # record the details of this title match:
+        # record the match length:
+        title_matches[start] = title
+
+        len_to_replace = len(title)
+        # the character following the title is part of the match
+        search_from = start + len_to_replace + 1
+
+        # replace the matched title text in the line it n * '_',
+        # where n is the length of the matched title:
+        line = "".join(
+            (
+                line[:start],
+                "_" * len_to_replace,
+                line[start + len_to_replace :],
             )
+        )
 
     # return recorded information about matched periodical titles,
     # along with the newly changed working line:
     return title_matches, line, titles_count
 
 
+def is_title_match(line, start, title, is_repl_term):
+    """Check that a title found at position start is a real match.
+
+    The title must still be present in the line (it might have been
+    replaced by a longer title) and be correctly delimited. Titles coming
+    from the KB must not be surrounded by word characters. Titles added
+    from the standardised versions must start on a word boundary not
+    preceded by a slash and must not be followed by a letter or a digit.
+    """
+    end = start + len(title)
+    if end >= len(line) or not line.startswith(title, start):
+        return False
+    previous_is_word = start > 0 and is_word_char(line[start - 1])
+    next_char = line[end]
+    if is_repl_term:
+        if start > 0 and line[start - 1] == "/":
+            return False
+        if previous_is_word == is_word_char(title[0]):
+            return False
+        return not ("A" <= next_char <= "Z" or "0" <= next_char <= "9")
+    return not previous_is_word and not is_word_char(next_char)
+
+
 def identify_report_numbers(line, kb_reports):
     """Attempt to identify all preprint report numbers in a reference
     line.
@@ -1230,11 +1355,9 @@ def identify_report_numbers(line, kb_reports):
     will be recorded, and they will be replaced in the working-line
     by underscores.
     @param line: (string) - the working reference line.
-    @param preprint_repnum_search_kb: (dictionary) - contains the
-     regexp patterns used to identify preprint report numbers.
-    @param preprint_repnum_standardised_categs: (dictionary) -
-     contains the standardised 'category' of a given preprint report
-     number.
+    @param kb_reports: (ReportNumbersKb) - the report numbers knowledge
+     base, as built by build_reportnum_kb. Only the patterns whose
+     category appears in the line are tried.
     @return: (tuple) - 3 elements:
         * a dictionary containing the lengths in the line of the
           matched preprint report numbers, keyed by the index at
@@ -1250,31 +1373,27 @@ def identify_report_numbers(line, kb_reports):
           working-line)
     """
 
-    def _by_len(a, b):
-        """Comparison function used to sort a list by the length of the
-        strings in each element of the list.
-        """
-        if len(a[1]) < len(b[1]):
-            return 1
-        elif len(a[1]) == len(b[1]):
-            return 0
-        else:
-            return -1
-
     repnum_matches_matchlen = {}  # info about lengths of report numbers
     # matched at given locations in line
     repnum_matches_repl_str = {}  # standardised report numbers matched
     # at given locations in line
 
-    repnum_search_kb, repnum_standardised_categs = kb_reports
-    repnum_categs = sorted(
-        repnum_standardised_categs.keys(), key=lambda x: (len(x[1]), x), reverse=True
-    )
+    repnum_search_kb = kb_reports.search_patterns
+    repnum_standardised_categs = kb_reports.standardised_categs
     # Handle CERN/LHCC/98-013
     line = line.replace("/", " ")
 
+    # only the patterns whose category appears in the line can match:
+    line_categs = set(kb_reports.unindexed_categs)
+    for _dummy_start, _dummy_end, categs in kb_reports.categ_trie.finditer(line):
+        line_categs.update(categs)
+    if not line_categs:
+        return repnum_matches_matchlen, repnum_matches_repl_str, line
+
     # try to match preprint report numbers in the line:
-    for categ in repnum_categs:
+    for categ in kb_reports.ordered_categs:
+        if categ not in line_categs:
+            continue
         # search for all instances of the current report
         # numbering style in the line:
         repnum_matches_iter = repnum_search_kb[categ].finditer(line)
@@ -1317,14 +1436,35 @@ def identify_publishers(line, kb_publishers):
     matches_repl = {}  # standardised report numbers matched
     # at given locations in line
 
-    for abbrev, info in kb_publishers.items():
-        for match in info["pattern"].finditer(line):
+    candidates = find_kb_candidates(line, kb_publishers)
+    for abbrev in candidates:
+        for match in kb_publishers.publishers[abbrev]["pattern"].finditer(line):
             # record the matched non-standard version of the publisher:
             matches_repl[match.start(0)] = abbrev
 
     return matches_repl
 
 
+def find_kb_candidates(line, kb):
+    """Return the keys of the entries of an indexed KB which can match the
+    line, in the order of the KB.
+
+    @param kb: a KB with a keyword_trie and a set of unindexed entries, as
+     built by build_keyword_index.
+    """
+    if line.isascii():
+        candidates = set(kb.unindexed)
+        for _dummy_start, _dummy_end, entries in kb.keyword_trie.finditer(line.lower()):
+            candidates.update(entries)
+    else:
+        # lower-casing is not enough to compare non-ASCII text
+        # case-insensitively, so every entry is tried
+        candidates = set(kb.unindexed)
+        for entries in kb.keyword_trie.values():
+            candidates.update(entries)
+    return [key for _dummy_position, key in sorted(candidates)]
+
+
 def identify_and_tag_URLs(line):
     """Given a reference line, identify URLs in the line, record the
     information about them, and replace them with a "<cds.URL />" tag.
@@ -67,6 +67,7 @@ def extract_references_from_fulltext(fulltext):
         LOGGER.debug("extract_references_from_fulltext: ref_sect_start is None")
     else:
         # If a reference section was found, however weak
+        how_found_start = ref_sect_start["how_found_start"]
         ref_sect_end = find_end_of_reference_section(
             fulltext,
             ref_sect_start["start_line"],
@@ -164,6 +165,17 @@ def strip_footer(ref_lines, section_title):
     return [line for line in ref_lines if not re_footer.match(line)]
 
 
+def join_reference_line(lines):
+    """Join the (broken) lines of a single reference into one line.
+    @param lines: (list) of strings, the lines of the reference.
+    @return: (string) the reference line.
+    """
+    working_line = ""
+    for line in lines[:CFG_REFEXTRACT_MAX_LINES]:
+        working_line = join_lines(working_line, line.strip())
+    return working_line.rstrip()
+
+
 def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
     """Given a reference section, rebuild the reference lines. After translation
     from PDF to text, reference lines are often broken. This is because
@@ -218,13 +230,6 @@ def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
     rebuilt_references = []
     working_ref = []
 
-    def prepare_ref(working_ref):
-        working_ref = working_ref[:CFG_REFEXTRACT_MAX_LINES]
-        working_line = ""
-        for line in working_ref:
-            working_line = join_lines(working_line, line.strip())
-        return working_line.rstrip()
-
     lower_case_start = re.compile(r"[a-z]")
     continuing_line_markers = re.compile(r"[,&-]$")
 
@@ -277,7 +282,7 @@ def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
 
                 # Append current working line to the refs list
                 if working_ref:
-                    rebuilt_references.append(prepare_ref(working_ref))
+                    rebuilt_references.append(join_reference_line(working_ref))
 
                 current_ref = marknum
                 working_ref = []
@@ -297,7 +302,7 @@ def rebuild_reference_lines(ref_sectn, ref_line_marker_ptn):
 
     if working_ref:
         # Append last line
-        rebuilt_references.append(prepare_ref(working_ref))
+        rebuilt_references.append(join_reference_line(working_ref))
 
     return rebuilt_references
 
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Multi-keyword matching used to replace per-entry regexp loops over KBs."""
+
+# Key under which a trie node stores the value of the keyword ending there.
+# Lines are walked one character at a time, so the empty string can never
+# collide with a real transition.
+_TERMINAL = ""
+
+
+def is_word_char(char):
+    """Same definition as ``\\w`` for unicode regexps."""
+    return char.isalnum() or char == "_"
+
+
+class KeywordTrie:
+    """Character trie finding every occurrence of a set of literal keywords.
+
+    The nodes are plain nested dictionaries so that the structure can be
+    pickled and shared between processes as is.
+    """
+
+    def __init__(self, keywords=()):
+        self.root = {}
+        for keyword in keywords:
+            self.add(keyword)
+
+    def __contains__(self, keyword):
+        node = self._node(keyword)
+        return node is not None and _TERMINAL in node
+
+    def add(self, keyword, value=None):
+        """Add ``keyword``; ``value`` is returned with each match.
+
+        When no value is given, the keyword itself is used.
+        """
+        if not keyword:
+            return
+        node = self.root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[_TERMINAL] = keyword if value is None else value
+
+    def get(self, keyword, default=None):
+        node = self._node(keyword)
+        if node is None or _TERMINAL not in node:
+            return default
+        return node[_TERMINAL]
+
+    def values(self):
+        """Yield the values of all the keywords, in no particular order."""
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            for char, child in node.items():
+                if char == _TERMINAL:
+                    yield child
+                else:
+                    nodes.append(child)
+
+    def finditer(self, line, start=0, end=None):
+        """Yield ``(start, end, value)`` for every keyword found in the line.
+
+        Matches are reported by increasing start position and, for the same
+        start, by increasing length. Overlapping matches are all reported;
+        resolving them is left to the caller.
+        """
+        root = self.root
+        if end is None:
+            end = len(line)
+        for pos in range(start, end):
+            node = root.get(line[pos])
+            idx = pos + 1
+            while node is not None:
+                if _TERMINAL in node:
+                    yield pos, idx, node[_TERMINAL]
+                if idx == end:
+                    break
+                node = node.get(line[idx])
+                idx += 1
+
+    def _node(self, keyword):
+        node = self.root
+        for char in keyword:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
@@ -21,16 +21,35 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
 import pytest
 import responses
 
+from refextract.documents.pdf import (
+    PDF_TEXT_BACKENDS,
+    stream_PDF_to_plaintext_with_pypdf,
+)
+from refextract.references import api, engine
 from refextract.references.api import (
     extract_journal_reference,
+    extract_journal_references,
+    extract_references_from_bytes,
     extract_references_from_file,
+    extract_references_from_fileobj,
+    extract_references_from_files,
+    extract_references_from_raw_references,
     extract_references_from_string,
     extract_references_from_url,
+    register_kbs,
 )
+from refextract.references.cache import SqliteParseCache
 from refextract.references.errors import FullTextNotAvailableError
+from refextract.references.kbs import unregister_kbs
+from refextract.references.pdf import extract_texkeys_and_urls
 
 
 @pytest.fixture
@@ -120,12 +139,79 @@ def test_journal_extract():
     assert r["title"] == "Science"
 
 
+def test_extract_journal_references():
+    lines = [
+        "Science Vol. 338 no. 6108 (2012) pp. 773-775",
+        "no journal in here",
+        "[5] A. Smith, Phys. Rev. D 68 (2003) 037502, hep-ph/0306183",
+        "Science Vol. 338 no. 6108 (2012) pp. 773-775",
+    ]
+    r = extract_journal_references(lines)
+    assert len(r) == 4
+    assert r[0] == extract_journal_reference(lines[0])
+    assert r[1] is None
+    assert r[2]["title"] == "Phys. Rev. D"
+    assert r[2]["volume"] == "68"
+    assert r[2]["year"] == "2003"
+    assert r[2]["page"] == "037502"
+    assert r[3] == r[0]
+    assert r[3] is not r[0]
+
+
 def test_extract_references_from_string(kbs_override):
     ref_lines = """[9] R. Bousso, JHEP 9906:028 (1999); hep-th/9906022."""
     r = extract_references_from_string(ref_lines, override_kbs_files=kbs_override)
     assert len(r) == 2
 
 
+def test_extract_references_from_raw_references(monkeypatch):
+    raw_references = [
+        "[1] S. Weinberg, A Model of Leptons,\nPhys. Rev. Lett. 19 (1967) 1264",
+        "",
+        "[3] Phys. Lett. B 716 (2012) 1; Phys. Rev. D 86 (2012) 010001",
+        "[4] J. Smith, a book of tests, boom",
+    ]
+    results = extract_references_from_raw_references(raw_references)
+    assert [result.raw_ref for result in results] == raw_references
+    assert all(result.error is None for result in results)
+    assert results[0].references == extract_references_from_string(raw_references[0])
+    assert results[0].references[0]["raw_ref"] == [
+        "[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264"
+    ]
+    assert results[1].references == []
+    assert len(results[2].references) == 2
+
+    parse_reference_line = engine.parse_reference_line
+
+    def fail_on_boom(line, *args):
+        if "boom" in line:
+            raise ValueError("boom")
+        return parse_reference_line(line, *args)
+
+    linked = []
+
+    def linker_callback(element):
+        linked.append(element)
+
+    extract_references_from_raw_references(
+        raw_references[:3], linker_callback=linker_callback
+    )
+    linked_count = len(linked)
+    linked.clear()
+
+    monkeypatch.setattr(engine, "parse_reference_line", fail_on_boom)
+    failed = extract_references_from_raw_references(
+        raw_references + [None], linker_callback=linker_callback
+    )
+    assert failed[:3] == results[:3]
+    assert failed[3].references is None
+    assert isinstance(failed[3].error, ValueError)
+    assert failed[4].references is None
+    assert isinstance(failed[4].error, AttributeError)
+    # the lines which were parsed are linked once
+    assert len(linked) == linked_count
+
+
 def test_extract_references_from_file(pdf_files):
     pdf = pdf_files["1503.07589v1.pdf"]
     r = extract_references_from_file(pdf)
@@ -151,6 +237,154 @@ def test_extract_references_from_file_dois_as_pdfs_annotations(pdf_files):
     assert len(extracted_references) == 39
 
 
+def test_extract_references_from_file_with_pypdf(pdf_files):
+    extracted_references = extract_references_from_file(
+        pdf_files["2503.05372.pdf"], text_backend="pypdf"
+    )
+    assert len(extracted_references) == 39
+    assert "Cahn:2003cw" in extracted_references[0]["texkey"]
+    with pytest.raises(ValueError, match="Unknown PDF text backend"):
+        extract_references_from_file(pdf_files["2503.05372.pdf"], text_backend="nope")
+
+
+def test_extract_references_from_bytes(pdf_files):
+    pdf = Path(pdf_files["2503.05372.pdf"]).read_bytes()
+    extracted_references = extract_references_from_bytes(
+        b"junk" + pdf + b"more junk", text_backend="pypdf"
+    )
+    assert len(extracted_references) == 39
+    assert "Cahn:2003cw" in extracted_references[0]["texkey"]
+
+    extracted_references = extract_references_from_fileobj(
+        io.BytesIO(pdf), text_backend="pypdf"
+    )
+    assert len(extracted_references) == 39
+
+    text = b"References\n[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264\n"
+    extracted_references = extract_references_from_bytes(text)
+    assert extracted_references[0]["journal_title"] == ["Phys. Rev. Lett."]
+
+
+@pytest.fixture
+def text_documents(tmp_path):
+    paths = []
+    for nb in range(3):
+        path = tmp_path / ("document%d.txt" % nb)
+        path.write_text(
+            "Some text\n\nReferences\n"
+            "[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264\n"
+            "[2] J. Smith, PHYS REV D %d (2008) 10\n" % (nb + 1)
+        )
+        paths.append(path.as_posix())
+    return paths
+
+
+def test_extract_references_from_files(text_documents):
+    missing = os.path.join(os.path.dirname(text_documents[0]), "missing.txt")
+    results = extract_references_from_files(
+        iter(text_documents + [missing]), max_workers=2
+    )
+    results = sorted(results, key=lambda result: result.path)
+    assert [result.path for result in results] == text_documents + [missing]
+    for result in results[:3]:
+        assert result.error is None
+        assert result.references == extract_references_from_file(result.path)
+    assert results[3].references is None
+    assert isinstance(results[3].error, FullTextNotAvailableError)
+
+
+def test_extract_references_from_files_when_a_worker_dies(text_documents, monkeypatch):
+    crash = os.path.join(os.path.dirname(text_documents[0]), "crash.txt")
+    extract = api.extract_references_from_file
+
+    def exit_on_crash(path, **kwargs):
+        if path == crash:
+            os._exit(1)
+        return extract(path, **kwargs)
+
+    # inherited by the worker processes, which are forked
+    monkeypatch.setattr(api, "extract_references_from_file", exit_on_crash)
+    paths = text_documents[:2] + [crash] + text_documents[2:] * 3
+    results = list(extract_references_from_files(paths, max_workers=2))
+    assert sorted(result.path for result in results) == sorted(paths)
+    for result in results:
+        if result.path == crash:
+            assert result.references is None
+            assert isinstance(result.error, BrokenProcessPool)
+        else:
+            assert result.error is None
+            assert result.references == extract(result.path)
+
+
+def test_extract_references_from_files_with_registered_kbs(
+    text_documents, kbs_override
+):
+    register_kbs("batch-test", kbs_override)
+    try:
+        results = list(
+            extract_references_from_files(
+                text_documents,
+                max_workers=2,
+                chunksize=2,
+                override_kbs_files="batch-test",
+            )
+        )
+    finally:
+        unregister_kbs("batch-test")
+    results = sorted(results, key=lambda result: result.path)
+    assert [result.references for result in results] == [
+        extract_references_from_file(path, override_kbs_files=kbs_override)
+        for path in text_documents
+    ]
+
+
+def test_extract_references_from_files_with_parse_cache(text_documents, tmpdir):
+    parse_cache = SqliteParseCache(str(tmpdir.join("cache.db")))
+    results = list(
+        extract_references_from_files(
+            text_documents, max_workers=2, parse_cache=parse_cache
+        )
+    )
+    assert [result.error for result in results] == [None] * len(text_documents)
+    assert parse_cache.info().currsize > 0
+
+
+def test_extract_references_from_files_with_unpicklable_parameters(text_documents):
+    with pytest.raises(ValueError, match="worker processes"):
+        list(
+            extract_references_from_files(
+                text_documents, linker_callback=lambda reference: None
+            )
+        )
+
+
+def test_extract_references_from_file_reads_texkeys_alongside_text(
+    pdf_files, monkeypatch
+):
+    readers = []
+
+    def extract_texkeys_and_urls_from_pdf(pdf_file, reader=None):
+        readers.append(reader)
+        return extract_texkeys_and_urls(reader)
+
+    def stream_pages(fpath, keep_layout=False, first_page=None, reader=None, data=None):
+        # stands for pdftotext, which doesn't use the reader
+        return stream_PDF_to_plaintext_with_pypdf(
+            fpath, keep_layout, first_page, data=data
+        )
+
+    monkeypatch.setitem(PDF_TEXT_BACKENDS, "pdftotext", stream_pages)
+    monkeypatch.setattr(
+        api, "extract_texkeys_and_urls_from_pdf", extract_texkeys_and_urls_from_pdf
+    )
+
+    extracted_references = extract_references_from_file(pdf_files["2503.05372.pdf"])
+    assert len(extracted_references) == 39
+    assert "Cahn:2003cw" in extracted_references[0]["texkey"]
+    assert len(readers) == 1
+    assert readers[0] is not None
+
+
 def test_extract_references_from_file_does_not_ignore_letters_in_volume(pdf_files):
     """Test that letters in volume are not ignored."""
     pdf = pdf_files["2503.05621.pdf"]
@@ -265,3 +499,19 @@ def test_override_kbs_files_can_take_journals_dict():
         reference, override_kbs_files={"journals": journals}
     )
     assert result[0]["journal_title"] == ["J.Testing"]
+
+
+def test_override_kbs_files_can_take_registered_kbs():
+    journals = {"Journal of Testing": "J.Testing"}
+    reference = "J. Smith, Journal of Testing 42 (2020) 1234"
+
+    kb_set = register_kbs("testing", {"journals": journals})
+    try:
+        by_handle = extract_references_from_string(reference, override_kbs_files=kb_set)
+        by_name = extract_references_from_string(
+            reference, override_kbs_files="testing"
+        )
+    finally:
+        unregister_kbs("testing")
+    assert by_handle[0]["journal_title"] == ["J.Testing"]
+    assert by_name == by_handle
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+import asyncio
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+import responses
+
+from refextract.documents.pdf import pdftotext_processes
+from refextract.references import api, async_api, engine
+from refextract.references.api import (
+    extract_references_from_file,
+    extract_references_from_string,
+)
+from refextract.references.async_api import AsyncReferenceExtractor
+from refextract.references.errors import FullTextNotAvailableError
+
+TEXT = (
+    "Some text\n\nReferences\n"
+    "[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264\n"
+    "[2] G. Aad et al. [ATLAS Collaboration], Phys. Lett. B 716 (2012) 1\n"
+)
+
+
+def run(coroutine_function):
+    async def main():
+        async with AsyncReferenceExtractor(max_concurrency=2) as extractor:
+            return await coroutine_function(extractor)
+
+    return asyncio.run(main())
+
+
+@responses.activate
+def test_async_extraction(tmp_path):
+    path = tmp_path / "document.txt"
+    path.write_text(TEXT)
+    expected = extract_references_from_file(path.as_posix())
+    url = "http://repository.example.com/document.txt"
+    responses.add(responses.GET, url, body=TEXT.encode("utf-8"))
+
+    results = run(
+        lambda extractor: asyncio.gather(
+            extractor.extract_references_from_file(path.as_posix()),
+            extractor.extract_references_from_bytes(TEXT.encode("utf-8")),
+            extractor.extract_references_from_url(url),
+            extractor.extract_references_from_string(TEXT, is_only_references=False),
+        )
+    )
+    assert results == [expected] * 3 + [
+        extract_references_from_string(TEXT, is_only_references=False)
+    ]
+
+    with pytest.raises(FullTextNotAvailableError):
+        run(lambda extractor: extractor.extract_references_from_file("missing.pdf"))
+
+
+def test_async_extraction_from_pdf(pdf_files):
+    pdf = Path(pdf_files["2503.05372.pdf"]).read_bytes()
+    references = run(
+        lambda extractor: extractor.extract_references_from_bytes(
+            pdf, text_backend="pypdf"
+        )
+    )
+    assert len(references) == 39
+    assert "Cahn:2003cw" in references[0]["texkey"]
+
+
+def test_async_extraction_parses_in_executor(monkeypatch):
+    threads = []
+    parse_references = api.parse_references
+
+    def record_thread(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return parse_references(*args, **kwargs)
+
+    monkeypatch.setattr(api, "parse_references", record_thread)
+
+    async def main(executor):
+        async with AsyncReferenceExtractor(executor=executor) as extractor:
+            return await extractor.extract_references_from_bytes(TEXT.encode("utf-8"))
+
+    with ThreadPoolExecutor(thread_name_prefix="parser") as executor:
+        references = asyncio.run(main(executor))
+    assert len(references) == 2
+    assert threads[0].startswith("parser")
+
+
+def test_async_extraction_needs_a_started_parse_pool():
+    engine.shutdown_parse_pool()
+    with pytest.raises(ValueError, match="get_parse_pool"):
+        run(
+            lambda extractor: extractor.extract_references_from_bytes(
+                TEXT.encode("utf-8"), parse_workers=2
+            )
+        )
+    try:
+        engine.get_parse_pool(engine.get_kbs(), 2)
+        references = run(
+            lambda extractor: extractor.extract_references_from_bytes(
+                TEXT.encode("utf-8"), parse_workers=2
+            )
+        )
+    finally:
+        engine.shutdown_parse_pool()
+    assert len(references) == 2
+
+
+def test_async_extraction_concurrency_limit(monkeypatch):
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def extract_references_from_string(source, **kwargs):
+        with lock:
+            running.append(source)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(source)
+        return source
+
+    monkeypatch.setattr(
+        async_api, "extract_references_from_string", extract_references_from_string
+    )
+    results = run(
+        lambda extractor: asyncio.gather(
+            *(extractor.extract_references_from_string(str(nb)) for nb in range(6))
+        )
+    )
+    assert results == [str(nb) for nb in range(6)]
+    assert max(max_running) == 2
+
+
+def test_async_extraction_cancellation_kills_pdftotext(monkeypatch):
+    processes = []
+
+    def get_reference_lines_from_document(document, **kwargs):
+        # stands for a long pdftotext conversion
+        process = subprocess.Popen(["sleep", "30"])
+        pdftotext_processes.get().add(process)
+        processes.append(process)
+        process.wait()
+        return []
+
+    monkeypatch.setattr(
+        api, "get_reference_lines_from_document", get_reference_lines_from_document
+    )
+
+    async def cancel(extractor):
+        task = asyncio.create_task(extractor.extract_references_from_bytes(b"Text"))
+        while not processes:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel)
+    assert processes[0].wait(timeout=5) < 0
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+import pickle
+
+import pytest
+
+from refextract.references.cache import ParseCache, SqliteParseCache
+from refextract.references.engine import parse_references
+from refextract.references.kbs import KnowledgeBase, get_kbs
+
+REFERENCES = [
+    "[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264",
+    "[2] G. Aad et al. [ATLAS Collaboration], Phys. Lett. B 716 (2012) 1",
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def parse_cache(request, tmpdir):
+    if request.param == "memory":
+        return ParseCache()
+    return SqliteParseCache(str(tmpdir.join("cache.db")))
+
+
+def test_parse_cache_returns_copies(parse_cache):
+    kbs = get_kbs()
+    parse_cache.set(kbs, "line", [{"type": "MISC"}])
+
+    cached = parse_cache.get(kbs, "line")
+    cached[0]["type"] = "JOURNAL"
+    assert parse_cache.get(kbs, "line") == [{"type": "MISC"}]
+    assert parse_cache.get(kbs, "other line") is None
+    assert parse_cache.info().hits == 2
+    assert parse_cache.info().misses == 1
+
+
+def test_parse_cache_is_keyed_by_kbs(parse_cache):
+    kbs = get_kbs()
+    other_kbs = get_kbs(custom_kbs={"journals": {"Journal of Testing": "J.T."}})
+    parse_cache.set(kbs, "line", "parsed")
+
+    assert parse_cache.get(other_kbs, "line") is None
+    # KBs without fingerprint are never cached
+    parse_cache.set(KnowledgeBase(kbs), "line", "parsed")
+    assert parse_cache.get(KnowledgeBase(kbs), "line") is None
+
+
+def test_parse_cache_evicts_least_recently_used():
+    kbs = get_kbs()
+    parse_cache = ParseCache(maxsize=2)
+    parse_cache.set(kbs, "first", 1)
+    parse_cache.set(kbs, "second", 2)
+    parse_cache.get(kbs, "first")
+    parse_cache.set(kbs, "third", 3)
+
+    assert parse_cache.get(kbs, "second") is None
+    assert parse_cache.get(kbs, "first") == 1
+    assert parse_cache.info().currsize == 2
+
+
+def test_parse_cache_is_bounded_in_bytes():
+    kbs = get_kbs()
+    parse_cache = ParseCache(max_bytes=1000)
+    parse_cache.set(kbs, "big", "x" * 2000)
+    parse_cache.set(kbs, "first", "x" * 600)
+    parse_cache.set(kbs, "second", "x" * 600)
+
+    assert parse_cache.get(kbs, "big") is None
+    assert parse_cache.get(kbs, "first") is None
+    assert parse_cache.get(kbs, "second") == "x" * 600
+    assert parse_cache.info().nbytes <= 1000
+
+
+def test_sqlite_parse_cache_is_shared(tmpdir):
+    kbs = get_kbs()
+    path = str(tmpdir.join("cache.db"))
+    SqliteParseCache(path).set(kbs, "line", "parsed")
+
+    assert SqliteParseCache(path).get(kbs, "line") == "parsed"
+
+
+def test_sqlite_parse_cache_keeps_count_of_its_size(tmpdir):
+    kbs = get_kbs()
+    parse_cache = SqliteParseCache(str(tmpdir.join("cache.db")), maxsize=10)
+    for nb in range(25):
+        parse_cache.set(kbs, "line %d" % nb, "x" * nb)
+    parse_cache.set(kbs, "line 24", "replaced")
+
+    with parse_cache._connection() as connection:
+        expected = connection.execute(
+            "SELECT COUNT(*), SUM(size) FROM parsed_lines"
+        ).fetchone()
+    info = parse_cache.info()
+    assert info.currsize <= 10
+    assert (info.currsize, info.nbytes) == expected
+    parse_cache.clear()
+    assert parse_cache.info().currsize == parse_cache.info().nbytes == 0
+
+
+def test_sqlite_parse_cache_reads_seldom_write(tmpdir):
+    kbs = get_kbs()
+    parse_cache = SqliteParseCache(str(tmpdir.join("cache.db")))
+    parse_cache.set(kbs, "line", "parsed")
+
+    def last_used():
+        with parse_cache._connection() as connection:
+            return connection.execute("SELECT last_used FROM parsed_lines").fetchone()[
+                0
+            ]
+
+    stored = last_used()
+    parse_cache.get(kbs, "line")
+    assert last_used() == stored
+    parse_cache.touch_interval = -1
+    parse_cache.get(kbs, "line")
+    assert last_used() > stored
+
+
+def test_parse_cache_can_be_pickled(parse_cache):
+    kbs = get_kbs()
+    parse_cache.set(kbs, "line", "parsed")
+    parse_cache.get(kbs, "line")
+
+    copy = pickle.loads(pickle.dumps(parse_cache))
+
+    assert copy.maxsize == parse_cache.maxsize
+    assert copy.max_bytes == parse_cache.max_bytes
+    assert copy.info() == parse_cache.info()
+    assert copy.get(kbs, "line") == "parsed"
+    copy.set(kbs, "other line", "other parsed")
+    if isinstance(parse_cache, SqliteParseCache):
+        assert copy.path == parse_cache.path
+        assert parse_cache.get(kbs, "other line") == "other parsed"
+
+
+def test_parse_references_with_cache(parse_cache):
+    linked = []
+
+    def linker_callback(el):
+        linked.append(el["type"])
+        return 42 if el["type"] == "JOURNAL" else None
+
+    expected = parse_references(REFERENCES, linker_callback=linker_callback)
+    first = parse_references(
+        REFERENCES, linker_callback=linker_callback, parse_cache=parse_cache
+    )
+    del linked[:]
+    second = parse_references(
+        REFERENCES, linker_callback=linker_callback, parse_cache=parse_cache
+    )
+
+    assert parse_cache.info().hits == 2
+    assert first[0] == second[0] == expected[0]
+    assert second[0][0]["recid"] == ["42"]
+    # the linker callback is still run on the cached lines
+    assert "JOURNAL" in linked
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract.
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+import io
+import os
+
+import pytest
+import responses
+
+from refextract.references import download
+from refextract.references.download import Downloader
+from refextract.references.errors import (
+    DocumentTooLargeError,
+    FullTextNotAvailableError,
+)
+
+URL = "http://repository.example.com/document.pdf"
+
+
+@responses.activate
+def test_downloader_get():
+    responses.add(responses.GET, URL, body=b"%PDF-1.4 document")
+    with Downloader(connect_timeout=2, read_timeout=5) as downloader:
+        assert downloader.get(URL) == b"%PDF-1.4 document"
+        assert downloader.get(URL, chunk_size=4) == b"%PDF-1.4 document"
+        session = downloader.session
+
+    assert len(responses.calls) == 2
+    assert all(call.request.req_kwargs["timeout"] == (2, 5) for call in responses.calls)
+    assert session.get_adapter(URL) is session.get_adapter("https://example.com")
+
+
+@responses.activate
+def test_downloader_errors():
+    responses.add(responses.GET, URL, body=b"File not found!", status=404)
+    with pytest.raises(FullTextNotAvailableError, match="URL not found"):
+        Downloader().get(URL)
+
+    responses.replace(responses.GET, URL, body=b"x" * 100)
+    with pytest.raises(DocumentTooLargeError, match="larger than 99 bytes"):
+        Downloader(max_size=99).get(URL)
+    assert len(Downloader(max_size=100).get(URL)) == 100
+
+
+@responses.activate
+def test_downloader_max_size_without_content_length():
+    responses.add(
+        responses.GET,
+        URL,
+        body=io.BufferedReader(io.BytesIO(b"x" * 120)),
+        auto_calculate_content_length=False,
+    )
+    with pytest.raises(DocumentTooLargeError):
+        Downloader(max_size=100, chunk_size=60).get(URL)
+    assert "Content-Length" not in responses.calls[0].response.headers
+
+
+@responses.activate
+@pytest.mark.parametrize(
+    ("validator", "condition"),
+    [("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since")],
+)
+def test_downloader_conditional_requests(tmp_path, validator, condition):
+    value = '"v1"' if validator == "ETag" else "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    def serve(request):
+        if request.headers.get(condition) == value:
+            return 304, {}, b""
+        return 200, {validator: value}, b"%PDF-1.4 document"
+
+    responses.add_callback(responses.GET, URL, callback=serve)
+    downloader = Downloader(cache_dir=str(tmp_path))
+    assert downloader.get(URL) == b"%PDF-1.4 document"
+    assert downloader.get(URL) == b"%PDF-1.4 document"
+    assert condition not in responses.calls[0].request.headers
+    assert responses.calls[1].request.headers[condition] == value
+    assert responses.calls[1].response.status_code == 304
+
+    # the cached copy is only used when the server says it is up to date
+    assert Downloader().get(URL) == b"%PDF-1.4 document"
+    assert condition not in responses.calls[2].request.headers
+
+
+@responses.activate
+def test_downloader_caches_each_set_of_headers(tmp_path):
+    def serve(request):
+        accept = request.headers["Accept"]
+        if request.headers.get("If-None-Match") == '"%s"' % accept:
+            return 304, {}, b""
+        return 200, {"ETag": '"%s"' % accept}, accept.encode("utf-8")
+
+    responses.add_callback(responses.GET, URL, callback=serve)
+    downloader = Downloader(cache_dir=str(tmp_path))
+    pdf, text = {"Accept": "application/pdf"}, {"Accept": "text/plain"}
+    assert downloader.get(URL, headers=pdf) == b"application/pdf"
+    assert downloader.get(URL, headers=text) == b"text/plain"
+    assert "If-None-Match" not in responses.calls[1].request.headers
+    assert downloader.get(URL, headers=pdf) == b"application/pdf"
+    assert downloader.get(URL, headers=text) == b"text/plain"
+    assert [call.response.status_code for call in responses.calls[2:]] == [304, 304]
+
+    # the size of the cached copies is bounded too
+    with pytest.raises(DocumentTooLargeError):
+        Downloader(cache_dir=str(tmp_path), max_size=5).get(URL, headers=pdf)
+
+
+@responses.activate
+def test_downloader_gets_vanished_cached_copy_again(tmp_path, monkeypatch):
+    def serve(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"v1"'}, b"%PDF-1.4 document"
+
+    responses.add_callback(responses.GET, URL, callback=serve)
+    downloader = Downloader(cache_dir=str(tmp_path))
+    downloader.get(URL)
+    # the cached copy is deleted after its validators were read
+    monkeypatch.setattr(download, "read_cache_data", os.remove)
+    chunk_sizes = []
+    read = downloader._read
+
+    def record_chunk_size(url, response, chunk_size):
+        chunk_sizes.append(chunk_size)
+        return read(url, response, chunk_size)
+
+    monkeypatch.setattr(downloader, "_read", record_chunk_size)
+    assert downloader.get(URL, chunk_size=4) == b"%PDF-1.4 document"
+    assert "If-None-Match" not in responses.calls[2].request.headers
+    assert chunk_sizes == [4]
+
+
+@responses.activate
+def test_downloader_does_not_cache_without_validators(tmp_path):
+    responses.add(responses.GET, URL, body=b"%PDF-1.4 document")
+    downloader = Downloader(cache_dir=str(tmp_path))
+    assert downloader.get(URL) == b"%PDF-1.4 document"
+    assert list(tmp_path.iterdir()) == []
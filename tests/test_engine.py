@@ -21,13 +21,23 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
+import shutil
+from pathlib import Path
+
+import mock
 import pytest
 
+from refextract.documents.pdf import PDF_TEXT_BACKENDS
+from refextract.references import engine
+from refextract.references.cache import ParseCache
 from refextract.references.engine import (
+    find_book_titles,
     get_plaintext_document_body,
+    get_reference_lines_from_document,
     parse_references,
 )
 from refextract.references.errors import UnknownDocumentTypeError
+from refextract.references.kbs import KbSet, build_books_kb
 
 
 def get_references(ref_line, override_kbs_files=None):
@@ -422,6 +432,43 @@ def test_get_plaintext_document_body(tmpdir):
     assert "text/html" in excinfo.value.args
 
 
+def test_get_plaintext_document_body_does_not_modify_the_file(tmpdir, monkeypatch):
+    content = b"junk%PDF-1.4\nSome text\n%%EOF\njunk"
+    f = tmpdir.join("junk.pdf")
+    f.write_binary(content)
+    # stands for pdftotext, converting the PDF given on its stdin
+    monkeypatch.setattr(
+        "refextract.documents.pdf.get_pdftotext_command", lambda *args: ["cat"]
+    )
+
+    lines = get_plaintext_document_body(str(f))
+    assert lines == ["%PDF-1.4\n", "Some text\n", "%%EOF"]
+    assert f.read_binary() == content
+
+
+def test_full_text_document_is_read_when_needed(tmpdir, monkeypatch):
+    content = b"%PDF-1.4\nSome text\n%%EOF\n"
+    f = tmpdir.join("clean.pdf")
+    f.write_binary(content)
+    opened = []
+    monkeypatch.setattr(engine, "open_pdf", lambda f: opened.append(f) or "reader")
+    monkeypatch.setattr(
+        "refextract.documents.pdf.get_pdftotext_command",
+        lambda fpath, *args: ["cat", fpath],
+    )
+
+    lines = get_plaintext_document_body(str(f))
+    assert lines == ["%PDF-1.4\n", "Some text\n", "%%EOF\n"]
+    assert opened == []
+    document = engine.FullTextDocument(str(f))
+    assert document.is_pdf
+    assert document.path == str(f)
+    assert "data" not in vars(document)
+    assert document.pdf_reader == document.pdf_reader == "reader"
+    assert len(opened) == 1
+    assert bytes(document.data) == content
+
+
 def test_reference_split():
     ref_line = (
         "[7] J. Ellis et al., Phys. Lett. B 212, 375 (1988); H. Ejiri et al., "
@@ -476,6 +523,35 @@ def test_reference_split_ibid():
     assert references[2]["journal_year"] == ["1997"]
 
 
+def test_parse_journal_reference_line():
+    ref_line = (
+        "[27] K. P. Das and R. C. Hwa, Phys. Lett.B 68, (1977) 459; Erratum "
+        "Phys. Lett.B 73(1978) 504; D. Mol-nar and S. A. Voloshin, Phys. Rev. "
+        "Lett.91(2003) 092301"
+    )
+    kbs = engine.get_kbs()
+    journals = [
+        el
+        for el in engine.parse_journal_reference_line(ref_line, kbs)
+        if el["type"] == "JOURNAL"
+    ]
+    citations = engine.parse_reference_line(ref_line, kbs)[0]
+    expected = [el for citation in citations for el in citation]
+    expected = [el for el in expected if el["type"] == "JOURNAL"]
+
+    def without_misc_txt(el):
+        return {key: value for key, value in el.items() if key != "misc_txt"}
+
+    assert [(el["title"], el["volume"], el["page"]) for el in journals] == [
+        ("Phys. Lett. B", "68", "459"),
+        ("Phys. Lett. B", "73", "504"),
+        ("Phys. Rev. Lett.", "91", "092301"),
+    ]
+    assert list(map(without_misc_txt, journals)) == list(
+        map(without_misc_txt, expected)
+    )
+
+
 def test_reference_split_handles_authors_correctly():
     ref_line = (
         "[27] K. P. Das and R. C. Hwa, Phys. Lett.B 68, (1977) 459; Erratum "
@@ -574,6 +650,34 @@ def test_reference_split_handles_semicolon():
     assert len(references) == 2
 
 
+def test_find_book_titles_in_kb_order():
+    kb = build_books_kb(
+        [
+            ("Smith, J.", "A Book of Tests", "2008;"),
+            ("Doe, J.", "Book of Tests", "2008;"),
+            ("Doe, J.", "Other Tests", "2008;"),
+        ]
+    )
+    assert find_book_titles("see: book-of Tests / a BOOK of tests", kb) == [
+        "A BOOK OF TESTS",
+        "BOOK OF TESTS",
+    ]
+    assert find_book_titles("nothing here", kb) == []
+
+
+def test_book_in_misc_txt():
+    books = [
+        ("Smith, J.", "A Book of Tests", "2008;"),
+        ("Doe, J.", "Book of Tests", "2010;"),
+    ]
+    res = get_references(
+        "[1] J. Smith, a book-of tests, Springer 2008",
+        override_kbs_files={"books": books},
+    )
+    assert res[0][0]["title"] == ["A Book of Tests"]
+    assert res[0][0]["year"] == ["2008"]
+
+
 def test_clean_pdf_before_run(tmp_path, pdf_files):
     tmp_file_path = tmp_path / "packed.pdf"
     pdf = pdf_files["packed_pdf.pdf"]
@@ -582,3 +686,340 @@ def test_clean_pdf_before_run(tmp_path, pdf_files):
 
     text = get_plaintext_document_body(tmp_file_path.as_posix())
     assert text == ["Test\n", "\x0c"]
+
+
+REFERENCES_PAGE = [
+    "References\n",
+    "[1] S. Weinberg, Phys. Rev. Lett. 19 (1967) 1264\n",
+    "[2] G. Aad et al., Phys. Lett. B 716 (2012) 1\n",
+    "\x0c",
+]
+
+
+class FakePDF:
+    """Stands for pdftotext, converting the pages given for each mode."""
+
+    def __init__(self, raw_pages, layout_pages=None):
+        self.pages = {False: raw_pages, True: layout_pages or raw_pages}
+        self.converted = []
+        self.background = []
+
+    def stream(
+        self,
+        fpath,
+        keep_layout=False,
+        first_page=None,
+        last_page=None,
+        reader=None,
+        data=None,
+    ):
+        self.converted.append((keep_layout, first_page))
+        pages = self.pages[keep_layout]
+        return iter(pages[(first_page or 1) - 1 : last_page or len(pages)])
+
+    def start(self, fpath, keep_layout=False, collect=None, data=None):
+        fake_pdf = self
+
+        class Conversion:
+            def result(self):
+                fake_pdf.background.append("result")
+                return collect(iter(fake_pdf.pages[keep_layout]))
+
+            def cancel(self):
+                fake_pdf.background.append("cancel")
+
+        self.background.append(keep_layout)
+        return Conversion()
+
+
+@pytest.fixture
+def fake_pdf(tmp_path, pdf_files, monkeypatch):
+    def make(raw_pages, layout_pages=None):
+        fake = FakePDF(raw_pages, layout_pages)
+        monkeypatch.setitem(PDF_TEXT_BACKENDS, "pdftotext", fake.stream)
+        monkeypatch.setattr(engine, "BackgroundPDFConversion", fake.start)
+        monkeypatch.setattr(
+            engine, "open_pdf", lambda fpath: mock.Mock(pages=raw_pages)
+        )
+        fake.path = (tmp_path / "document.pdf").as_posix()
+        shutil.copy(pdf_files["1503.07589v1.pdf"], fake.path)
+        return fake
+
+    return make
+
+
+def text_pages(count):
+    return [["Some text of the document\n", "\x0c"] for page in range(count)]
+
+
+def test_get_reference_lines_from_document_converts_tail_first(fake_pdf):
+    pages = text_pages(40)
+    pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(pages)
+
+    reflines = get_reference_lines_from_document(fake.path, tail_pages=5)
+    assert len(reflines) == 2
+    assert fake.converted == [(False, 36), (False, 31), (False, 21)]
+    assert fake.background == []
+
+
+def test_get_reference_lines_from_document_cancels_speculative_layout(fake_pdf):
+    pages = text_pages(40)
+    pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(pages)
+
+    reflines = get_reference_lines_from_document(
+        fake.path, tail_pages=5, speculative_layout=True
+    )
+    assert len(reflines) == 2
+    # the last page is converted first to tell whether to start the layout
+    # conversion in the background
+    assert fake.converted == [(False, 40), (False, 36), (False, 31), (False, 21)]
+    assert fake.background == [True, "cancel"]
+
+
+def test_get_reference_lines_from_document_converts_layout_in_background(fake_pdf):
+    layout_pages = text_pages(40)
+    layout_pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(text_pages(40), layout_pages)
+
+    reflines = get_reference_lines_from_document(
+        fake.path, tail_pages=5, speculative_layout=True
+    )
+    assert len(reflines) == 2
+    # without a reference section, the whole document is converted last
+    assert fake.converted == [
+        (False, 40),
+        (False, 36),
+        (False, 31),
+        (False, 21),
+        (False, None),
+    ]
+    assert fake.background == [True, "result"]
+
+
+def test_get_reference_lines_from_document_converts_layout_after_raw(fake_pdf):
+    layout_pages = text_pages(40)
+    layout_pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(text_pages(40), layout_pages)
+
+    reflines = get_reference_lines_from_document(
+        fake.path, tail_pages=5, layout_tail_pages=0
+    )
+    assert len(reflines) == 2
+    assert fake.converted == [
+        (False, 36),
+        (False, 31),
+        (False, 21),
+        (False, None),
+        (True, 36),
+        (True, 31),
+        (True, 21),
+    ]
+    assert fake.background == []
+
+
+def test_get_reference_lines_from_document_converts_layout_of_tail(fake_pdf):
+    layout_pages = text_pages(40)
+    layout_pages[37] = REFERENCES_PAGE
+    fake = fake_pdf(text_pages(40), layout_pages)
+
+    reflines = get_reference_lines_from_document(fake.path, layout_tail_pages=10)
+    assert len(reflines) == 2
+    # without a reference section title, only the last pages are converted
+    # again
+    assert fake.converted == [(False, None), (True, 31)]
+
+    layout_pages[37] = text_pages(1)[0]
+    layout_pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(text_pages(40), layout_pages)
+    assert get_reference_lines_from_document(fake.path, layout_tail_pages=10) == []
+    assert fake.converted == [(False, None), (True, 31)]
+
+
+def test_get_reference_lines_from_document_converts_layout_from_title(
+    fake_pdf, monkeypatch
+):
+    raw_pages = text_pages(40)
+    raw_pages[29] = ["References\n", "\x0c"]
+    layout_pages = text_pages(40)
+    layout_pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(raw_pages, layout_pages)
+    extract_references_from_fulltext = engine.extract_references_from_fulltext
+
+    def extract_numbered_references(docbody):
+        # the raw conversion lost the reference lines after the title
+        if REFERENCES_PAGE[1] not in docbody:
+            return [], 5, 1
+        return extract_references_from_fulltext(docbody)
+
+    monkeypatch.setattr(
+        engine, "extract_references_from_fulltext", extract_numbered_references
+    )
+
+    reflines = get_reference_lines_from_document(fake.path)
+    assert len(reflines) == 2
+    assert fake.converted == [(False, None), (True, 30)]
+    assert fake.background == []
+
+
+def test_find_reference_title_page():
+    pages = text_pages(5)
+    pages[3] = REFERENCES_PAGE
+
+    assert engine.find_reference_title_page(sum(pages, [])) == 4
+    assert engine.find_reference_title_page(sum(pages[2:], []), first_page=3) == 4
+    assert engine.find_reference_title_page(sum(text_pages(5), [])) is None
+
+
+def test_select_reference_pages():
+    pages = text_pages(10)
+    pages[3] = REFERENCES_PAGE
+
+    assert engine.select_reference_pages(iter(pages), 0) == (1, sum(pages, []))
+    assert engine.select_reference_pages(iter(pages), 2) == (4, sum(pages[3:], []))
+    assert engine.select_reference_pages(iter(pages), 8) == (3, sum(pages[2:], []))
+    assert engine.select_reference_pages(iter(text_pages(10)), 2, first_page=5) == (
+        13,
+        sum(text_pages(2), []),
+    )
+    assert engine.select_reference_pages(iter([]), 2) == (1, [])
+
+
+def test_get_reference_lines_from_document_keeps_page_window(fake_pdf):
+    pages = text_pages(40)
+    pages[29] = REFERENCES_PAGE
+    fake = fake_pdf(pages)
+
+    assert len(get_reference_lines_from_document(fake.path, page_window=3)) == 2
+
+
+def test_get_reference_lines_from_document_with_pypdf(tmp_path, pdf_files):
+    tmp_file_path = tmp_path / "document.pdf"
+    shutil.copy(pdf_files["1508.05632v2.pdf"], tmp_file_path)
+
+    reflines = get_reference_lines_from_document(
+        tmp_file_path.as_posix(), text_backend="pypdf"
+    )
+    assert len(reflines) == 53
+    assert reflines[0].startswith("[1]")
+
+
+def test_full_text_document(tmp_path, pdf_files):
+    tmp_file_path = tmp_path / "document.pdf"
+    shutil.copy(pdf_files["1508.05632v2.pdf"], tmp_file_path)
+    document = engine.FullTextDocument(tmp_file_path.as_posix())
+    assert document.is_pdf
+    assert document.page_count == 6
+    assert document.data == tmp_file_path.read_bytes()
+
+    text_file_path = tmp_path / "document.txt"
+    text_file_path.write_text("Some text\n")
+    document = engine.FullTextDocument(text_file_path.as_posix())
+    assert document.mime_type == "text/plain"
+    assert document.pdf_reader is None
+    assert document.page_count is None
+
+
+def test_full_text_document_from_data(pdf_files):
+    pdf = Path(pdf_files["1508.05632v2.pdf"]).read_bytes()
+    document = engine.FullTextDocument(data=b"junk" + pdf + b"more junk")
+    assert document.path is None
+    assert document.is_pdf
+    assert document.page_count == 6
+    assert document.data == pdf.rstrip()
+
+    document = engine.FullTextDocument(data=memoryview(b"Some text\n"))
+    assert document.mime_type == "text/plain"
+    assert document.get_lines() == ["Some text\n"]
+
+
+def test_full_text_document_does_not_modify_the_file(tmp_path, pdf_files):
+    tmp_file_path = tmp_path / "packed.pdf"
+    shutil.copy(pdf_files["packed_pdf.pdf"], tmp_file_path)
+    document = engine.FullTextDocument(tmp_file_path.as_posix())
+    assert document.path is None
+    assert document.is_pdf
+    assert bytes(document.data).endswith(b"%%EOF")
+    assert tmp_file_path.read_bytes() == Path(pdf_files["packed_pdf.pdf"]).read_bytes()
+
+
+def test_get_pdf_bounds():
+    assert engine.get_pdf_bounds(b"%PDF-1.4 body %%EOF\n") == (0, 20)
+    assert engine.get_pdf_bounds(b"junk%PDF-1.4 body %%EOFjunk") == (4, 23)
+    assert engine.get_pdf_bounds(b"junk%PDF-1.4 body") == (4, 17)
+    assert engine.get_pdf_bounds(b"Some text") is None
+
+
+PARALLEL_REFERENCES = [
+    "[1] S. Weinberg, A Model of Leptons, Phys. Rev. Lett. 19 (1967) 1264",
+    "[2] G. Aad et al. [ATLAS Collaboration], Phys. Lett. B 716 (2012) 1",
+    "[3] R. Bousso, JHEP 9906:028 (1999); ibid. 9907:004; hep-th/9906022.",
+    "[4] J. Smith, a book-of tests, Springer 2008",
+    "[5] A. Author, doi:10.1103/PhysRevD.68.037502",
+    "[6] Mat. Sci. Eng. A308 (2001) 143-152, FERMILAB-PUB-12-345-AD",
+] * 3
+
+
+def test_parse_references_in_parallel(monkeypatch):
+    def linker_callback(el):
+        return 42 if el["type"] == "JOURNAL" else None
+
+    expected = parse_references(PARALLEL_REFERENCES, linker_callback=linker_callback)
+    monkeypatch.setattr(engine, "CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES", 5)
+    result = parse_references(
+        PARALLEL_REFERENCES, linker_callback=linker_callback, parse_workers=2
+    )
+    assert result[0] == expected[0]
+    assert result[0][0]["recid"] == ["42"]
+    assert {key: result[1][key] for key in result[1] if key != "date"} == {
+        key: expected[1][key] for key in expected[1] if key != "date"
+    }
+
+
+def test_parse_references_in_parallel_with_cache(monkeypatch):
+    monkeypatch.setattr(engine, "CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES", 5)
+    parse_cache = ParseCache()
+    expected = parse_references(PARALLEL_REFERENCES)
+    assert parse_references(PARALLEL_REFERENCES[:3], parse_cache=parse_cache)
+    result = parse_references(
+        PARALLEL_REFERENCES, parse_cache=parse_cache, parse_workers=2
+    )
+    assert result[0] == expected[0]
+    # the 3 cached lines are each found 3 times, the others are parsed by
+    # the workers and added to the cache
+    assert parse_cache.info().hits == 9
+    assert parse_cache.info().currsize == 6
+
+
+def test_get_parse_pool_is_reused(monkeypatch):
+    monkeypatch.setattr(engine, "CFG_REFEXTRACT_PARSE_POOLS", 2)
+    kbs = engine.get_kbs()
+    other_kbs = engine.get_kbs(custom_kbs={"journals": [("PHYS REV", "Phys.Rev.")]})
+    engine.shutdown_parse_pool()
+    try:
+        assert engine.get_parse_pool(kbs, 2, create=False) is None
+        pool = engine.get_parse_pool(kbs, 2)
+        # the pools are kept for the KBs of the same content
+        assert engine.get_parse_pool(KbSet("copy", kbs), 2) is pool
+        other_pool = engine.get_parse_pool(kbs, 1)
+        assert other_pool is not pool
+        assert engine.get_parse_pool(kbs, 2) is pool
+        # the least recently used pool is stopped to start another one
+        engine.get_parse_pool(other_kbs, 2)
+        assert engine.get_parse_pool(kbs, 1, create=False) is None
+        assert engine.get_parse_pool(kbs, 2, create=False) is pool
+    finally:
+        engine.shutdown_parse_pool()
+
+
+def test_parse_pool_is_started_for_long_sections_only(monkeypatch):
+    monkeypatch.setattr(engine, "CFG_REFEXTRACT_PARALLEL_PARSE_MIN_LINES", 5)
+    engine.shutdown_parse_pool()
+    try:
+        parse_references(PARALLEL_REFERENCES[:4], parse_workers=2)
+        assert engine.get_parse_pool(engine.get_kbs(), 2, create=False) is None
+        parse_references(PARALLEL_REFERENCES, parse_workers=2)
+        assert engine.get_parse_pool(engine.get_kbs(), 2, create=False) is not None
+    finally:
+        engine.shutdown_parse_pool()
@@ -36,9 +36,9 @@ def test_extract_journal_info():
     assert len(extracted["extracted_publication_infos"]) == 2
 
 
-@mock.patch("refextract.extract.extract_journal_reference", side_effect=KeyError)
+@mock.patch("refextract.extract.extract_journal_references", side_effect=KeyError)
 def test_extract_journal_info_when_timeout_from_refextract(
-    extract_journal_reference_mock,
+    extract_journal_references_mock,
 ):
     journal_kb_data = {
         "COMMUNICATIONS IN ASTEROSEISMOLOGY": "Commun.Asteros.",
@@ -89,6 +89,33 @@ def test_extract_journal_info_for_multiple_pubinfos():
     assert len(extracted["extracted_publication_infos"]) == 2
 
 
+def test_extract_journal_info_keeps_the_order_of_the_pubinfos():
+    journal_kb_data = {
+        "PHYS REV": "Phys.Rev.",
+        "PHYS REV LETT": "Phys.Rev.Lett.",
+    }
+    publication_infos = [
+        {"pubinfo_freetext": "Phys. Rev. 127 (1962) 965-970"},
+        {"journal_title": "Phys. Rev."},
+        {"pubinfo_freetext": "no journal in here"},
+        {"pubinfo_freetext": "Phys.Rev.Lett. 19 (1967) 1264"},
+        {"pubinfo_freetext": "Phys. Rev. 127 (1962) 965-970"},
+    ]
+
+    extracted = extract_journal_info(publication_infos, journal_kb_data)
+
+    infos = extracted["extracted_publication_infos"]
+    assert [info.get("title") for info in infos] == [
+        "Phys.Rev.",
+        None,
+        None,
+        "Phys.Rev.Lett.",
+        "Phys.Rev.",
+    ]
+    assert infos[0] == infos[4]
+    assert infos[3]["volume"] == "19"
+
+
 def test_extract_extract_references_from_text():
     journal_kb_data = {
         "COMMUNICATIONS IN ASTEROSEISMOLOGY": "Commun.Asteros.",
@@ -145,9 +172,9 @@ def test_extract_references_from_list():
         assert "year" in reference
 
 
-@mock.patch("refextract.extract.extract_references_from_string", side_effect=KeyError)
+@mock.patch("refextract.references.api.parse_references_elements", side_effect=KeyError)
 def test_extract_references_from_list_when_error_from_refextract(
-    extract_references_from_string_mock,
+    parse_references_elements_mock,
 ):
     journal_kb_data = {
         "COMMUNICATIONS IN ASTEROSEISMOLOGY": "Commun.Asteros.",
@@ -22,8 +22,24 @@
 # or submit itself to any jurisdiction.
 
 import csv
+import os
+import pickle
 
-from refextract.references.kbs import file_resolving, get_kbs
+import pytest
+
+from refextract.references import kbs
+from refextract.references.errors import UnknownKnowledgeBaseError
+from refextract.references.kbs import (
+    KbCache,
+    KbSet,
+    KnowledgeBase,
+    file_resolving,
+    get_kbs,
+    get_registered_kbs,
+    load_kb_by_type,
+    register_kbs,
+    unregister_kbs,
+)
 
 
 def test_get_kbs_doesnt_override_default_if_value_is_none():
@@ -35,7 +51,7 @@ def test_get_kbs_doesnt_override_default_if_value_is_none():
 def test_get_kbs_caches_journal_dict():
     journals = {"Journal of Testing": "J.Testing"}
 
-    first_cache = get_kbs(custom_kbs={"journals": journals}).copy()
+    first_cache = dict(get_kbs(custom_kbs={"journals": journals}))
     assert len(first_cache["journals"]) == 3
     assert first_cache["journals"][-1] == ["JOURNAL OF TESTING", "J TESTING"]
 
@@ -52,7 +68,7 @@ def test_get_kbs_caches_journal_dict():
 
 def test_get_kbs_invalidates_cache_if_input_changes():
     journals = {"Journal of Testing": "J.Testing"}
-    first_cache = get_kbs(custom_kbs={"journals": journals}).copy()
+    first_cache = dict(get_kbs(custom_kbs={"journals": journals}))
 
     journals = journals = {"Journal of Testing": "J.Test."}
     second_cache = get_kbs(custom_kbs={"journals": journals})
@@ -67,6 +83,107 @@ def test_get_kbs_invalidates_cache_if_input_changes():
     assert second_cache["journals"][-1] == ["JOURNAL OF TESTING", "J TEST"]
 
 
+def test_get_kbs_keeps_several_versions_of_a_kb():
+    cache = KbCache()
+    first_journals = {"Journal of Testing": "J.Testing"}
+    second_journals = {"Journal of Testing": "J.Test."}
+
+    first = get_kbs(custom_kbs={"journals": first_journals}, cache=cache)
+    second = get_kbs(custom_kbs={"journals": second_journals}, cache=cache)
+    assert cache.info().misses == 9
+    assert get_kbs(custom_kbs={"journals": first_journals}, cache=cache) == first
+    assert get_kbs(custom_kbs={"journals": second_journals}, cache=cache) == second
+    assert cache.info().misses == 9
+    assert cache.info().hits == 23
+
+
+def test_get_kbs_uses_given_fingerprints():
+    cache = KbCache()
+    first = get_kbs(
+        custom_kbs={"journals": {"Journal of Testing": "J.Testing"}},
+        fingerprints={"journals": "v1"},
+        cache=cache,
+    )
+    second = get_kbs(
+        custom_kbs={"journals": {"Journal of Testing": "J.Test."}},
+        fingerprints={"journals": "v1"},
+        cache=cache,
+    )
+    assert first["journals"] is second["journals"]
+
+
+def test_kb_cache_evicts_least_recently_used():
+    cache = KbCache(maxsize=2)
+    first = cache.get("journals", {"A": "A."})
+    cache.get("journals", {"B": "B."})
+    assert cache.get("journals", {"A": "A."}) is first
+    cache.get("journals", {"C": "C."})
+    assert cache.info().currsize == 2
+    assert cache.get("journals", {"A": "A."}) is first
+    cache.get("journals", {"B": "B."})
+    assert cache.info().misses == 4
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0)
+
+
+def test_knowledge_base_merges_standardised_titles_once():
+    journals = {"Journal of Testing": "J.Testing"}
+    journals_re = ["Testing Lett\\.---Test.Lett.\n"]
+
+    knowledge_base = get_kbs(
+        custom_kbs={"journals": journals, "journals_re": journals_re}
+    )
+    assert isinstance(knowledge_base, KnowledgeBase)
+    assert knowledge_base.standardised_titles["JOURNAL OF TESTING"] == "J.Testing"
+    assert knowledge_base.standardised_titles["Testing Lett\\."] == "Test.Lett."
+    # the journals KB itself is left untouched
+    assert "Testing Lett\\." not in knowledge_base["journals"].standardised_titles
+    assert (
+        get_kbs(custom_kbs={"journals": journals, "journals_re": journals_re})
+        is knowledge_base
+    )
+
+
+def test_knowledge_base_is_read_only_and_picklable():
+    knowledge_base = get_kbs(custom_kbs={"journals": {"Journal of Testing": "J.T."}})
+
+    with pytest.raises(AttributeError):
+        knowledge_base.standardised_titles = {}
+    with pytest.raises(TypeError):
+        knowledge_base["journals"] = None
+
+    unpickled = pickle.loads(pickle.dumps(knowledge_base))
+    assert isinstance(unpickled, KnowledgeBase)
+    assert unpickled.standardised_titles == knowledge_base.standardised_titles
+    assert unpickled["journals"].seek_phrases == ["JOURNAL OF TESTING", "J T"]
+
+
+def test_register_kbs_resolves_by_handle_and_name():
+    journals = {"Journal of Testing": "J.Testing"}
+
+    kb_set = register_kbs("testing", {"journals": journals})
+    try:
+        assert isinstance(kb_set, KbSet)
+        assert kb_set.name == "testing"
+        assert kb_set["journals"][-1] == ["JOURNAL OF TESTING", "J TESTING"]
+        assert get_kbs(custom_kbs=kb_set) is kb_set
+        assert get_kbs(custom_kbs="testing") is kb_set
+        assert get_registered_kbs("testing") is kb_set
+    finally:
+        unregister_kbs("testing")
+
+    with pytest.raises(UnknownKnowledgeBaseError):
+        get_kbs(custom_kbs="testing")
+
+
+def test_registered_kbs_are_read_only():
+    kb_set = KbSet("testing", get_kbs())
+
+    with pytest.raises(TypeError):
+        kb_set["journals"] = None
+    assert not hasattr(kb_set, "update")
+
+
 def test_file_resolving():
     # Test that the file resolving works as expected
     with file_resolving("tests/data/file_resolving.csv") as fh:
@@ -78,3 +195,52 @@ def test_file_resolving_reader():
     with file_resolving("tests/data/file_resolving.csv", reader=csv.reader) as fh:
         rows = list(fh)
         assert rows == [["1", "2", "3"], ["4", "5", "6"]]
+
+
+def test_load_kb_by_type_writes_and_reuses_snapshot(tmpdir, monkeypatch):
+    monkeypatch.setattr(kbs, "CFG_REFEXTRACT_KBS_CACHE_DIR", str(tmpdir))
+    kb_file = tmpdir.join("journals.kb")
+    kb_file.write("JOURNAL OF TESTING---J.Testing\n")
+
+    first = load_kb_by_type("journals", str(kb_file))
+    snapshots = [name for name in os.listdir(str(tmpdir)) if name.endswith("pickle")]
+    assert len(snapshots) == 1
+
+    def fail(*args):
+        raise AssertionError("the KB should be loaded from its snapshot")
+
+    monkeypatch.setattr(kbs, "build_kb_by_type", fail)
+    second = load_kb_by_type("journals", str(kb_file))
+    assert second[1] == first[1]
+    assert second[2] == first[2] == ["JOURNAL OF TESTING", "J TESTING"]
+
+
+def test_load_kb_by_type_rebuilds_snapshot_if_file_changes(tmpdir, monkeypatch):
+    monkeypatch.setattr(kbs, "CFG_REFEXTRACT_KBS_CACHE_DIR", str(tmpdir))
+    kb_file = tmpdir.join("journals.kb")
+    kb_file.write("JOURNAL OF TESTING---J.Testing\n")
+    load_kb_by_type("journals", str(kb_file))
+
+    kb_file.write("JOURNAL OF TESTING---J.Test.\n")
+    kb = load_kb_by_type("journals", str(kb_file))
+    assert kb[2] == ["JOURNAL OF TESTING", "J TEST"]
+
+
+def test_load_kb_by_type_ignores_corrupted_snapshot(tmpdir, monkeypatch):
+    monkeypatch.setattr(kbs, "CFG_REFEXTRACT_KBS_CACHE_DIR", str(tmpdir))
+    kb_file = tmpdir.join("journals.kb")
+    kb_file.write("JOURNAL OF TESTING---J.Testing\n")
+    snapshot_path = kbs.get_kb_snapshot_path("journals", str(kb_file), str(tmpdir))
+    with open(snapshot_path, "wb") as fh:
+        fh.write(b"garbage")
+
+    kb = load_kb_by_type("journals", str(kb_file))
+    assert kb[2] == ["JOURNAL OF TESTING", "J TESTING"]
+
+
+def test_save_kb_snapshot_ignores_unpicklable_kb(tmpdir):
+    snapshot_path = str(tmpdir.join("journals.pickle"))
+    kbs.save_kb_snapshot(snapshot_path, {"journals": lambda: None})
+
+    assert os.listdir(str(tmpdir)) == []
+    assert kbs.load_kb_snapshot(snapshot_path) is None
@@ -21,7 +21,23 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
-from refextract.references.pdf import extract_texkeys_and_urls_from_pdf
+import io
+
+from pypdf import PdfReader
+
+from refextract.documents.pdf import (
+    PdftotextProcesses,
+    iter_pdftotext_pages,
+    pdftotext_processes,
+    read_pdftotext_output,
+    start_pdftotext,
+)
+from refextract.references.pdf import (
+    _assign_urls_to_references,
+    _destinations_in_two_columns,
+    extract_texkeys_and_urls_from_pdf,
+    extract_urls,
+)
 
 
 def test_extract_texkeys_and_urls_from_pdf(pdf_files):
@@ -930,3 +946,96 @@ def test_extract_texkeys_from_pdf_no_crash_on_other_exceptions(pdf_files):
     result = extract_texkeys_and_urls_from_pdf(pdf_files["DIS_SHEILA_final.pdf"])
 
     assert result == expected
+
+
+def test_iter_pdftotext_pages():
+    output = "Title\nText\n\fReferences\n[1] A reference\n\f".encode("utf-8")
+
+    pages = list(iter_pdftotext_pages(io.BytesIO(output)))
+    assert pages == [
+        ["Title\n", "Text\n", "\f"],
+        ["References", "[1] A reference\n", "\f"],
+    ]
+    assert sum(pages, []) == read_pdftotext_output(io.BytesIO(output))
+
+
+PDFTOTEXT_COMMAND = "refextract.documents.pdf.get_pdftotext_command"
+
+
+def test_start_pdftotext_registers_processes(monkeypatch):
+    processes = PdftotextProcesses()
+    token = pdftotext_processes.set(processes)
+    try:
+        monkeypatch.setattr(PDFTOTEXT_COMMAND, lambda *args: ["cat"])
+        process = start_pdftotext("-", data=b"%PDF-1.4")
+        assert process.stdout.read() == b"%PDF-1.4"
+        assert process.wait() == 0
+
+        monkeypatch.setattr(PDFTOTEXT_COMMAND, lambda *args: ["sleep", "30"])
+        process = start_pdftotext("document.pdf")
+        processes.kill()
+        assert process.wait(timeout=5) < 0
+        # the conversions started afterwards are killed too
+        process = start_pdftotext("document.pdf")
+        assert process.wait(timeout=5) < 0
+    finally:
+        pdftotext_processes.reset(token)
+
+
+def test_start_pdftotext_converts_page_range(monkeypatch):
+    monkeypatch.setattr(PDFTOTEXT_COMMAND, lambda *args: ["echo", repr(args)])
+    process = start_pdftotext("document.pdf", True, first_page=3, last_page=5)
+    with process:
+        assert process.stdout.read() == b"('document.pdf', True, 3, 5)\n"
+
+
+def test_extract_texkeys_and_urls_from_pdf_with_reader(pdf_files):
+    pdf = pdf_files["2503.05372.pdf"]
+    reader = PdfReader(pdf, strict=False)
+
+    assert extract_texkeys_and_urls_from_pdf(
+        pdf, reader=reader
+    ) == extract_texkeys_and_urls_from_pdf(pdf)
+
+
+def test_destinations_in_two_columns():
+    first_column = [("cite.%d" % i, (0, 0, -700 + 10 * i, 50)) for i in range(5)]
+    second_column = [("cite.%d" % i, (0, 1, -700 + 10 * i, 320)) for i in range(5, 8)]
+
+    assert _destinations_in_two_columns(first_column + second_column)
+    assert not _destinations_in_two_columns(first_column + second_column[:2])
+
+
+def test_assign_urls_to_references():
+    refs = [
+        ("cite.a", (0, 0, -700, 50)),
+        ("cite.b", (0, 0, -650, 50)),
+        ("cite.c", (1, 0, -700, 50)),
+    ]
+    urls = [
+        ("https://a", (0, 0, -690, 100)),
+        ("https://b", (0, 0, -640, 100)),
+        ("https://b/2", (0, 0, -100, 100)),
+        ("https://c", (1, 0, -690, 100)),
+        ("https://far", (5, 0, -690, 100)),
+    ]
+
+    assert _assign_urls_to_references(refs, urls) == [
+        {"https://a"},
+        {"https://b", "https://b/2"},
+        {"https://c"},
+    ]
+    assert _assign_urls_to_references(refs, []) == [set(), set(), set()]
+
+
+def test_extract_urls_of_page_range(pdf_files):
+    reader = PdfReader(pdf_files["2503.05372.pdf"], strict=False)
+    all_urls = extract_urls(reader)
+    urls = extract_urls(reader, 5, 6)
+
+    assert urls
+    assert urls == [url for url in all_urls if 5 <= url.page_nb <= 6]
+    assert urls[0].uri.startswith("http")
+    assert extract_urls(reader, 5, 1000) == [
+        url for url in all_urls if url.page_nb >= 5
+    ]
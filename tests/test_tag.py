@@ -21,11 +21,22 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
+from refextract.references.kbs import (
+    build_collaborations_kb,
+    build_journals_kb,
+    build_publishers_kb,
+    build_reportnum_kb,
+)
 from refextract.references.tag import (
     find_numeration,
     find_numeration_more,
+    identify_and_tag_collaborations,
     identify_ibids,
+    identify_journals,
+    identify_publishers,
+    identify_report_numbers,
     tag_arxiv,
+    tag_arxiv_more,
 )
 
 
@@ -221,3 +232,82 @@ def test_5_digits_suffix_version_new_2012():
     ref_line = """{any prefix}1210.12345v9 [physics.ins-det]{any postfix}"""
     r = tag_arxiv(ref_line)
     assert r.strip(": ") == "{any prefix}1210.12345v9 [physics.ins-det]{any postfix}"
+
+
+def test_identify_journals_longest_title_first():
+    kb = build_journals_kb(
+        [("PHYS REV", "Phys.Rev."), ("PHYS REV LETT", "Phys.Rev.Lett.")]
+    )
+    matches, line, count = identify_journals("A PHYS REV LETT 1 AND PHYS REV 2", kb)
+    assert matches == {2: "PHYS REV LETT", 22: "PHYS REV"}
+    assert line == "A _____________ 1 AND ________ 2"
+    assert count == {"PHYS REV LETT": 1, "PHYS REV": 1}
+
+
+def test_identify_journals_word_boundaries():
+    kb = build_journals_kb([("PHYSICAL REVIEW", "Phys.Rev.")])
+    # KB titles must not be surrounded by word characters
+    assert identify_journals("XPHYSICAL REVIEW 1", kb)[0] == {}
+    assert identify_journals("PHYSICAL REVIEWX 1", kb)[0] == {}
+    assert identify_journals("PHYSICAL REVIEW", kb)[0] == {}
+    assert identify_journals("A/PHYSICAL REVIEW 1", kb)[0] == {2: "PHYSICAL REVIEW"}
+    # titles added from the standardised versions must not follow a slash
+    assert identify_journals("A/PHYS REV 1", kb)[0] == {}
+    assert identify_journals("A PHYS REV_1", kb)[0] == {2: "PHYS REV"}
+    assert identify_journals("A PHYS REV1", kb)[0] == {}
+
+
+def test_identify_report_numbers_longest_category_first():
+    kb = build_reportnum_kb(
+        ["*****CERN*****", "<syyyys999>", "CERN---CERN", "CERN EP---CERN-EP"]
+    )
+    assert kb.ordered_categs == [(4, "CERN EP"), (4, "CERN")]
+
+    lengths, replacements, line = identify_report_numbers(
+        "SEE CERN EP 2001 123 AND CERN 1999 001", kb
+    )
+    assert lengths == {4: 16, 25: 13}
+    assert replacements == {4: "CERN-EP-2001-123", 25: "CERN-1999-001"}
+    assert line == "SEE ________________ AND _____________"
+
+
+def test_identify_report_numbers_skips_lines_without_category():
+    kb = build_reportnum_kb(["*****CERN*****", "<syyyys999>", "CERN---CERN"])
+    assert identify_report_numbers("DESY 2001 123", kb) == ({}, {}, "DESY 2001 123")
+
+
+def test_tag_arxiv_more_old_identifiers():
+    assert tag_arxiv_more("hep-th/9501001 and HEPPH 9201002") == (
+        "<cds.ARXIV>hep-th/9501001</cds.ARXIV> and "
+        "<cds.ARXIV>hep-ph/9201002</cds.ARXIV>"
+    )
+    assert tag_arxiv_more("asaastro-ph/0101001, é") == (
+        "<cds.ARXIV>astro-ph/0101001</cds.ARXIV>, é"
+    )
+    assert tag_arxiv_more("Phys. Rev. D 12 (1975) 9501001") == (
+        "Phys. Rev. D 12 (1975) 9501001"
+    )
+
+
+def test_identify_publishers_uses_the_last_match_at_a_position():
+    kb = build_publishers_kb(
+        [("NORTH HOLLAND", "North-Holland"), ("NORTH", "North"), ("DOVER", "Dover")]
+    )
+    assert identify_publishers("AMSTERDAM NORTH HOLLAND 1980", kb) == {10: "NORTH"}
+    assert identify_publishers("Dover, 1970", kb) == {0: "DOVER"}
+    assert identify_publishers("SPRINGER 1970", kb) == {}
+
+
+def test_identify_and_tag_collaborations():
+    kb = build_collaborations_kb(
+        [
+            ("ATLAS Collaboration", "ATLAS Collaboration"),
+            ("CMS Collaboration", "CMS Collaboration"),
+        ]
+    )
+    line = "G. Aad et al. (the atlas Coll.), and CMS collaboration, 2012"
+    assert identify_and_tag_collaborations(line, kb) == (
+        "G. Aad et al. <cds.COLLABORATION>atlas Coll</cds.COLLABORATION>),"
+        "<cds.COLLABORATION>CMS collaboration</cds.COLLABORATION>, 2012"
+    )
+    assert identify_and_tag_collaborations("LHCb, 2012", kb) == "LHCb, 2012"
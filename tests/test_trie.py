@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of refextract
+# Copyright (C) 2026 CERN.
+#
+# refextract is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# refextract is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with refextract; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from refextract.references.trie import KeywordTrie
+
+
+def test_keyword_trie_finds_overlapping_keywords():
+    trie = KeywordTrie(["PHYS", "PHYS REV", "REV"])
+    matches = list(trie.finditer("PHYS REV D"))
+    assert matches == [
+        (0, 4, "PHYS"),
+        (0, 8, "PHYS REV"),
+        (5, 8, "REV"),
+    ]
+
+
+def test_keyword_trie_values():
+    trie = KeywordTrie()
+    trie.add("JHEP", "J. High Energy Phys.")
+    assert "JHEP" in trie
+    assert "JHE" not in trie
+    assert trie.get("JHEP") == "J. High Energy Phys."
+    assert list(trie.finditer("SEE JHEP 01")) == [(4, 8, "J. High Energy Phys.")]
+    assert sorted(KeywordTrie(["A", "AB", "B"]).values()) == ["A", "AB", "B"]
+
+
+def test_keyword_trie_empty_line():
+    assert list(KeywordTrie(["A"]).finditer("")) == []